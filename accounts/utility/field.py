@@ -52,3 +52,95 @@ class ListField(models.TextField):
         """Used by serializers"""
         value = self.value_from_object(obj)
         return self.get_prep_value(value)
+
+
+class BitmaskField(models.BigIntegerField):
+    """
+    A custom Django model field storing the values of a ListField on the same model as an integer bitmask, one bit per known flag.
+    The mask is recomputed from the source list whenever the instance is written, including bulk_create, so it never has to be set by hand. Filtering on it is a single integer test instead of a substring scan of the comma-separated list.
+    Flags are assigned bits by position, so new flags must only ever be appended. Values outside the flag list are kept in the list but have no bit.
+    Methods:
+        mask(values):
+            Converts a list of values to its bitmask, ignoring unknown values.
+        values_from_mask(mask):
+            Converts a bitmask back to the list of flags it contains.
+        pre_save(model_instance, add):
+            Recomputes the mask from the source field before the instance is written.
+    Lookups:
+        has_all: rows whose mask contains every given value, e.g. amenity_mask__has_all=["wifi", "pool"].
+    """
+
+    def __init__(self, *args, source=None, flags=(), **kwargs):
+        self.source = source
+        self.flags = list(flags)
+        self.bits = {flag: 1 << position for position, flag in enumerate(self.flags)}
+        self._values_cache = {}
+        kwargs.setdefault("default", 0)
+        kwargs["editable"] = False
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["source"] = self.source
+        kwargs["flags"] = self.flags
+        del kwargs["editable"]
+        return name, path, args, kwargs
+
+    def mask(self, values):
+        mask = 0
+        for value in values or []:
+            mask |= self.bits.get(str(value).strip().lower(), 0)
+        return mask
+
+    def values_from_mask(self, mask):
+        # Few distinct combinations exist in practice, so decoding is memoised
+        values = self._values_cache.get(mask)
+        if values is None:
+            values = [flag for flag, bit in self.bits.items() if mask & bit]
+            self._values_cache[mask] = values
+        return list(values)
+
+    def pre_save(self, model_instance, add):
+        value = self.mask(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+@BitmaskField.register_lookup
+class HasAllFlags(models.Lookup):
+    lookup_name = "has_all"
+
+    def get_prep_lookup(self):
+        if isinstance(self.rhs, (list, tuple, set)):
+            field = self.lhs.output_field
+            mask = field.mask(self.rhs)
+            if any(str(value).strip().lower() not in field.bits for value in self.rhs):
+                # An unknown value can never be present: require a bit no row has
+                mask |= 1 << len(field.flags)
+            return mask
+        return super().get_prep_lookup()
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"({lhs} & {rhs}) = {rhs}", (*lhs_params, *rhs_params, *rhs_params)
+
+
+class SearchDocumentField(models.TextField):
+    """
+    The hidden column of a SQLite FTS5 table that is named after the table itself.
+    It stands for the whole indexed document, so the `match` lookup on it runs a
+    full-text query across every column of the index.
+    Lookups:
+        match : `document__match="..."` compiles to `<table>.<table> MATCH %s`.
+    """
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
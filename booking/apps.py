@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BookingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "booking"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services.search import create_search_index
+
+        post_migrate.connect(create_search_index, sender=self)
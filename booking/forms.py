@@ -9,14 +9,22 @@ class HotelSearchForm(forms.Form):
     """
     Form for searching hotels based on various criteria.
 
-    This form includes fields for city, area, check-in and check-out dates,
-    number of guests, and amenities.
+    This form includes fields for a free-text query, city, area, check-in and check-out dates,
+    number of guests, and amenities. Either the query or the city must be given.
     It also includes validation to ensure that the check-in date is not in the past,
     the check-out date is after the check-in date, and the number of guests is not more than the room capacity.
     """
 
+    q = forms.CharField(
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(
+            attrs={"class": "form-input", "placeholder": "Hotel name, area or amenity"}
+        ),
+    )
     city = forms.CharField(
         max_length=100,
+        required=False,
         widget=forms.TextInput(
             attrs={"class": "form-input", "placeholder": "Enter city name"}
         ),
@@ -76,6 +84,10 @@ class HotelSearchForm(forms.Form):
         min_price = cleaned_data.get("min_price")
         max_price = cleaned_data.get("max_price")
 
+        # A free-text query alone is a complete search
+        if not cleaned_data.get("q") and not cleaned_data.get("city"):
+            raise ValidationError("Enter a search term or a city.")
+
         if check_in and check_out:
             if check_in >= check_out:
                 raise ValidationError("Check-out date must be after check-in date.")
@@ -100,8 +112,15 @@ class BookingForm(forms.ModelForm):
 
     class Meta:
         model = Booking
-        fields = ["check_in_date", "check_out_date", "guests", "special_requests"]
+        fields = [
+            "check_in_date",
+            "check_out_date",
+            "guests",
+            "special_requests",
+            "idempotency_key",
+        ]
         widgets = {
+            "idempotency_key": forms.HiddenInput(),
             "check_in_date": forms.DateInput(
                 attrs={
                     "class": "form-input",
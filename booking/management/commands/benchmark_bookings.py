@@ -0,0 +1,273 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, connections
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from booking.models import Booking, Hotel, Room, RoomNight
+from booking.services.reservations import RoomUnavailable, reserve_room
+
+OUTCOMES = ["booked", "conflict", "replayed", "error"]
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark concurrent booking of a single hotel.
+    A fresh file-backed test database is seeded with one hotel and its rooms, then many client threads, each with its own database connection, start together and book random stays through reserve_room. Stays are drawn from a short window so clients constantly compete for the same room-nights. A share of submissions is sent twice with the same idempotency key, as a browser retry would.
+    Command-line arguments:
+        --clients    : Parallel clients (default: 16).
+        --attempts   : Booking attempts per client (default: 100).
+        --rooms      : Rooms in the hotel (default: 20).
+        --days       : Days ahead stays are drawn from (default: 60).
+        --max-nights : Longest stay in nights (default: 4).
+        --retry-rate : Share of submissions repeated with the same key (default: 0.1).
+        --seed       : Random seed for the request mix (default: 42).
+        --output     : Path of the JSON report (default: booking_benchmark.json).
+    Reported:
+    - Bookings and attempts per second over the whole run, and the conflict rate.
+    - Latency percentiles overall and per outcome: booked, conflict, replayed, error.
+    - double_booked: occupying bookings overlapping another on the same room, which must be 0.
+    - orphaned_nights: room-nights not matching an occupying booking's stay, which must be 0.
+    """
+
+    help = "Benchmark booking throughput and conflicts with many parallel clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients", type=int, default=16, help="Parallel clients (default: 16)"
+        )
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=100,
+            help="Booking attempts per client (default: 100)",
+        )
+        parser.add_argument(
+            "--rooms", type=int, default=20, help="Rooms in the hotel (default: 20)"
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=60,
+            help="Days ahead stays are drawn from (default: 60)",
+        )
+        parser.add_argument(
+            "--max-nights",
+            type=int,
+            default=4,
+            help="Longest stay in nights (default: 4)",
+        )
+        parser.add_argument(
+            "--retry-rate",
+            type=float,
+            default=0.1,
+            help="Share of submissions repeated with the same key (default: 0.1)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed for the request mix (default: 42)",
+        )
+        parser.add_argument(
+            "--output",
+            default="booking_benchmark.json",
+            help="Path of the JSON report (default: booking_benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        # Threads need a database they can all open: a file, not shared memory
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        old_test_name = test_settings.get("NAME")
+        old_name = connection.settings_dict["NAME"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            test_settings["NAME"] = os.path.join(tmpdir, "benchmark_bookings.sqlite3")
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                result = self.run_benchmark(options)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = old_test_name
+
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "seed": options["seed"],
+            "clients": options["clients"],
+            "attempts_per_client": options["attempts"],
+            "rooms": options["rooms"],
+            "days": options["days"],
+            **result,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+        counts = report["outcomes"]
+        self.stdout.write(
+            f"{report['bookings_per_second']:.1f} bookings/s  "
+            f"{report['attempts_per_second']:.1f} attempts/s  "
+            f"conflict rate {report['conflict_rate']:.1%}  "
+            f"booked {counts['booked']}  conflicts {counts['conflict']}  "
+            f"replayed {counts['replayed']}  errors {counts['error']}"
+        )
+        if report["double_booked"] or report["orphaned_nights"]:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Inconsistent: {report['double_booked']} double booked, "
+                    f"{report['orphaned_nights']} orphaned nights"
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Benchmark report written to {options['output']}")
+        )
+
+    def seed_hotel(self, room_count, client_count):
+        hotel = Hotel.objects.create(
+            name="Benchmark Hotel",
+            description="Benchmark hotel",
+            hotel_type="hotel",
+            city="Goa",
+            area="Baga",
+            address="1 Benchmark Road, Goa",
+            star_rating=3,
+        )
+        Room.objects.bulk_create(
+            [
+                Room(
+                    hotel=hotel,
+                    room_type="double",
+                    room_number=str(100 + i),
+                    capacity=2,
+                    price_per_night=Decimal("2500.00"),
+                )
+                for i in range(room_count)
+            ]
+        )
+        User.objects.bulk_create(
+            [User(username=f"benchmark_client_{i}", password="!") for i in range(client_count)]
+        )
+        return (
+            hotel.id,
+            list(Room.objects.filter(hotel=hotel).values_list("id", flat=True)),
+            list(User.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def run_benchmark(self, options):
+        hotel_id, room_ids, user_ids = self.seed_hotel(
+            options["rooms"], options["clients"]
+        )
+        first_night = date.today() + timedelta(days=1)
+        start = threading.Barrier(options["clients"] + 1)
+        results = [[] for _ in range(options["clients"])]
+
+        def client(index):
+            rng = random.Random(f"{options['seed']}:{index}")
+            outcomes = results[index]
+            try:
+                start.wait()
+                for _ in range(options["attempts"]):
+                    nights = rng.randint(1, options["max_nights"])
+                    check_in = first_night + timedelta(days=rng.randrange(options["days"]))
+                    fields = {
+                        "user_id": user_ids[index],
+                        "hotel_id": hotel_id,
+                        "room_id": rng.choice(room_ids),
+                        "check_in_date": check_in,
+                        "check_out_date": check_in + timedelta(days=nights),
+                        "guests": 2,
+                        "total_amount": Decimal("2500.00") * nights,
+                        "idempotency_key": f"{index}-{rng.getrandbits(64):016x}",
+                    }
+                    submissions = 2 if rng.random() < options["retry_rate"] else 1
+                    for _ in range(submissions):
+                        outcomes.append(self.submit(Booking(**fields)))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=client, args=(i,)) for i in range(options["clients"])
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = {outcome: [] for outcome in OUTCOMES}
+        for outcome, latency in (result for outcomes in results for result in outcomes):
+            latencies[outcome].append(latency)
+        counts = {outcome: len(values) for outcome, values in latencies.items()}
+        attempts = sum(counts.values())
+
+        return {
+            "seconds": round(elapsed, 3),
+            "outcomes": counts,
+            "bookings_per_second": round(counts["booked"] / elapsed, 2),
+            "attempts_per_second": round(attempts / elapsed, 2),
+            "conflict_rate": round(counts["conflict"] / attempts, 4),
+            "latency_ms": _percentiles(
+                [value for values in latencies.values() for value in values]
+            ),
+            "latency_ms_by_outcome": {
+                outcome: _percentiles(values) for outcome, values in latencies.items()
+            },
+            "double_booked": self.count_double_booked(),
+            "orphaned_nights": self.count_orphaned_nights(),
+        }
+
+    def submit(self, booking):
+        started = time.perf_counter()
+        try:
+            _, created = reserve_room(booking)
+            outcome = "booked" if created else "replayed"
+        except RoomUnavailable:
+            outcome = "conflict"
+        except DatabaseError as e:
+            # e.g. "database is locked" once SQLite's busy timeout runs out
+            self.stderr.write(f"Booking failed: {str(e)}")
+            outcome = "error"
+        return outcome, (time.perf_counter() - started) * 1000
+
+    def count_double_booked(self):
+        occupying = Booking.objects.filter(booking_status__in=Booking.OCCUPYING_STATUSES)
+        overlapping = occupying.filter(
+            room_id=OuterRef("room_id"),
+            check_in_date__lt=OuterRef("check_out_date"),
+            check_out_date__gt=OuterRef("check_in_date"),
+        ).exclude(pk=OuterRef("pk"))
+        return occupying.filter(Exists(overlapping)).count()
+
+    def count_orphaned_nights(self):
+        expected = sum(
+            (check_out - check_in).days
+            for check_in, check_out in Booking.objects.filter(
+                booking_status__in=Booking.OCCUPYING_STATUSES
+            ).values_list("check_in_date", "check_out_date")
+        )
+        return abs(RoomNight.objects.count() - expected)
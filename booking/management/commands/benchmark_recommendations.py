@@ -0,0 +1,259 @@
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from booking.management.commands.generate_sample_data import CITIES
+from booking.models import (
+    Booking,
+    Hotel,
+    Review,
+    Room,
+    SearchHistory,
+    UserInteraction,
+)
+from booking.services import profiling, recommendation_cache, user_profiles
+from booking.services.recommendation import HotelRecommendationService
+
+STAGES = ["retrieval", "content", "collaborative", "location", "fusion", "hydration"]
+SCENARIOS = {
+    "anonymous": {"personalized": False, "city": False},
+    "anonymous_city": {"personalized": False, "city": True},
+    "personalized": {"personalized": True, "city": False},
+    "personalized_city": {"personalized": True, "city": True},
+}
+BATCH_SIZE = 5000
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the latency of HotelRecommendationService.
+    For each scale a fresh test database is created and filled by generate_sample_data with hotels, rooms, users, bookings, reviews, interactions and searches. The recommender is trained on that data into a temporary model directory, then get_recommendations is timed for anonymous and personalized users, with and without a city filter. The result cache is cleared before every request so each one runs the full pipeline.
+    Command-line arguments:
+        --scales   : Numbers of hotels to benchmark at (default: 1000 10000 100000).
+        --requests : Timed requests per scenario (default: 200).
+        --seed     : Random seed for the generated data and request mix (default: 42).
+        --output   : Path of the JSON report (default: recommendation_benchmark.json).
+    Reported per scenario:
+    - p50, p95 and p99 latency and the number of queries per request.
+    - The same figures for each pipeline stage: retrieval, content, collaborative, location, fusion and hydration.
+    - Peak traced Python memory of a request, measured in a separate pass so tracing does not skew latency.
+    The JSON report can be kept alongside a release and compared with later runs to catch regressions before deploying.
+    """
+
+    help = "Benchmark recommendation latency per stage at several catalog sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            type=int,
+            nargs="+",
+            default=[1000, 10000, 100000],
+            help="Numbers of hotels to benchmark at (default: 1000 10000 100000)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Timed requests per scenario (default: 200)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed for the generated data and request mix (default: 42)",
+        )
+        parser.add_argument(
+            "--output",
+            default="recommendation_benchmark.json",
+            help="Path of the JSON report (default: recommendation_benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "seed": options["seed"],
+            "requests": options["requests"],
+            "scales": [],
+        }
+
+        for hotel_count in options["scales"]:
+            self.stdout.write(f"Benchmarking {hotel_count} hotels...")
+            report["scales"].append(
+                self.run_scale(hotel_count, options["requests"], options["seed"])
+            )
+
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+        for scale in report["scales"]:
+            for name, result in scale["scenarios"].items():
+                latency = result["latency_ms"]
+                self.stdout.write(
+                    f"{scale['hotels']:>7} hotels  {name:<18} "
+                    f"p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  "
+                    f"p99 {latency['p99']:>8.2f} ms  "
+                    f"queries {result['queries']['mean']:>5.1f}  "
+                    f"peak {result['peak_memory_kb']:>8.1f} KB"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f"Benchmark report written to {options['output']}")
+        )
+
+    def run_scale(self, hotel_count, request_count, seed):
+        """Seed a fresh database, train on it and time every scenario"""
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Reads routed to the replica must see the benchmark database too
+        mirrors = {
+            alias: connections[alias].settings_dict["NAME"]
+            for alias in connections
+            if alias != DEFAULT_DB_ALIAS
+        }
+        for alias in mirrors:
+            connections[alias].close()
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            with tempfile.TemporaryDirectory() as model_dir, override_settings(
+                RECOMMENDER_MODEL_DIR=model_dir
+            ):
+                rng = random.Random(seed)
+                started = time.perf_counter()
+                rows = self.seed_data(seed, hotel_count)
+                seed_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                call_command("train_recommender", seed=seed, stdout=StringIO())
+                train_seconds = time.perf_counter() - started
+
+                service = HotelRecommendationService()
+                service.reload()
+
+                user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+                users = list(
+                    User.objects.filter(
+                        id__in=rng.sample(user_ids, min(request_count, len(user_ids)))
+                    ).order_by("id")
+                )
+                for user in users:
+                    user_profiles.get_profile_terms(user)
+
+                scenarios = {
+                    name: self.run_scenario(service, rng, users, request_count, **spec)
+                    for name, spec in SCENARIOS.items()
+                }
+        finally:
+            for alias, name in mirrors.items():
+                connections[alias].close()
+                connections[alias].settings_dict["NAME"] = name
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        return {
+            "hotels": hotel_count,
+            "rows": rows,
+            "seed_seconds": round(seed_seconds, 3),
+            "train_seconds": round(train_seconds, 3),
+            "scenarios": scenarios,
+        }
+
+    def run_scenario(self, service, rng, users, request_count, personalized, city):
+        requests = [
+            {
+                "user": rng.choice(users) if personalized else None,
+                "city": rng.choice(CITIES) if city else None,
+            }
+            for _ in range(request_count)
+        ]
+
+        # Untimed warm-up: snapshot arrays paged in, query compilation caches filled
+        for params in requests[:5]:
+            recommendation_cache.get_cache().clear()
+            service.get_recommendations(**params)
+
+        latencies = []
+        queries = []
+        stage_timings = {stage: [] for stage in STAGES}
+        stage_queries = {stage: [] for stage in STAGES}
+        for params in requests:
+            recommendation_cache.get_cache().clear()
+            with profiling.record_stages() as recorder:
+                started = time.perf_counter()
+                service.get_recommendations(**params)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(recorder.queries.values()))
+            for stage in STAGES:
+                stage_timings[stage].append(recorder.timings[stage] * 1000)
+                stage_queries[stage].append(recorder.queries[stage])
+
+        # Separate pass: tracemalloc slows allocation-heavy code noticeably
+        peak_memory = 0
+        tracemalloc.start()
+        try:
+            for params in requests[: max(1, request_count // 10)]:
+                recommendation_cache.get_cache().clear()
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                service.get_recommendations(**params)
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "latency_ms": _percentiles(latencies),
+            "queries": {"mean": round(float(np.mean(queries)), 2), "max": max(queries)},
+            "peak_memory_kb": round(peak_memory / 1024, 1),
+            "stages": {
+                stage: {
+                    "latency_ms": _percentiles(stage_timings[stage]),
+                    "queries": round(float(np.mean(stage_queries[stage])), 2),
+                }
+                for stage in STAGES
+            },
+        }
+
+    def seed_data(self, seed, hotel_count):
+        """Generate a catalog of hotel_count hotels and activity scaled to it"""
+        user_count = max(100, hotel_count // 10)
+        call_command(
+            "generate_sample_data",
+            hotels=hotel_count,
+            users=user_count,
+            bookings=user_count * 5,
+            reviews=user_count * 3,
+            interactions=user_count * 20,
+            searches=user_count * 3,
+            seed=seed,
+            # Worker processes reconnect, which would drop an in-memory test database
+            workers=1,
+            batch_size=BATCH_SIZE,
+            stdout=StringIO(),
+        )
+        return {
+            "hotels": Hotel.objects.count(),
+            "rooms": Room.objects.count(),
+            "users": User.objects.count(),
+            "bookings": Booking.objects.count(),
+            "reviews": Review.objects.count(),
+            "interactions": UserInteraction.objects.count(),
+            "searches": SearchHistory.objects.count(),
+        }
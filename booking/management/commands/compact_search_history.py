@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking.models import UserSearchRollup
+from booking.services import recommendation_cache, search_history
+
+
+class Command(BaseCommand):
+    """
+    Django management command to compact user search history.
+    Searches are counted in each user's rollup as they are recorded, so raw rows are only kept for a retention period; this command deletes older ones and drops rollup places not searched for a longer period. Run it periodically, e.g. daily from cron. After bulk loading raw searches, pass --rebuild to recompute the rollups from them before anything is expired.
+    Command-line arguments:
+        --retention-days : Days raw searches are kept (default: 30).
+        --rollup-days    : Days a place stays in a rollup after its last search (default: 365).
+        --rebuild        : Recompute all rollups from the raw searches first.
+        --batch-size     : Rollups processed per chunk (default: 2000).
+    """
+
+    help = "Expire old raw searches and stale places in search rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=30,
+            help="Days raw searches are kept (default: 30)",
+        )
+        parser.add_argument(
+            "--rollup-days",
+            type=int,
+            default=365,
+            help="Days a place stays in a rollup after its last search (default: 365)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute all rollups from the raw searches first",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rollups processed per chunk (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["rebuild"]:
+            rebuilt = search_history.rebuild_rollups(batch_size)
+            self.stdout.write(f"Rebuilt {rebuilt} search rollups")
+
+        expired = search_history.expire_searches(options["retention_days"])
+        pruned = self.prune_rollups(options["rollup_days"], batch_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {expired} raw searches and pruned {pruned} search rollups"
+            )
+        )
+
+    def prune_rollups(self, rollup_days, batch_size):
+        """Drop places last searched before the cutoff; returns rollups changed"""
+        cutoff = (timezone.now() - timedelta(days=rollup_days)).isoformat()
+        pruned = 0
+        last_id = 0
+        while True:
+            rollups = list(
+                UserSearchRollup.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", "user_id", "locations")[:batch_size]
+            )
+            if not rollups:
+                break
+            last_id = rollups[-1].id
+
+            changed = []
+            for rollup in rollups:
+                fresh = [
+                    entry for entry in rollup.locations if entry["last_seen"] >= cutoff
+                ]
+                if len(fresh) != len(rollup.locations):
+                    rollup.locations = fresh
+                    changed.append(rollup)
+            with transaction.atomic():
+                UserSearchRollup.objects.bulk_update(changed, ["locations"])
+            # bulk_update sends no post_save, which normally does this
+            for rollup in changed:
+                recommendation_cache.invalidate_user(rollup.user_id)
+            pruned += len(changed)
+        return pruned
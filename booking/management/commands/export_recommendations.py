@@ -0,0 +1,88 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from booking.services.recommendation import recommendation_service
+
+
+class Command(BaseCommand):
+    """
+    Django management command to score recommendations for every active user, e.g. for an email campaign.
+    Users are read in id order and scored in batches through score_batch, so each batch loads profiles and places with one query per source and the hotels matching the search are loaded once for the whole run. Every batch uses the same model snapshot. Output is one JSON line per user with the same scored recommendations as the JSON API.
+    Command-line arguments:
+        --output     : Path of the JSON lines file (default: recommendations.jsonl).
+        --limit      : Recommendations per user (default: 10).
+        --city       : Only recommend hotels in this city.
+        --area       : Only recommend hotels in this area.
+        --batch-size : Users scored per batch (default: 500).
+    """
+
+    help = "Score recommendations for all active users into a JSON lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="recommendations.jsonl",
+            help="Path of the JSON lines file (default: recommendations.jsonl)",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=10, help="Recommendations per user (default: 10)"
+        )
+        parser.add_argument("--city", help="Only recommend hotels in this city")
+        parser.add_argument("--area", help="Only recommend hotels in this area")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Users scored per batch (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        snapshot = recommendation_service.reload()
+        pools = {}
+        exported = failed = 0
+        started = time.perf_counter()
+
+        with open(options["output"], "w") as f:
+            last_id = 0
+            while True:
+                users = list(
+                    User.objects.filter(is_active=True, id__gt=last_id).order_by("id")[
+                        : options["batch_size"]
+                    ]
+                )
+                if not users:
+                    break
+                last_id = users[-1].id
+
+                scored = recommendation_service.score_batch(
+                    [
+                        (user, options["city"], options["area"], options["limit"])
+                        for user in users
+                    ],
+                    snapshot,
+                    pools,
+                )
+                for user, recommendations in zip(users, scored):
+                    if recommendations is None:
+                        failed += 1
+                        continue
+                    f.write(
+                        json.dumps(
+                            {"user_id": user.id, "recommendations": recommendations}
+                        )
+                        + "\n"
+                    )
+                    exported += 1
+
+        elapsed = time.perf_counter() - started
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Scoring failed for {failed} users"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported recommendations for {exported} users with model version "
+                f"{snapshot.version} in {elapsed:.1f}s to {options['output']}"
+            )
+        )
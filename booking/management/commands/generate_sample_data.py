@@ -1,20 +1,401 @@
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from booking.models import Hotel, Room
+from django.db import connections, transaction
+from django.db.models import Max
+from booking.models import (
+    Booking,
+    Hotel,
+    Review,
+    Room,
+    RoomNight,
+    SearchHistory,
+    UserInteraction,
+)
+from booking.services import search_history, similar_hotels
+from datetime import date, timedelta
 from decimal import Decimal
+import multiprocessing
+import numpy as np
+import os
 import random
 from faker import Faker
 
-fake = Faker()
+CITIES = [
+    "Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata",
+    "Hyderabad", "Pune", "Ahmedabad", "Jaipur", "Goa",
+    "Kochi", "Coimbatore", "Mysore", "Udaipur", "Agra",
+    "Varanasi", "Rishikesh", "Manali", "Shimla", "Darjeeling"
+]
+
+AREAS_BY_CITY = {
+    "Mumbai": ["Bandra", "Andheri", "Juhu", "Powai", "Colaba", "Marine Drive", "Worli", "Lower Parel"],
+    "Delhi": ["Connaught Place", "Karol Bagh", "Paharganj", "Aerocity", "Hauz Khas", "Khan Market", "Lajpat Nagar"],
+    "Bangalore": ["Koramangala", "Indiranagar", "Whitefield", "Electronic City", "MG Road", "Brigade Road", "Jayanagar"],
+    "Chennai": ["T. Nagar", "Anna Nagar", "Adyar", "Velachery", "Mylapore", "Nungambakkam", "Besant Nagar"],
+    "Kolkata": ["Park Street", "Salt Lake", "Howrah", "Ballygunge", "New Market", "Esplanade", "Alipore"],
+    "Hyderabad": ["Banjara Hills", "Jubilee Hills", "Gachibowli", "Hitech City", "Secunderabad", "Begumpet", "Madhapur"],
+    "Pune": ["Koregaon Park", "Viman Nagar", "Hinjewadi", "Kothrud", "Camp", "Deccan", "Aundh"],
+    "Ahmedabad": ["Satellite", "Vastrapur", "Navrangpura", "Prahlad Nagar", "CG Road", "Maninagar", "Bopal"],
+    "Jaipur": ["C-Scheme", "Malviya Nagar", "Vaishali Nagar", "Pink City", "MI Road", "Tonk Road", "Mansarovar"],
+    "Goa": ["Calangute", "Baga", "Anjuna", "Panaji", "Candolim", "Arambol", "Palolem", "Vasco"],
+    "Kochi": ["Marine Drive", "Fort Kochi", "Ernakulam", "Kakkanad", "Edappally", "Vytilla", "MG Road"],
+    "Coimbatore": ["RS Puram", "Gandhipuram", "Race Course", "Saibaba Colony", "Peelamedu", "Singanallur"],
+    "Mysore": ["Sayyaji Rao Road", "Chamundi Hills", "Jayalakshmipuram", "Kuvempunagar", "Hebbal", "Vijayanagar"],
+    "Udaipur": ["City Palace", "Lake Pichola", "Fateh Sagar", "Sukhadia Circle", "Hiran Magri", "Sector 14"],
+    "Agra": ["Taj Ganj", "Sadar Bazaar", "Civil Lines", "Dayalbagh", "Sikandra", "Fatehabad Road"],
+    "Varanasi": ["Dashashwamedh Ghat", "Assi Ghat", "Godowlia", "Lanka", "Cantonment", "Sigra"],
+    "Rishikesh": ["Laxman Jhula", "Ram Jhula", "Tapovan", "Swarg Ashram", "Muni Ki Reti", "Haridwar Road"],
+    "Manali": ["Mall Road", "Old Manali", "Vashisht", "Solang Valley", "Hadimba", "Club House"],
+    "Shimla": ["Mall Road", "Ridge", "Lakkar Bazaar", "Sanjauli", "Summer Hill", "Kufri Road"],
+    "Darjeeling": ["Mall Road", "Chowrasta", "Happy Valley", "Lebong", "Jalapahar", "Observatory Hill"]
+}
+
+HOTEL_TYPES = ["budget", "mid_range", "luxury", "resort", "boutique"]
+
+HOTEL_NAME_PREFIXES = [
+    "Grand", "Royal", "Comfort", "Luxury", "Budget", "Premium", "City", "Garden", 
+    "Ocean", "Mountain", "Heritage", "Modern", "Executive", "Family", "Business",
+    "Boutique", "Classic", "Elite", "Golden", "Silver", "Crown", "Palace", "Manor",
+    "Plaza", "Regency", "Imperial", "Majestic", "Serene", "Tranquil", "Elegant"
+]
+
+HOTEL_NAME_SUFFIXES = [
+    "Hotel", "Inn", "Resort", "Suites", "Lodge", "Palace", "Residency", "Stay",
+    "Retreat", "Manor", "Plaza", "Grand", "Towers", "Gardens", "Heights", "View",
+    "Paradise", "Sanctuary", "Oasis", "Haven", "Escape", "Hideaway"
+]
+
+AMENITIES_BY_TYPE = {
+    "luxury": [
+        ["wifi", "pool", "spa", "gym", "restaurant", "bar", "room_service", "concierge", "valet_parking"],
+        ["wifi", "pool", "spa", "gym", "restaurant", "bar", "business_center", "conference_room", "laundry"],
+        ["wifi", "spa", "gym", "restaurant", "bar", "room_service", "concierge", "tennis_court", "golf_course"],
+        ["wifi", "pool", "spa", "restaurant", "bar", "room_service", "valet_parking", "shuttle_service", "laundry"]
+    ],
+    "resort": [
+        ["wifi", "pool", "spa", "gym", "restaurant", "bar", "beach_access", "kids_club", "tennis_court"],
+        ["wifi", "pool", "spa", "restaurant", "bar", "golf_course", "beach_access", "shuttle_service", "laundry"],
+        ["wifi", "pool", "gym", "restaurant", "bar", "kids_club", "tennis_court", "room_service", "concierge"],
+        ["wifi", "spa", "restaurant", "bar", "beach_access", "golf_course", "shuttle_service", "valet_parking"]
+    ],
+    "boutique": [
+        ["wifi", "restaurant", "bar", "gym", "spa", "concierge", "laundry"],
+        ["wifi", "restaurant", "bar", "room_service", "business_center", "parking"],
+        ["wifi", "gym", "restaurant", "bar", "spa", "shuttle_service", "pet_friendly"],
+        ["wifi", "restaurant", "bar", "concierge", "laundry", "valet_parking"]
+    ],
+    "mid_range": [
+        ["wifi", "parking", "restaurant", "gym", "business_center", "laundry"],
+        ["wifi", "pool", "restaurant", "bar", "parking", "room_service"],
+        ["wifi", "gym", "restaurant", "parking", "shuttle_service", "laundry"],
+        ["wifi", "restaurant", "bar", "business_center", "parking", "conference_room"]
+    ],
+    "budget": [
+        ["wifi", "parking", "restaurant", "laundry"],
+        ["wifi", "parking", "breakfast", "shuttle_service"],
+        ["wifi", "restaurant", "parking", "business_center"],
+        ["wifi", "parking", "laundry", "pet_friendly"]
+    ]
+}
+
+ROOM_TYPES = ["single", "double", "twin", "suite", "family", "deluxe"]
+
+ROOM_AMENITIES_BY_TYPE = {
+    "single": [
+        ["ac", "tv", "wifi", "work_desk", "coffee_maker"],
+        ["ac", "tv", "wifi", "safe", "hair_dryer"],
+        ["ac", "tv", "wifi", "minibar", "iron"],
+        ["ac", "tv", "wifi", "work_desk", "shower"]
+    ],
+    "double": [
+        ["ac", "tv", "wifi", "minibar", "safe", "hair_dryer"],
+        ["ac", "tv", "wifi", "work_desk", "coffee_maker", "iron"],
+        ["ac", "tv", "wifi", "minibar", "balcony", "bathtub"],
+        ["ac", "tv", "wifi", "safe", "room_service", "shower"]
+    ],
+    "twin": [
+        ["ac", "tv", "wifi", "work_desk", "coffee_maker", "safe"],
+        ["ac", "tv", "wifi", "minibar", "iron", "hair_dryer"],
+        ["ac", "tv", "wifi", "balcony", "shower", "safe"],
+        ["ac", "tv", "wifi", "work_desk", "room_service", "bathtub"]
+    ],
+    "suite": [
+        ["ac", "tv", "wifi", "minibar", "balcony", "jacuzzi", "safe", "room_service"],
+        ["ac", "tv", "wifi", "kitchenette", "balcony", "bathtub", "work_desk", "coffee_maker"],
+        ["ac", "tv", "wifi", "minibar", "jacuzzi", "safe", "iron", "hair_dryer"],
+        ["ac", "tv", "wifi", "kitchenette", "balcony", "room_service", "work_desk", "bathtub"]
+    ],
+                "deluxe": [
+        ["ac", "tv", "wifi", "minibar", "balcony", "safe", "bathtub", "hair_dryer"],
+        ["ac", "tv", "wifi", "minibar", "jacuzzi", "room_service", "work_desk", "coffee_maker"],
+        ["ac", "tv", "wifi", "balcony", "safe", "bathtub", "iron", "hair_dryer"],
+        ["ac", "tv", "wifi", "minibar", "jacuzzi", "room_service", "safe", "bathtub"]
+    ],
+    "family": [
+        ["ac", "tv", "wifi", "kitchenette", "safe", "iron", "hair_dryer", "bathtub"],
+        ["ac", "tv", "wifi", "minibar", "balcony", "safe", "room_service", "shower"],
+        ["ac", "tv", "wifi", "kitchenette", "work_desk", "coffee_maker", "iron", "bathtub"],
+        ["ac", "tv", "wifi", "minibar", "safe", "hair_dryer", "room_service", "shower"]
+    ]
+}
+
+CITY_COORDINATES = {
+    "Mumbai": (19.0760, 72.8777),
+    "Delhi": (28.7041, 77.1025),
+    "Bangalore": (12.9716, 77.5946),
+    "Chennai": (13.0827, 80.2707),
+    "Kolkata": (22.5726, 88.3639),
+    "Hyderabad": (17.3850, 78.4867),
+    "Pune": (18.5204, 73.8567),
+    "Ahmedabad": (23.0225, 72.5714),
+    "Jaipur": (26.9124, 75.7873),
+    "Goa": (15.2993, 74.1240),
+    "Kochi": (9.9312, 76.2673),
+    "Coimbatore": (11.0168, 76.9558),
+    "Mysore": (12.2958, 76.6394),
+    "Udaipur": (24.5854, 73.7125),
+    "Agra": (27.1767, 78.0081),
+    "Varanasi": (25.3176, 82.9739),
+    "Rishikesh": (30.0869, 78.2676),
+    "Manali": (32.2396, 77.1887),
+    "Shimla": (31.1048, 77.1734),
+    "Darjeeling": (27.0360, 88.2627)
+}
+
+STAR_RATINGS_BY_TYPE = {
+    "budget": [2, 3],
+    "mid_range": [3, 4],
+    "luxury": [4, 5],
+    "resort": [4, 5],
+    "boutique": [3, 4, 5],
+}
+
+ROOM_CAPACITY = {"single": 1, "double": 2, "twin": 2, "suite": 4, "deluxe": 2, "family": 6}
+
+ROOM_SIZE_RANGE = {
+    "single": (200, 300),
+    "double": (300, 450),
+    "twin": (350, 500),
+    "suite": (600, 1000),
+    "deluxe": (400, 600),
+    "family": (500, 800),
+}
+
+# Price of a room is star_rating * 1000 scaled by room type and hotel type
+ROOM_PRICE_MULTIPLIER = {
+    "single": 0.7,
+    "double": 1.0,
+    "twin": 1.0,
+    "suite": 2.5,
+    "deluxe": 1.8,
+    "family": 2.0,
+}
+
+HOTEL_TYPE_PRICE_MULTIPLIER = {
+    "budget": 0.6,
+    "mid_range": 1.0,
+    "luxury": 2.0,
+    "resort": 1.8,
+    "boutique": 1.5,
+}
+
+# Same weights the views record for each interaction type
+INTERACTION_WEIGHTS = {"view": 1.0, "search": 0.5, "wishlist": 2.0, "review": 3.0, "book": 5.0}
+# Relative frequency of each interaction type in generated traffic
+INTERACTION_FREQUENCIES = {"view": 70, "search": 15, "wishlist": 8, "review": 3, "book": 4}
+
+REVIEW_TITLES = {
+    1: ["Very disappointing", "Would not stay again", "Not worth the money"],
+    2: ["Below expectations", "Needs improvement", "Could be better"],
+    3: ["Decent stay", "Average experience", "Okay for the price"],
+    4: ["Very good stay", "Comfortable and clean", "Would recommend"],
+    5: ["Absolutely wonderful", "Exceeded expectations", "Perfect stay"],
+}
+
+REVIEW_COMMENTS = {
+    1: "The room was not as described and the staff were unhelpful throughout our stay.",
+    2: "The location was fine but the room needed maintenance and service was slow.",
+    3: "A reasonable stay overall. Nothing special, but the basics were covered.",
+    4: "Clean rooms, friendly staff and a convenient location. We enjoyed our stay.",
+    5: "Outstanding service, spotless rooms and great facilities. We will be back.",
+}
+
+# All generated users can log in with this password
+SAMPLE_USER_PASSWORD = "password123"
+
+# Rows generated per worker task; hotels are heavier because of their rooms
+HOTEL_CHUNK_SIZE = 1000
+ACTIVITY_CHUNK_SIZE = 10000
+
+# Ids shared with worker processes by _init_worker
+_activity_ids = {}
+
+
+def _chunk_rng(seed, kind, chunk):
+    """Independent random stream per chunk, so output does not depend on the worker count"""
+    return random.Random(f"{seed}:{kind}:{chunk}")
+
+
+def _skewed_index(rng, size):
+    """Index in [0, size) favouring the low end, giving a long-tail popularity"""
+    return int(size * rng.random() ** 2)
+
+
+def _init_worker(activity_ids):
+    _activity_ids.update(activity_ids)
+
+
+def _generate_hotels(task):
+    seed, chunk, count = task
+    return Command().build_hotel_rows(_chunk_rng(seed, "hotels", chunk), count)
+
+
+def _generate_users(task):
+    seed, chunk, first_index, count = task
+    fake = Faker("en_IN")
+    fake.seed_instance(f"{seed}:users:{chunk}")
+    users = []
+    for index in range(first_index, first_index + count):
+        first_name = fake.first_name()
+        last_name = fake.last_name()
+        username = f"{first_name}.{last_name}{index}".lower().replace(" ", "")
+        users.append(
+            {
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{username}@example.com",
+            }
+        )
+    return users
+
+
+def _generate_bookings(task):
+    seed, chunk, first_index, count = task
+    rng = _chunk_rng(seed, "bookings", chunk)
+    user_ids = _activity_ids["user_ids"]
+    room_ids = _activity_ids["room_ids"]
+    today = date.today()
+    bookings = []
+    for index in range(first_index, first_index + count):
+        room = _skewed_index(rng, len(room_ids))
+        nights = rng.randint(1, 7)
+        check_in_date = today + timedelta(days=rng.randint(-365, 90))
+        check_out_date = check_in_date + timedelta(days=nights)
+        if check_out_date < today:
+            status = rng.choices(["checked_out", "cancelled"], [9, 1])[0]
+        elif check_in_date <= today:
+            status = "checked_in"
+        else:
+            status = rng.choices(["confirmed", "pending", "cancelled"], [7, 2, 1])[0]
+        price = _activity_ids["room_prices"][room]
+        bookings.append(
+            {
+                "user_id": int(user_ids[rng.randrange(len(user_ids))]),
+                "hotel_id": int(_activity_ids["room_hotel_ids"][room]),
+                "room_id": int(room_ids[room]),
+                "check_in_date": check_in_date,
+                "check_out_date": check_out_date,
+                "guests": rng.randint(1, int(_activity_ids["room_capacities"][room])),
+                "total_amount": Decimal(str(round(price * nights, 2))),
+                "booking_status": status,
+                "booking_reference": f"SB{index:010d}",
+            }
+        )
+    return bookings
+
+
+def _generate_reviews(task):
+    seed, chunk, candidates = task
+    rng = _chunk_rng(seed, "reviews", chunk)
+    reviews = []
+    for booking_id, user_id, hotel_id in candidates:
+        rating = min(5, max(1, round(rng.gauss(3.8, 1.0))))
+        reviews.append(
+            {
+                "booking_id": booking_id,
+                "user_id": user_id,
+                "hotel_id": hotel_id,
+                "rating": rating,
+                "title": rng.choice(REVIEW_TITLES[rating]),
+                "comment": REVIEW_COMMENTS[rating],
+                "cleanliness_rating": min(5, max(1, rating + rng.randint(-1, 1))),
+                "service_rating": min(5, max(1, rating + rng.randint(-1, 1))),
+                "location_rating": min(5, max(1, rating + rng.randint(-1, 1))),
+                "value_rating": min(5, max(1, rating + rng.randint(-1, 1))),
+            }
+        )
+    return reviews
+
+
+def _generate_interactions(task):
+    seed, chunk, count = task
+    rng = _chunk_rng(seed, "interactions", chunk)
+    user_ids = _activity_ids["user_ids"]
+    hotel_ids = _activity_ids["hotel_ids"]
+    interaction_types = rng.choices(
+        list(INTERACTION_FREQUENCIES), list(INTERACTION_FREQUENCIES.values()), k=count
+    )
+    return [
+        {
+            "user_id": int(user_ids[_skewed_index(rng, len(user_ids))]),
+            "hotel_id": int(hotel_ids[_skewed_index(rng, len(hotel_ids))]),
+            "interaction_type": interaction_type,
+            "weight": Decimal(str(INTERACTION_WEIGHTS[interaction_type])),
+        }
+        for interaction_type in interaction_types
+    ]
+
+
+def _generate_searches(task):
+    seed, chunk, count = task
+    rng = _chunk_rng(seed, "searches", chunk)
+    user_ids = _activity_ids["user_ids"]
+    today = date.today()
+    searches = []
+    for _ in range(count):
+        city = rng.choice(CITIES)
+        check_in_date = today + timedelta(days=rng.randint(1, 120))
+        min_price = max_price = None
+        if rng.random() < 0.4:
+            min_price = Decimal(rng.randrange(1000, 5000, 500))
+            max_price = min_price + rng.randrange(2000, 20000, 1000)
+        searches.append(
+            {
+                "user_id": int(user_ids[rng.randrange(len(user_ids))]),
+                "city": city,
+                "area": rng.choice(AREAS_BY_CITY[city]) if rng.random() < 0.5 else "",
+                "check_in_date": check_in_date,
+                "check_out_date": check_in_date + timedelta(days=rng.randint(1, 7)),
+                "guests": rng.randint(1, 4),
+                "min_price": min_price,
+                "max_price": max_price,
+                "amenities": (
+                    rng.sample(["wifi", "pool", "parking", "gym", "spa", "restaurant"], rng.randint(1, 3))
+                    if rng.random() < 0.3
+                    else []
+                ),
+            }
+        )
+    return searches
 
 
 class Command(BaseCommand):
     """
-    Django management command to generate sample hotel and room data for the booking app using Faker.
-    This command creates a specified number of hotels, each with a random number of rooms, and populates them with realistic data such as names, addresses, amenities, descriptions, images, and pricing. The data is tailored for Indian cities and includes a variety of hotel and room types, each with appropriate amenities and descriptions.
+    Django management command to generate sample hotel, room, user and activity data for the booking app using Faker.
+    This command creates a specified number of hotels, each with a random number of rooms, and populates them with realistic data such as names, addresses, amenities, descriptions, images, and pricing. The data is tailored for Indian cities and includes a variety of hotel and room types, each with appropriate amenities and descriptions. It can also create users with bookings, reviews, interactions and search history, so the recommender has collaborative data to train on.
     Command-line arguments:
-        --clear   : Clears existing Hotel and Room data before generating new data.
-        --hotels  : Number of hotels to create (default: 20).
+        --clear        : Clears existing Hotel and Room data before generating new data.
+        --hotels       : Number of hotels to create (default: 20).
+        --users        : Number of users to create (default: 0).
+        --bookings     : Number of bookings to create across all users (default: 0).
+        --reviews      : Number of reviews to create from past stays (default: 0).
+        --interactions : Number of user interactions to create (default: 0).
+        --searches     : Number of search history entries to create (default: 0).
+        --seed         : Random seed; the same seed and counts produce the same dataset.
+        --workers      : Number of worker processes generating rows (default: CPU count).
+        --batch-size   : Rows per bulk insert (default: 5000).
     Key Features:
     - Supports multiple Indian cities and popular areas within each city.
     - Generates unique hotel names, addresses, coordinates, and contact information.
@@ -22,10 +403,13 @@ class Command(BaseCommand):
     - Creates rooms of various types (single, double, twin, suite, deluxe, family) with realistic amenities, sizes, and prices.
     - Uses hotel-related placeholder image URLs for hotels and rooms.
     - Produces detailed, context-aware descriptions for both hotels and rooms.
-    - Outputs progress and summary of created hotels and rooms to the console.
-    Intended for development and testing purposes to quickly populate the database with diverse and realistic sample data.
+    - Bookings, reviews and interactions follow a long-tail popularity, so a few hotels and users account for much of the activity.
+    - Reviews are written for past checked-out bookings and update the hotels' average ratings.
+    - Rows are generated in chunks by worker processes, each chunk with its own seeded random stream, and written with bulk_create. Millions of rows take minutes rather than hours.
+    - Outputs progress and summary of created data to the console.
+    Intended for development, testing and load-testing, to quickly populate the database with diverse and realistic sample data. All generated users share the password "password123".
     """
-    help = "Generate sample hotel and room data using Faker with hotel-related images"
+    help = "Generate sample hotel, room, user and activity data using Faker with hotel-related images"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -39,6 +423,54 @@ class Command(BaseCommand):
             default=20,
             help="Number of hotels to create (default: 20)",
         )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=0,
+            help="Number of users to create (default: 0)",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=0,
+            help="Number of bookings to create (default: 0)",
+        )
+        parser.add_argument(
+            "--reviews",
+            type=int,
+            default=0,
+            help="Number of reviews to create from past bookings (default: 0)",
+        )
+        parser.add_argument(
+            "--interactions",
+            type=int,
+            default=0,
+            help="Number of user interactions to create (default: 0)",
+        )
+        parser.add_argument(
+            "--searches",
+            type=int,
+            default=0,
+            help="Number of search history entries to create (default: 0)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Random seed for a reproducible dataset",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes generating rows (default: CPU count)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert (default: 5000)",
+        )
 
     def handle(self, *args, **options):
         if options["clear"]:
@@ -47,11 +479,49 @@ class Command(BaseCommand):
             Hotel.objects.all().delete()
             self.stdout.write(self.style.SUCCESS("Hotel related data cleared."))
 
+        seed = options["seed"]
+        if seed is None:
+            seed = random.randrange(2**32)
+            self.stdout.write(f"Using random seed {seed}")
+        self.seed = seed
+        self.batch_size = options["batch_size"]
+        self.workers = max(1, options["workers"])
+        if "fork" not in multiprocessing.get_all_start_methods():
+            # Workers inherit the configured Django app registry, which needs fork
+            self.workers = 1
+
         self.create_hotels(options["hotels"])
+        self.create_users(options["users"])
 
-        self.stdout.write(self.style.SUCCESS("Hotel data generation completed!"))
+        activity = {
+            name: options[name]
+            for name in ("bookings", "reviews", "interactions", "searches")
+            if options[name]
+        }
+        if activity:
+            if not User.objects.exists() or not Room.objects.exists():
+                self.stdout.write(
+                    self.style.WARNING(
+                        "Bookings, reviews, interactions and searches need users and hotels; skipping."
+                    )
+                )
+            else:
+                with self.worker_pool(self.load_activity_ids()) as pool:
+                    self.create_bookings(pool, activity.get("bookings", 0))
+                    self.create_reviews(pool, activity.get("reviews", 0))
+                    self.create_interactions(pool, activity.get("interactions", 0))
+                    self.create_searches(pool, activity.get("searches", 0))
 
-    def get_images(self, num_images=5):
+        if options["hotels"] or activity:
+            # Hotels and interactions are bulk inserted, which skips the
+            # incremental neighbour updates
+            similar = similar_hotels.rebuild_similar_hotels(self.batch_size)
+            self.stdout.write(f"Similar hotels built for {similar} hotels")
+
+        self.stdout.write(self.style.SUCCESS("Sample data generation completed!"))
+
+
+    def get_images(self, num_images=5, rng=random):
         li = [
     "https://www.oberoihotels.com/images/oberoihotels/exotic-vacations/ev-video-thumb.jpg",
     "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcTD45ICJU9KxXpr4EuhNrjO_tFgrpezSkWQAg&s",
@@ -65,7 +535,7 @@ class Command(BaseCommand):
         ]
         images = []
         for I in range(num_images):
-            value = random.randint(0, len(li)-1)
+            value = rng.randint(0, len(li)-1)
             images.append(li[value])
         # images = []   
         # for i in range(num_images):
@@ -78,7 +548,7 @@ class Command(BaseCommand):
         
         return images
 
-    def get_hotel_description(self, hotel_type, city, area, amenities):
+    def get_hotel_description(self, hotel_type, city, area, amenities, rng=random):
         """Generate realistic hotel descriptions based on type and amenities"""
 
         base_descriptions = {
@@ -135,7 +605,7 @@ class Command(BaseCommand):
         }
 
         # Select base description
-        description = random.choice(base_descriptions[hotel_type])
+        description = rng.choice(base_descriptions[hotel_type])
 
         # Add amenity-specific content
         amenity_descriptions = {
@@ -162,14 +632,14 @@ class Command(BaseCommand):
 
         # Add relevant amenity descriptions
         if amenities:
-            selected_amenities = random.sample(amenities, min(2, len(amenities)))
+            selected_amenities = rng.sample(amenities, min(2, len(amenities)))
             for amenity in selected_amenities:
                 if amenity in amenity_descriptions:
                     description += f" {amenity_descriptions[amenity]}"
 
         return description
 
-    def get_room_description(self, room_type, amenities, size_sqft):
+    def get_room_description(self, room_type, amenities, size_sqft, rng=random):
         """Generate realistic room descriptions based on type and amenities"""
         
         base_descriptions = {
@@ -211,7 +681,7 @@ class Command(BaseCommand):
             ],
         }
 
-        description = random.choice(base_descriptions[room_type])
+        description = rng.choice(base_descriptions[room_type])
         
         # Add size information
         if size_sqft:
@@ -238,276 +708,325 @@ class Command(BaseCommand):
 
         # Add relevant amenity descriptions
         if amenities:
-            selected_amenities = random.sample(amenities, min(3, len(amenities)))
+            selected_amenities = rng.sample(amenities, min(3, len(amenities)))
             for amenity in selected_amenities:
                 if amenity in amenity_descriptions:
                     description += f" {amenity_descriptions[amenity]}"
 
         return description
 
-    def create_hotels(self, num_hotels):
-        """Create sample hotels with rooms"""
+    def worker_pool(self, activity_ids=None):
+        """Process pool for row generation; an inline stand-in when running single-process"""
+        activity_ids = activity_ids or {}
+        if self.workers == 1:
+            _init_worker(activity_ids)
+            return _InlinePool()
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        return multiprocessing.get_context("fork").Pool(
+            self.workers, initializer=_init_worker, initargs=(activity_ids,)
+        )
 
-        cities = [
-            "Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata",
-            "Hyderabad", "Pune", "Ahmedabad", "Jaipur", "Goa",
-            "Kochi", "Coimbatore", "Mysore", "Udaipur", "Agra",
-            "Varanasi", "Rishikesh", "Manali", "Shimla", "Darjeeling"
-        ]
+    def generate(self, pool, func, tasks):
+        """Yield each task's rows in task order, keeping a bounded number of chunks in flight"""
+        window = self.workers * 2
+        for start in range(0, len(tasks), window):
+            yield from pool.imap(func, tasks[start:start + window])
 
-        areas_by_city = {
-            "Mumbai": ["Bandra", "Andheri", "Juhu", "Powai", "Colaba", "Marine Drive", "Worli", "Lower Parel"],
-            "Delhi": ["Connaught Place", "Karol Bagh", "Paharganj", "Aerocity", "Hauz Khas", "Khan Market", "Lajpat Nagar"],
-            "Bangalore": ["Koramangala", "Indiranagar", "Whitefield", "Electronic City", "MG Road", "Brigade Road", "Jayanagar"],
-            "Chennai": ["T. Nagar", "Anna Nagar", "Adyar", "Velachery", "Mylapore", "Nungambakkam", "Besant Nagar"],
-            "Kolkata": ["Park Street", "Salt Lake", "Howrah", "Ballygunge", "New Market", "Esplanade", "Alipore"],
-            "Hyderabad": ["Banjara Hills", "Jubilee Hills", "Gachibowli", "Hitech City", "Secunderabad", "Begumpet", "Madhapur"],
-            "Pune": ["Koregaon Park", "Viman Nagar", "Hinjewadi", "Kothrud", "Camp", "Deccan", "Aundh"],
-            "Ahmedabad": ["Satellite", "Vastrapur", "Navrangpura", "Prahlad Nagar", "CG Road", "Maninagar", "Bopal"],
-            "Jaipur": ["C-Scheme", "Malviya Nagar", "Vaishali Nagar", "Pink City", "MI Road", "Tonk Road", "Mansarovar"],
-            "Goa": ["Calangute", "Baga", "Anjuna", "Panaji", "Candolim", "Arambol", "Palolem", "Vasco"],
-            "Kochi": ["Marine Drive", "Fort Kochi", "Ernakulam", "Kakkanad", "Edappally", "Vytilla", "MG Road"],
-            "Coimbatore": ["RS Puram", "Gandhipuram", "Race Course", "Saibaba Colony", "Peelamedu", "Singanallur"],
-            "Mysore": ["Sayyaji Rao Road", "Chamundi Hills", "Jayalakshmipuram", "Kuvempunagar", "Hebbal", "Vijayanagar"],
-            "Udaipur": ["City Palace", "Lake Pichola", "Fateh Sagar", "Sukhadia Circle", "Hiran Magri", "Sector 14"],
-            "Agra": ["Taj Ganj", "Sadar Bazaar", "Civil Lines", "Dayalbagh", "Sikandra", "Fatehabad Road"],
-            "Varanasi": ["Dashashwamedh Ghat", "Assi Ghat", "Godowlia", "Lanka", "Cantonment", "Sigra"],
-            "Rishikesh": ["Laxman Jhula", "Ram Jhula", "Tapovan", "Swarg Ashram", "Muni Ki Reti", "Haridwar Road"],
-            "Manali": ["Mall Road", "Old Manali", "Vashisht", "Solang Valley", "Hadimba", "Club House"],
-            "Shimla": ["Mall Road", "Ridge", "Lakkar Bazaar", "Sanjauli", "Summer Hill", "Kufri Road"],
-            "Darjeeling": ["Mall Road", "Chowrasta", "Happy Valley", "Lebong", "Jalapahar", "Observatory Hill"]
-        }
+    def bulk_insert(self, model, rows):
+        with transaction.atomic():
+            return model.objects.bulk_create(
+                [model(**row) for row in rows], batch_size=self.batch_size
+            )
 
-        hotel_types = ["budget", "mid_range", "luxury", "resort", "boutique"]
+    def build_hotel_rows(self, rng, count):
+        """Generate field values for count hotels and their rooms"""
+        hotel_rows = []
+        for i in range(count):
+            city = rng.choice(CITIES)
+            area = rng.choice(AREAS_BY_CITY[city])
+            hotel_type = rng.choice(HOTEL_TYPES)
 
-        hotel_name_prefixes = [
-            "Grand", "Royal", "Comfort", "Luxury", "Budget", "Premium", "City", "Garden", 
-            "Ocean", "Mountain", "Heritage", "Modern", "Executive", "Family", "Business",
-            "Boutique", "Classic", "Elite", "Golden", "Silver", "Crown", "Palace", "Manor",
-            "Plaza", "Regency", "Imperial", "Majestic", "Serene", "Tranquil", "Elegant"
-        ]
+            prefix = rng.choice(HOTEL_NAME_PREFIXES)
+            suffix = rng.choice(HOTEL_NAME_SUFFIXES)
 
-        hotel_name_suffixes = [
-            "Hotel", "Inn", "Resort", "Suites", "Lodge", "Palace", "Residency", "Stay",
-            "Retreat", "Manor", "Plaza", "Grand", "Towers", "Gardens", "Heights", "View",
-            "Paradise", "Sanctuary", "Oasis", "Haven", "Escape", "Hideaway"
-        ]
+            star_rating = rng.choice(STAR_RATINGS_BY_TYPE[hotel_type])
+            amenities = rng.choice(AMENITIES_BY_TYPE[hotel_type])
 
-        amenities_by_type = {
-            "luxury": [
-                ["wifi", "pool", "spa", "gym", "restaurant", "bar", "room_service", "concierge", "valet_parking"],
-                ["wifi", "pool", "spa", "gym", "restaurant", "bar", "business_center", "conference_room", "laundry"],
-                ["wifi", "spa", "gym", "restaurant", "bar", "room_service", "concierge", "tennis_court", "golf_course"],
-                ["wifi", "pool", "spa", "restaurant", "bar", "room_service", "valet_parking", "shuttle_service", "laundry"]
-            ],
-            "resort": [
-                ["wifi", "pool", "spa", "gym", "restaurant", "bar", "beach_access", "kids_club", "tennis_court"],
-                ["wifi", "pool", "spa", "restaurant", "bar", "golf_course", "beach_access", "shuttle_service", "laundry"],
-                ["wifi", "pool", "gym", "restaurant", "bar", "kids_club", "tennis_court", "room_service", "concierge"],
-                ["wifi", "spa", "restaurant", "bar", "beach_access", "golf_course", "shuttle_service", "valet_parking"]
-            ],
-            "boutique": [
-                ["wifi", "restaurant", "bar", "gym", "spa", "concierge", "laundry"],
-                ["wifi", "restaurant", "bar", "room_service", "business_center", "parking"],
-                ["wifi", "gym", "restaurant", "bar", "spa", "shuttle_service", "pet_friendly"],
-                ["wifi", "restaurant", "bar", "concierge", "laundry", "valet_parking"]
-            ],
-            "mid_range": [
-                ["wifi", "parking", "restaurant", "gym", "business_center", "laundry"],
-                ["wifi", "pool", "restaurant", "bar", "parking", "room_service"],
-                ["wifi", "gym", "restaurant", "parking", "shuttle_service", "laundry"],
-                ["wifi", "restaurant", "bar", "business_center", "parking", "conference_room"]
-            ],
-            "budget": [
-                ["wifi", "parking", "restaurant", "laundry"],
-                ["wifi", "parking", "breakfast", "shuttle_service"],
-                ["wifi", "restaurant", "parking", "business_center"],
-                ["wifi", "parking", "laundry", "pet_friendly"]
-            ]
-        }
+            base_lat, base_lng = CITY_COORDINATES.get(city, (28.7041, 77.1025))
+            # Add small random offset for area variation
+            latitude = base_lat + rng.uniform(-0.05, 0.05)
+            longitude = base_lng + rng.uniform(-0.05, 0.05)
 
-        room_types = ["single", "double", "twin", "suite", "family", "deluxe"]
+            hotel = {
+                "name": f"{prefix} {suffix} {area}",
+                "description": self.get_hotel_description(hotel_type, city, area, amenities, rng),
+                "hotel_type": hotel_type,
+                "city": city,
+                "area": area,
+                "address": f"{rng.randint(1, 999)} {area} Road, {area}, {city}, India",
+                "latitude": Decimal(str(round(latitude, 6))),
+                "longitude": Decimal(str(round(longitude, 6))),
+                "amenities": amenities,
+                "star_rating": star_rating,
+                "average_rating": rng.randint(0, star_rating),
+                "images": self.get_images(rng.randint(3, 6), rng),
+                "contact_phone": f"+91-{rng.randint(7000000000, 9999999999)}",
+            }
 
-        room_amenities_by_type = {
-            "single": [
-                ["ac", "tv", "wifi", "work_desk", "coffee_maker"],
-                ["ac", "tv", "wifi", "safe", "hair_dryer"],
-                ["ac", "tv", "wifi", "minibar", "iron"],
-                ["ac", "tv", "wifi", "work_desk", "shower"]
-            ],
-            "double": [
-                ["ac", "tv", "wifi", "minibar", "safe", "hair_dryer"],
-                ["ac", "tv", "wifi", "work_desk", "coffee_maker", "iron"],
-                ["ac", "tv", "wifi", "minibar", "balcony", "bathtub"],
-                ["ac", "tv", "wifi", "safe", "room_service", "shower"]
-            ],
-            "twin": [
-                ["ac", "tv", "wifi", "work_desk", "coffee_maker", "safe"],
-                ["ac", "tv", "wifi", "minibar", "iron", "hair_dryer"],
-                ["ac", "tv", "wifi", "balcony", "shower", "safe"],
-                ["ac", "tv", "wifi", "work_desk", "room_service", "bathtub"]
-            ],
-            "suite": [
-                ["ac", "tv", "wifi", "minibar", "balcony", "jacuzzi", "safe", "room_service"],
-                ["ac", "tv", "wifi", "kitchenette", "balcony", "bathtub", "work_desk", "coffee_maker"],
-                ["ac", "tv", "wifi", "minibar", "jacuzzi", "safe", "iron", "hair_dryer"],
-                ["ac", "tv", "wifi", "kitchenette", "balcony", "room_service", "work_desk", "bathtub"]
-            ],
-                        "deluxe": [
-                ["ac", "tv", "wifi", "minibar", "balcony", "safe", "bathtub", "hair_dryer"],
-                ["ac", "tv", "wifi", "minibar", "jacuzzi", "room_service", "work_desk", "coffee_maker"],
-                ["ac", "tv", "wifi", "balcony", "safe", "bathtub", "iron", "hair_dryer"],
-                ["ac", "tv", "wifi", "minibar", "jacuzzi", "room_service", "safe", "bathtub"]
-            ],
-            "family": [
-                ["ac", "tv", "wifi", "kitchenette", "safe", "iron", "hair_dryer", "bathtub"],
-                ["ac", "tv", "wifi", "minibar", "balcony", "safe", "room_service", "shower"],
-                ["ac", "tv", "wifi", "kitchenette", "work_desk", "coffee_maker", "iron", "bathtub"],
-                ["ac", "tv", "wifi", "minibar", "safe", "hair_dryer", "room_service", "shower"]
-            ]
-        }
+            # Create 3-8 rooms per hotel
+            rooms = []
+            for j in range(rng.randint(3, 8)):
+                room_type = rng.choice(ROOM_TYPES)
+
+                price = (
+                    star_rating
+                    * 1000
+                    * ROOM_PRICE_MULTIPLIER[room_type]
+                    * HOTEL_TYPE_PRICE_MULTIPLIER[hotel_type]
+                )
+                price += rng.randint(-500, 1000)
+                price = max(price, 800)
+
+                room_amenities = rng.choice(ROOM_AMENITIES_BY_TYPE[room_type])
+                size_sqft = rng.randint(*ROOM_SIZE_RANGE[room_type])
+                rooms.append(
+                    {
+                        "room_type": room_type,
+                        "room_number": f"{j+1:03d}",
+                        "capacity": ROOM_CAPACITY[room_type],
+                        "price_per_night": Decimal(str(round(price, 2))),
+                        "amenities": room_amenities,
+                        "description": self.get_room_description(room_type, room_amenities, size_sqft, rng),
+                        "size_sqft": size_sqft,
+                        "images": self.get_images(rng.randint(2, 4), rng),
+                    }
+                )
+            hotel_rows.append((hotel, rooms))
+        return hotel_rows
+
+    def create_hotels(self, num_hotels):
+        """Create sample hotels with rooms"""
+        # Names are made unique here rather than in the workers, so they are unique across chunks
+        taken_names = set(Hotel.objects.values_list("name", flat=True))
+        tasks = [
+            (self.seed, chunk, min(HOTEL_CHUNK_SIZE, num_hotels - start))
+            for chunk, start in enumerate(range(0, num_hotels, HOTEL_CHUNK_SIZE))
+        ]
 
         hotels_created = 0
         rooms_created = 0
 
-        for i in range(num_hotels):
-            city = random.choice(cities)
-            area = random.choice(areas_by_city[city])
-            hotel_type = random.choice(hotel_types)
-            
-            prefix = random.choice(hotel_name_prefixes)
-            suffix = random.choice(hotel_name_suffixes)
-            hotel_name = f"{prefix} {suffix} {area}"
-            
-            counter = 1
-            original_name = hotel_name
-            while Hotel.objects.filter(name=hotel_name).exists():
-                hotel_name = f"{original_name} {counter}"
-                counter += 1
-
-            star_rating_map = {
-                "budget": random.choice([2, 3]),
-                "mid_range": random.choice([3, 4]),
-                "luxury": random.choice([4, 5]),
-                "resort": random.choice([4, 5]),
-                "boutique": random.choice([3, 4, 5])
-            }
+        with self.worker_pool() as pool:
+            for hotel_rows in self.generate(pool, _generate_hotels, tasks):
+                for hotel, _ in hotel_rows:
+                    original_name = hotel["name"]
+                    counter = 1
+                    while hotel["name"] in taken_names:
+                        hotel["name"] = f"{original_name} {counter}"
+                        counter += 1
+                    taken_names.add(hotel["name"])
+                    hotel["contact_email"] = (
+                        f"info@{hotel['name'].lower().replace(' ', '').replace(',', '')}.com"
+                    )
 
-            star_rating = star_rating_map[hotel_type]
-            amenities = random.choice(amenities_by_type[hotel_type])
-
-            city_coordinates = {
-                "Mumbai": (19.0760, 72.8777),
-                "Delhi": (28.7041, 77.1025),
-                "Bangalore": (12.9716, 77.5946),
-                "Chennai": (13.0827, 80.2707),
-                "Kolkata": (22.5726, 88.3639),
-                "Hyderabad": (17.3850, 78.4867),
-                "Pune": (18.5204, 73.8567),
-                "Ahmedabad": (23.0225, 72.5714),
-                "Jaipur": (26.9124, 75.7873),
-                "Goa": (15.2993, 74.1240),
-                "Kochi": (9.9312, 76.2673),
-                "Coimbatore": (11.0168, 76.9558),
-                "Mysore": (12.2958, 76.6394),
-                "Udaipur": (24.5854, 73.7125),
-                "Agra": (27.1767, 78.0081),
-                "Varanasi": (25.3176, 82.9739),
-                "Rishikesh": (30.0869, 78.2676),
-                "Manali": (32.2396, 77.1887),
-                "Shimla": (31.1048, 77.1734),
-                "Darjeeling": (27.0360, 88.2627)
-            }
+                with transaction.atomic():
+                    hotels = self.bulk_insert(Hotel, [hotel for hotel, _ in hotel_rows])
+                    rooms = self.bulk_insert(
+                        Room,
+                        [
+                            {"hotel_id": hotel.pk, **room}
+                            for hotel, (_, room_rows) in zip(hotels, hotel_rows)
+                            for room in room_rows
+                        ],
+                    )
+                    # bulk_create sends no Room signals, so set the price bounds here
+                    Hotel.objects.filter(
+                        pk__gte=hotels[0].pk, pk__lte=hotels[-1].pk
+                    ).update(**Hotel.price_bound_updates())
 
-            base_lat, base_lng = city_coordinates.get(city, (28.7041, 77.1025))
-            # Add small random offset for area variation
-            latitude = base_lat + random.uniform(-0.05, 0.05)
-            longitude = base_lng + random.uniform(-0.05, 0.05)
-
-            hotel = Hotel.objects.create(
-                name=hotel_name,
-                description=self.get_hotel_description(hotel_type, city, area, amenities),
-                hotel_type=hotel_type,
-                city=city,
-                area=area,
-                address=f"{random.randint(1, 999)} {area} Road, {area}, {city}, India",
-                latitude=Decimal(str(round(latitude, 6))),
-                longitude=Decimal(str(round(longitude, 6))),
-                amenities=amenities,
-                star_rating=star_rating,
-                average_rating=random.randint(0, star_rating),
-                images=self.get_images(random.randint(3, 6)),
-                contact_phone=f"+91-{random.randint(7000000000, 9999999999)}",
-                contact_email=f"info@{hotel_name.lower().replace(' ', '').replace(',', '')}.com"
-            )
+                hotels_created += len(hotels)
+                rooms_created += len(rooms)
+                self.stdout.write(f"Hotels created: {hotels_created}/{num_hotels}")
 
-            hotels_created += 1
+        self.stdout.write(f"Hotels created: {hotels_created}")
+        self.stdout.write(f"Rooms created: {rooms_created}")
+        self.stdout.write(self.style.SUCCESS(f"Successfully generated {hotels_created} hotels with {rooms_created} rooms using hotel-related images!"))
 
-            # Create 3-8 rooms per hotel
-            for j in range(random.randint(3, 8)):
-                room_type = random.choice(room_types)
-
-                # Set capacity based on room type
-                capacity_map = {
-                    "single": 1,
-                    "double": 2,
-                    "twin": 2,
-                    "suite": 4,
-                    "deluxe": 2,
-                    "family": 6
-                }
+    def create_users(self, num_users):
+        """Create sample users sharing one password hash"""
+        if not num_users:
+            return
+        password = make_password(SAMPLE_USER_PASSWORD)
+        # Usernames carry a running index. Each generated user's index is below
+        # its own id, so starting from the highest id never repeats one, even
+        # after users were deleted
+        first_index = User.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        tasks = [
+            (self.seed, chunk, first_index + start, min(ACTIVITY_CHUNK_SIZE, num_users - start))
+            for chunk, start in enumerate(range(0, num_users, ACTIVITY_CHUNK_SIZE))
+        ]
 
-                # Set size based on room type
-                size_map = {
-                    "single": random.randint(200, 300),
-                    "double": random.randint(300, 450),
-                    "twin": random.randint(350, 500),
-                    "suite": random.randint(600, 1000),
-                    "deluxe": random.randint(400, 600),
-                    "family": random.randint(500, 800)
-                }
+        users_created = 0
+        with self.worker_pool() as pool:
+            for rows in self.generate(pool, _generate_users, tasks):
+                users_created += len(
+                    self.bulk_insert(User, [{**row, "password": password} for row in rows])
+                )
+        self.stdout.write(f"Users created: {users_created}")
 
-                # Set price range based on hotel star rating and room type
-                base_price = star_rating * 1000
+    def load_activity_ids(self):
+        """Ids the activity generators sample from, as compact arrays"""
+        rooms = Room.objects.order_by("id").values_list(
+            "id", "hotel_id", "capacity", "price_per_night"
+        )
+        room_ids, room_hotel_ids, room_capacities, room_prices = [], [], [], []
+        for room_id, hotel_id, capacity, price in rooms.iterator(chunk_size=self.batch_size):
+            room_ids.append(room_id)
+            room_hotel_ids.append(hotel_id)
+            room_capacities.append(capacity)
+            room_prices.append(float(price))
+        return {
+            "user_ids": np.fromiter(
+                User.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=self.batch_size),
+                dtype=np.int64,
+            ),
+            "hotel_ids": np.fromiter(
+                Hotel.objects.filter(is_active=True).order_by("id").values_list("id", flat=True).iterator(chunk_size=self.batch_size),
+                dtype=np.int64,
+            ),
+            "room_ids": np.asarray(room_ids, dtype=np.int64),
+            "room_hotel_ids": np.asarray(room_hotel_ids, dtype=np.int64),
+            "room_capacities": np.asarray(room_capacities, dtype=np.int32),
+            "room_prices": np.asarray(room_prices, dtype=np.float64),
+        }
 
-                price_multiplier = {
-                    "single": 0.7,
-                    "double": 1.0,
-                    "twin": 1.0,
-                    "suite": 2.5,
-                    "deluxe": 1.8,
-                    "family": 2.0
+    def create_bookings(self, pool, num_bookings):
+        if not num_bookings:
+            return
+        # References continue after the highest generated one and cannot clash with the 8 character default
+        last_reference = Booking.objects.filter(
+            booking_reference__regex=r"^SB[0-9]{10}$"
+        ).aggregate(last=Max("booking_reference"))["last"]
+        first_index = int(last_reference[2:]) + 1 if last_reference else 0
+        tasks = [
+            (self.seed, chunk, first_index + start, min(ACTIVITY_CHUNK_SIZE, num_bookings - start))
+            for chunk, start in enumerate(range(0, num_bookings, ACTIVITY_CHUNK_SIZE))
+        ]
+        bookings_created = 0
+        nights_created = 0
+        held = set(RoomNight.objects.values_list("room_id", "night").iterator(chunk_size=self.batch_size))
+        for rows in self.generate(pool, _generate_bookings, tasks):
+            # A room-night can be held once: a generated stay overlapping an earlier one is cancelled
+            for row in rows:
+                if row["booking_status"] not in Booking.OCCUPYING_STATUSES:
+                    continue
+                stay = {
+                    (row["room_id"], row["check_in_date"] + timedelta(days=i))
+                    for i in range((row["check_out_date"] - row["check_in_date"]).days)
                 }
+                if held.isdisjoint(stay):
+                    held.update(stay)
+                else:
+                    row["booking_status"] = "cancelled"
 
-                # Adjust price based on hotel type
-                type_multiplier = {
-                    "budget": 0.6,
-                    "mid_range": 1.0,
-                    "luxury": 2.0,
-                    "resort": 1.8,
-                    "boutique": 1.5
-                }
+            bookings = self.bulk_insert(Booking, rows)
+            bookings_created += len(bookings)
 
-                price = base_price * price_multiplier[room_type] * type_multiplier[hotel_type]
-                price += random.randint(-500, 1000)
-                price = max(price, 800)
+            # bulk_create sends no post_save, so hold the rooms' nights here
+            nights = []
+            for booking in bookings:
+                if booking.occupies_room:
+                    nights.extend(
+                        RoomNight.for_stay(
+                            booking.pk,
+                            booking.room_id,
+                            booking.check_in_date,
+                            booking.check_out_date,
+                        )
+                    )
+            with transaction.atomic():
+                RoomNight.objects.bulk_create(nights, batch_size=self.batch_size)
+            nights_created += len(nights)
+        self.stdout.write(f"Bookings created: {bookings_created} ({nights_created} room nights)")
+
+    def create_reviews(self, pool, num_reviews):
+        """Review a random sample of past stays, at most one review per user and hotel"""
+        if not num_reviews:
+            return
+        rng = _chunk_rng(self.seed, "review-sample", 0)
+        reviewed = set(Review.objects.values_list("user_id", "hotel_id").iterator(chunk_size=self.batch_size))
+        candidates = list(
+            Booking.objects.filter(booking_status="checked_out", review__isnull=True)
+            .order_by("id")
+            .values_list("id", "user_id", "hotel_id")
+            .iterator(chunk_size=self.batch_size)
+        )
+        rng.shuffle(candidates)
 
-                room_number = f"{j+1:03d}"
-                room_amenities = random.choice(room_amenities_by_type[room_type])
-                size_sqft = size_map[room_type]
-                Room.objects.create(
-                    hotel=hotel,
-                    room_type=room_type,
-                    room_number=room_number,
-                    capacity=capacity_map[room_type],
-                    price_per_night=Decimal(str(round(price, 2))),
-                    amenities=room_amenities,
-                    description=self.get_room_description(room_type, room_amenities, size_sqft),
-                    size_sqft=size_sqft,
-                    images=self.get_images(random.randint(2, 4)),
+        selected = []
+        for booking_id, user_id, hotel_id in candidates:
+            if (user_id, hotel_id) not in reviewed:
+                reviewed.add((user_id, hotel_id))
+                selected.append((booking_id, user_id, hotel_id))
+                if len(selected) == num_reviews:
+                    break
+        if len(selected) < num_reviews:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Only {len(selected)} past bookings can be reviewed; create more bookings for {num_reviews} reviews."
                 )
-                rooms_created += 1
+            )
 
-        self.stdout.write(f"Hotels created: {hotels_created}")
-        self.stdout.write(f"Rooms created: {rooms_created}")
-        self.stdout.write(self.style.SUCCESS(f"Successfully generated {hotels_created} hotels with {rooms_created} rooms using hotel-related images!"))
+        tasks = [
+            (self.seed, chunk, selected[start:start + ACTIVITY_CHUNK_SIZE])
+            for chunk, start in enumerate(range(0, len(selected), ACTIVITY_CHUNK_SIZE))
+        ]
+        reviews_created = 0
+        for rows in self.generate(pool, _generate_reviews, tasks):
+            reviews_created += len(self.bulk_insert(Review, rows))
+
+        # bulk_create skips Review.save, so recompute the reviewed hotels' ratings in one statement
+        Hotel.objects.filter(id__in=Review.objects.values("hotel_id")).update(
+            **Hotel.rating_updates()
+        )
+        self.stdout.write(f"Reviews created: {reviews_created}")
+
+    def create_interactions(self, pool, num_interactions):
+        if not num_interactions:
+            return
+        tasks = [
+            (self.seed, chunk, min(ACTIVITY_CHUNK_SIZE, num_interactions - start))
+            for chunk, start in enumerate(range(0, num_interactions, ACTIVITY_CHUNK_SIZE))
+        ]
+        interactions_created = 0
+        for rows in self.generate(pool, _generate_interactions, tasks):
+            interactions_created += len(self.bulk_insert(UserInteraction, rows))
+        self.stdout.write(f"Interactions created: {interactions_created}")
+
+    def create_searches(self, pool, num_searches):
+        if not num_searches:
+            return
+        tasks = [
+            (self.seed, chunk, min(ACTIVITY_CHUNK_SIZE, num_searches - start))
+            for chunk, start in enumerate(range(0, num_searches, ACTIVITY_CHUNK_SIZE))
+        ]
+        searches_created = 0
+        for rows in self.generate(pool, _generate_searches, tasks):
+            searches_created += len(self.bulk_insert(SearchHistory, rows))
+        # The location scorer reads per-user rollups, which bulk inserts skip
+        rollups = search_history.rebuild_rollups(self.batch_size)
+        self.stdout.write(f"Search history created: {searches_created} ({rollups} user rollups)")
+
+
+class _InlinePool:
+    """Single-process stand-in for multiprocessing.Pool"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def imap(self, func, tasks):
+        return map(func, tasks)
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking.models import Hotel
+
+
+class Command(BaseCommand):
+    """
+    Django management command to recompute the amenity bitmask of every hotel from its amenities list.
+    The mask is kept in sync whenever a hotel is saved; this command backfills hotels written before the column existed, or changed with queryset updates that bypass saving. Hotels are processed in chunks and only changed masks are written.
+    Command-line arguments:
+        --batch-size : Hotels processed per chunk (default: 2000).
+    """
+
+    help = "Recompute hotel amenity bitmasks from their amenities lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Hotels processed per chunk (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        amenity_field = Hotel._meta.get_field("amenity_mask")
+        batch_size = options["batch_size"]
+
+        updated = 0
+        last_id = 0
+        while True:
+            hotels = list(
+                Hotel.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", "amenities", "amenity_mask")[:batch_size]
+            )
+            if not hotels:
+                break
+            last_id = hotels[-1].id
+
+            changed = []
+            for hotel in hotels:
+                mask = amenity_field.mask(hotel.amenities)
+                if mask != hotel.amenity_mask:
+                    hotel.amenity_mask = mask
+                    changed.append(hotel)
+            with transaction.atomic():
+                Hotel.objects.bulk_update(changed, ["amenity_mask"])
+            updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated amenity masks for {updated} hotels"))
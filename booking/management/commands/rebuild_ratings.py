@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking.models import Hotel
+
+
+class Command(BaseCommand):
+    """
+    Django management command to recompute every hotel's rating totals from its reviews.
+    Ratings are normally maintained incrementally as reviews are saved and deleted; this command recomputes rating_sum, total_reviews and average_rating for all hotels in a single set-based UPDATE, for use after bulk data loads or to repair drift.
+    """
+
+    help = "Recompute hotel rating totals from reviews in one pass"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Hotel.objects.update(**Hotel.rating_updates())
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {updated} hotels"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.services import search
+
+
+class Command(BaseCommand):
+    """
+    Django management command to create or rebuild the hotel full-text search index.
+    The index is created by migrate and kept in sync by database triggers; this command creates it on databases migrated before it existed and re-reads every hotel into it, e.g. after restoring hotels from a backup with triggers disabled.
+    """
+
+    help = "Create or rebuild the SQLite FTS5 hotel search index"
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(
+                self.style.WARNING("FTS5 is unavailable; hotel search uses LIKE queries")
+            )
+            return
+
+        if not search.create_search_index():
+            raise CommandError("Hotel table does not exist; run migrate first")
+        search.rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS("Rebuilt hotel search index"))
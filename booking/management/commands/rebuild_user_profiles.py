@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserPreference
+from booking.models import UserProfileVector
+from booking.services import user_profiles
+
+
+class Command(BaseCommand):
+    """
+    Django management command to rebuild the stored user profile vectors from scratch.
+    Profiles are normally maintained incrementally as users book, review and change preferences; this command backfills them after bulk data loads or changes to how profiles are built.
+    """
+
+    help = "Rebuild stored user profile vectors from preferences, bookings and reviews"
+
+    def handle(self, *args, **options):
+        preferences = {
+            preference.user_id: preference
+            for preference in UserPreference.objects.all()
+        }
+
+        rebuilt = 0
+        for user_id in User.objects.values_list("id", flat=True).iterator():
+            UserProfileVector.objects.update_or_create(
+                user_id=user_id,
+                defaults={
+                    "preference_terms": dict(
+                        user_profiles.preference_terms(preferences.get(user_id))
+                    ),
+                    "history_terms": dict(user_profiles.history_terms(user_id)),
+                },
+            )
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} user profiles"))
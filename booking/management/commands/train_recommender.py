@@ -0,0 +1,119 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.services import model_store
+from booking.services.content_index import HotelFeatureIndex
+from booking.services.geo_index import HotelGeoIndex
+from booking.services.training import build_rating_frame, train_svd_model
+
+
+class Command(BaseCommand):
+    """
+    Django management command to train the recommendation models offline.
+    The hotel TF-IDF feature index and the haversine BallTree over hotel coordinates are built over all active hotels, and the collaborative filtering SVD model is fitted on all reviews and user interactions. All of them are saved to a new versioned directory under RECOMMENDER_MODEL_DIR. Once saved, the version is published so the recommendation service loads it instead of fitting models in the request path.
+    Command-line arguments:
+        --factors : Number of latent factors for SVD (default: 100).
+        --epochs  : Number of SGD epochs for SVD (default: 20).
+        --seed    : Random seed for reproducible training.
+        --keep    : Number of model versions to keep on disk (default: 3).
+    Intended to be run on a schedule (e.g. nightly cron).
+    """
+
+    help = "Train the recommendation models and publish a new model version"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--factors",
+            type=int,
+            default=100,
+            help="Number of latent factors for SVD (default: 100)",
+        )
+        parser.add_argument(
+            "--epochs",
+            type=int,
+            default=20,
+            help="Number of SGD epochs for SVD (default: 20)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Random seed for reproducible training",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=3,
+            help="Number of model versions to keep on disk (default: 3)",
+        )
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        metadata = {}
+
+        self.stdout.write("Building hotel feature index...")
+        content_index = HotelFeatureIndex.build()
+        if content_index is not None:
+            metadata["content"] = {
+                "hotels": len(content_index.hotel_ids),
+                "features": len(content_index.vectorizer.vocabulary_),
+            }
+            self.stdout.write(f"Hotels indexed: {len(content_index.hotel_ids)}")
+
+        self.stdout.write("Building hotel geo index...")
+        geo_index = HotelGeoIndex.build()
+        if geo_index is not None:
+            metadata["geo"] = {"hotels": len(geo_index.hotel_ids)}
+            self.stdout.write(f"Hotels located: {len(geo_index.hotel_ids)}")
+
+        self.stdout.write("Loading ratings...")
+        ratings = build_rating_frame()
+        self.stdout.write(f"Ratings loaded: {len(ratings)}")
+
+        svd_model = train_svd_model(
+            ratings,
+            n_factors=options["factors"],
+            n_epochs=options["epochs"],
+            random_state=options["seed"],
+        )
+        if svd_model is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Not enough ratings to train a collaborative model; skipping SVD."
+                )
+            )
+        else:
+            metadata["svd"] = {
+                "ratings": len(ratings),
+                "users": int(ratings["user_id"].nunique()),
+                "hotels": int(ratings["hotel_id"].nunique()),
+                "factors": options["factors"],
+                "epochs": options["epochs"],
+            }
+
+        if content_index is None and geo_index is None and svd_model is None:
+            self.stdout.write(self.style.WARNING("Nothing to publish."))
+            return
+
+        version = model_store.create_version()
+        if content_index is not None:
+            model_store.save_content_index(version, content_index)
+        if geo_index is not None:
+            model_store.save_geo_index(version, geo_index)
+        if svd_model is not None:
+            model_store.save_svd_model(version, svd_model)
+        model_store.save_metadata(
+            version,
+            {
+                "trained_at": timezone.now(),
+                "training_seconds": (timezone.now() - started_at).total_seconds(),
+                **metadata,
+            },
+        )
+        model_store.publish_version(version)
+
+        removed = model_store.prune_versions(options["keep"])
+        if removed:
+            self.stdout.write(f"Removed old versions: {', '.join(removed)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Published recommender model {version}"))
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from accounts.utility.field import ListField
+from accounts.utility.field import BitmaskField, ListField, SearchDocumentField
+from datetime import timedelta
 from decimal import Decimal
 
 
@@ -16,6 +19,32 @@ class Hotel(models.Model):
         ("boutique", "Boutique"),
     ]
 
+    # Bit positions of amenity_mask: append new amenities, never reorder
+    AMENITIES = [
+        "wifi",
+        "pool",
+        "spa",
+        "gym",
+        "restaurant",
+        "bar",
+        "room_service",
+        "concierge",
+        "valet_parking",
+        "business_center",
+        "conference_room",
+        "laundry",
+        "tennis_court",
+        "golf_course",
+        "shuttle_service",
+        "beach_access",
+        "kids_club",
+        "parking",
+        "pet_friendly",
+        "breakfast",
+        "airport_shuttle",
+        "ac",
+    ]
+
     name = models.CharField(max_length=200)
     description = models.TextField()
     hotel_type = models.CharField(
@@ -31,11 +60,21 @@ class Hotel(models.Model):
         max_digits=9, decimal_places=6, null=True, blank=True
     )
     amenities = ListField(blank=True, null=True)  # ['wifi', 'pool', 'gym', 'spa']
+    amenity_mask = BitmaskField(source="amenities", flags=AMENITIES)
     star_rating = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     total_reviews = models.IntegerField(default=0)
+    # Running sum of review ratings; average_rating is rating_sum / total_reviews
+    rating_sum = models.IntegerField(default=0)
+    # Price bounds of available rooms, kept current by Room save/delete signals
+    min_room_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, db_index=True
+    )
+    max_room_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
     images = ListField(blank=True, null=True)  # List of image URLs
     contact_phone = models.CharField(max_length=20)
     contact_email = models.EmailField()
@@ -47,38 +86,100 @@ class Hotel(models.Model):
 
     class Meta:
         ordering = ["-average_rating", "name"]
+        # Partial indexes over active hotels: is_active=True compiles to a bare
+        # column test, which SQLite cannot match against a leading index column
+        indexes = [
+            # Listing and popularity retrieval: best rated first
+            models.Index(
+                fields=["-average_rating", "-total_reviews"],
+                condition=models.Q(is_active=True),
+                name="hotel_active_rating_idx",
+            ),
+            models.Index(
+                fields=["city", "area"],
+                condition=models.Q(is_active=True),
+                name="hotel_active_city_area_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.city}"
 
     def update_rating(self):
-        """Update average rating based on reviews"""
-        reviews = self.reviews.all()
-        if reviews:
-            self.average_rating = (
-                reviews.aggregate(avg_rating=models.Avg("rating"))["avg_rating"] or 0.0
-            )
-            self.total_reviews = reviews.count()
-        else:
-            self.average_rating = 0.0
-            self.total_reviews = 0
-        self.save()
+        """Recompute the rating totals from all reviews; reviews keep them current incrementally"""
+        Hotel.objects.filter(pk=self.pk).update(**self.rating_updates())
+        self.refresh_from_db(fields=["rating_sum", "total_reviews", "average_rating"])
+
+    @staticmethod
+    def rating_updates():
+        """Update expressions recomputing the rating totals from reviews, usable on any Hotel queryset"""
+        reviews = Review.objects.filter(hotel=models.OuterRef("pk")).values("hotel")
+        rating_sum = Coalesce(
+            models.Subquery(reviews.annotate(total=models.Sum("rating")).values("total")),
+            0,
+        )
+        total_reviews = Coalesce(
+            models.Subquery(reviews.annotate(count=models.Count("id")).values("count")),
+            0,
+        )
+        return {
+            "rating_sum": rating_sum,
+            "total_reviews": total_reviews,
+            "average_rating": Hotel._average(rating_sum, total_reviews),
+        }
+
+    @staticmethod
+    def _average(rating_sum, total_reviews):
+        return models.Case(
+            models.When(
+                GreaterThan(total_reviews, 0),
+                then=Round(
+                    Cast(rating_sum, models.FloatField()) / total_reviews, 2
+                ),
+            ),
+            default=0.0,
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        )
+
+    @classmethod
+    def adjust_rating(cls, hotel_id, rating_delta, count_delta):
+        """
+        Apply a review change to the running totals in a single UPDATE. The
+        database adds the deltas, so concurrent reviews never lose an update,
+        and the cost is the same however many reviews the hotel has.
+        """
+        rating_sum = models.F("rating_sum") + rating_delta
+        total_reviews = models.F("total_reviews") + count_delta
+        cls.objects.filter(pk=hotel_id).update(
+            rating_sum=rating_sum,
+            total_reviews=total_reviews,
+            average_rating=cls._average(rating_sum, total_reviews),
+        )
+
+    @staticmethod
+    def price_bound_updates():
+        """Update expressions recomputing the room price bounds, usable on any Hotel queryset"""
+        available_rooms = Room.objects.filter(
+            hotel=models.OuterRef("pk"), is_available=True
+        ).values("hotel")
+        return {
+            "min_room_price": models.Subquery(
+                available_rooms.annotate(price=models.Min("price_per_night")).values("price")
+            ),
+            "max_room_price": models.Subquery(
+                available_rooms.annotate(price=models.Max("price_per_night")).values("price")
+            ),
+        }
 
     @property
     def min_price(self):
         """Get minimum room price for this hotel"""
-        min_price = self.rooms.filter(is_available=True).aggregate(
-            min_price=models.Min('price_per_night')
-        )['min_price']
-        return min_price or 0
+        return self.min_room_price or 0
 
     @property
     def max_price(self):
         """Get maximum room price for this hotel"""
-        max_price = self.rooms.filter(is_available=True).aggregate(
-            max_price=models.Max('price_per_night')
-        )['max_price']
-        return max_price or 0
+        return self.max_room_price or 0
 
     @property
     def price_range(self):
@@ -160,6 +261,8 @@ class Booking(models.Model):
         ("checked_out", "Checked Out"),
         ("cancelled", "Cancelled"),
     ]
+    # Statuses that hold the room for the booked nights
+    OCCUPYING_STATUSES = ["pending", "confirmed", "checked_in"]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookings")
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="bookings")
@@ -173,11 +276,26 @@ class Booking(models.Model):
     )
     special_requests = models.TextField(blank=True)
     booking_reference = models.CharField(max_length=20, unique=True)
+    # Sent with the booking form so a resubmitted request returns the first booking
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                name="booking_user_idempotency_uniq",
+            ),
+        ]
+        indexes = [
+            # Room availability: overlapping active bookings of one room
+            models.Index(
+                fields=["room", "booking_status", "check_in_date", "check_out_date"],
+                name="booking_room_status_dates_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_reference} - {self.user.username}"
@@ -186,6 +304,10 @@ class Booking(models.Model):
     def nights(self):
         return (self.check_out_date - self.check_in_date).days
 
+    @property
+    def occupies_room(self):
+        return self.booking_status in self.OCCUPYING_STATUSES
+
     def save(self, *args, **kwargs):
         if not self.booking_reference:
             import uuid
@@ -194,6 +316,84 @@ class Booking(models.Model):
         super().save(*args, **kwargs)
 
 
+class RoomNight(models.Model):
+    """
+    One night a room is held by a booking. Rows exist only for bookings in an
+    occupying status and are synced whenever a booking is saved, so "is this
+    room free from check-in to check-out" is a single index range probe instead
+    of an interval overlap scan over all bookings. The unique (room, night)
+    constraint makes the insert itself the claim: of two overlapping bookings
+    saved concurrently, one fails with IntegrityError.
+    """
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="booked_nights")
+    booking = models.ForeignKey(
+        Booking, on_delete=models.CASCADE, related_name="room_nights"
+    )
+    night = models.DateField()
+
+    class Meta:
+        constraints = [
+            # A night can be held by one booking only: claiming is an insert
+            models.UniqueConstraint(
+                fields=["room", "night"], name="roomnight_room_night_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.room} - {self.night}"
+
+    @classmethod
+    def for_stay(cls, booking_id, room_id, check_in_date, check_out_date):
+        """Unsaved rows for every night from check-in up to, not including, check-out"""
+        return [
+            cls(booking_id=booking_id, room_id=room_id, night=check_in_date + timedelta(days=i))
+            for i in range((check_out_date - check_in_date).days)
+        ]
+
+    @classmethod
+    def sync(cls, booking):
+        """
+        Bring a booking's nights in line with its room, dates and status. Nights
+        it keeps are left in place, so a status change such as confirmed to
+        checked_in never releases a night another booking could take meanwhile.
+        """
+        wanted = {}
+        if booking.occupies_room:
+            wanted = {
+                (night.room_id, night.night): night
+                for night in cls.for_stay(
+                    booking.pk,
+                    booking.room_id,
+                    booking.check_in_date,
+                    booking.check_out_date,
+                )
+            }
+        held = {
+            (room_id, night): night_id
+            for night_id, room_id, night in cls.objects.filter(
+                booking_id=booking.pk
+            ).values_list("id", "room_id", "night")
+        }
+
+        with transaction.atomic():
+            released = [night_id for key, night_id in held.items() if key not in wanted]
+            if released:
+                cls.objects.filter(id__in=released).delete()
+            claimed = [night for key, night in wanted.items() if key not in held]
+            if claimed:
+                cls.objects.bulk_create(claimed)
+
+    @classmethod
+    def booked(cls, check_in_date, check_out_date):
+        """Nights held between check-in and check-out, filtered by room with OuterRef"""
+        return cls.objects.filter(
+            room=models.OuterRef("pk"),
+            night__gte=check_in_date,
+            night__lt=check_out_date,
+        )
+
+
 class Review(models.Model):
     """Model representing a hotel review with various attributes and methods for managing reviews."""
 
@@ -230,9 +430,22 @@ class Review(models.Model):
         return f"{self.user.username} - {self.hotel.name} ({self.rating}/5)"
 
     def save(self, *args, **kwargs):
+        previous = None
+        if self.pk and not self._state.adding:
+            previous = (
+                Review.objects.filter(pk=self.pk)
+                .values_list("hotel_id", "rating")
+                .first()
+            )
         super().save(*args, **kwargs)
-        # Update hotel rating after saving review
-        self.hotel.update_rating()
+        # Update hotel rating totals after saving review
+        if previous is None:
+            Hotel.adjust_rating(self.hotel_id, self.rating, 1)
+        elif previous[0] != self.hotel_id:
+            Hotel.adjust_rating(previous[0], -previous[1], -1)
+            Hotel.adjust_rating(self.hotel_id, self.rating, 1)
+        elif previous[1] != self.rating:
+            Hotel.adjust_rating(self.hotel_id, self.rating - previous[1], 0)
 
 
 class UserInteraction(models.Model):
@@ -260,11 +473,39 @@ class UserInteraction(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # A user's recent interactions, newest first; hotel_id has its own FK index
+            models.Index(fields=["user", "-created_at"], name="interaction_user_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.interaction_type} - {self.hotel.name}"
 
 
+class HotelSearchEntry(models.Model):
+    """
+    A hotel's row in the SQLite FTS5 full-text index (see services/search.py).
+    The table is created and kept in sync by database triggers rather than
+    migrations, so the model is unmanaged and only used to join and rank
+    hotels by a `document__match` query.
+    """
+
+    hotel = models.OneToOneField(
+        Hotel,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_entry",
+    )
+    document = SearchDocumentField(db_column="booking_hotel_fts")
+    # BM25 score of the current match; lower is a better match
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "booking_hotel_fts"
+
+
 class SearchHistory(models.Model):
     """Store user search history for recommendations"""
 
@@ -287,6 +528,110 @@ class SearchHistory(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # A user's recent searches, newest first
+            models.Index(fields=["user", "-created_at"], name="search_user_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.city} ({self.check_in_date})"
+
+
+class UserSearchRollup(models.Model):
+    """
+    Per-user summary of searched places: one entry per city and area with a
+    search count and when it was last searched. Updated as searches are
+    recorded, so the location scorer reads one row instead of raw history,
+    which compact_search_history expires.
+    """
+
+    # Entries kept per user, most recently searched first
+    MAX_LOCATIONS = 20
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="search_rollup"
+    )
+    # [{"city": ..., "area": ..., "count": ..., "last_seen": ISO timestamp}]
+    locations = models.JSONField(default=list, blank=True)
+    total_searches = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s search rollup"
+
+    def add(self, city, area, seen_at, count=1):
+        """Count searches for a place; place names are matched case-insensitively"""
+        city, area = city.strip(), (area or "").strip()
+        key = (city.lower(), area.lower())
+        entry = {"city": city, "area": area, "count": 0, "last_seen": ""}
+        others = []
+        for existing in self.locations:
+            if (existing["city"].lower(), existing["area"].lower()) == key:
+                entry = existing
+            else:
+                others.append(existing)
+
+        entry["count"] += count
+        entry["last_seen"] = max(entry["last_seen"], seen_at.isoformat())
+        others.append(entry)
+        others.sort(key=lambda location: location["last_seen"], reverse=True)
+        self.locations = others[: self.MAX_LOCATIONS]
+        self.total_searches += count
+
+
+class UserProfileVector(models.Model):
+    """
+    Content profile of a user for recommendations, kept as analysed term counts.
+    Updated in place when the user books, reviews or changes preferences, so the
+    read path is a single lookup. Terms are weighted by the current TF-IDF model
+    at scoring time, which keeps the stored vector valid across retrains.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="profile_vector"
+    )
+    preference_terms = models.JSONField(default=dict, blank=True)
+    history_terms = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s profile vector"
+
+    @property
+    def terms(self):
+        """Combined term counts from preferences and booking/review history"""
+        terms = dict(self.history_terms)
+        for term, count in self.preference_terms.items():
+            terms[term] = terms.get(term, 0) + count
+        return terms
+
+
+class SimilarHotel(models.Model):
+    """
+    A precomputed item-to-item neighbour: one of the hotels most similar to a
+    hotel by content, location and co-interaction (see
+    services/similar_hotels.py). Built by the rebuild_similar_hotels command
+    and updated when a hotel is saved, so a hotel page reads its similar
+    hotels with one indexed lookup whatever the size of the catalog.
+    """
+
+    hotel = models.ForeignKey(
+        Hotel, on_delete=models.CASCADE, related_name="similar_entries"
+    )
+    similar_hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name="+")
+    # Weighted similarity in [0, 1]; higher is more similar
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hotel", "similar_hotel"], name="similarhotel_pair_uniq"
+            ),
+        ]
+        indexes = [
+            # A hotel's neighbours, most similar first
+            models.Index(fields=["hotel", "-score"], name="similarhotel_hotel_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} ~ {self.similar_hotel_id} ({self.score:.3f})"
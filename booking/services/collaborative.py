@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class CollaborativeModel:
+    """
+    Batch scorer built from the learned parameters of a trained surprise SVD model.
+    Scores every candidate hotel for a user with one matrix-vector product
+    instead of one SVD.predict call per hotel, with the same estimates:
+    unknown users and hotels fall back to the global mean and biases, and
+    results are clipped to the rating scale.
+    Attributes:
+        global_mean (float): Mean rating of the training set.
+        user_index (dict): Raw user id -> row in user_factors / user_biases.
+        item_ids (np.ndarray): Sorted raw hotel ids known to the model.
+        item_rows (np.ndarray): Row in item_factors / item_biases for each entry of item_ids.
+    Methods:
+        from_svd(svd_model):
+            Extracts factors, biases and id mappings from a fitted SVD model.
+        score(user_id, hotel_ids):
+            Estimated ratings for the given hotels, aligned with hotel_ids.
+        top_items(user_id, k):
+            Ids of the k hotels with the highest estimated rating for a user.
+    """
+
+    def __init__(
+        self,
+        global_mean,
+        user_index,
+        item_ids,
+        item_rows,
+        user_factors,
+        item_factors,
+        user_biases,
+        item_biases,
+        biased=True,
+        rating_scale=(1, 5),
+    ):
+        self.global_mean = global_mean
+        self.user_index = user_index
+        self.item_ids = item_ids
+        self.item_rows = item_rows
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_biases = user_biases
+        self.item_biases = item_biases
+        self.biased = biased
+        self.rating_scale = rating_scale
+
+    @classmethod
+    def from_svd(cls, svd_model):
+        trainset = svd_model.trainset
+        user_index = {
+            trainset.to_raw_uid(inner_id): inner_id
+            for inner_id in range(trainset.n_users)
+        }
+        raw_item_ids = np.fromiter(
+            (trainset.to_raw_iid(inner_id) for inner_id in range(trainset.n_items)),
+            dtype=np.int64,
+            count=trainset.n_items,
+        )
+        item_rows = np.argsort(raw_item_ids, kind="stable")
+        return cls(
+            global_mean=trainset.global_mean,
+            user_index=user_index,
+            item_ids=raw_item_ids[item_rows],
+            item_rows=item_rows,
+            user_factors=svd_model.pu,
+            item_factors=svd_model.qi,
+            user_biases=svd_model.bu,
+            item_biases=svd_model.bi,
+            biased=svd_model.biased,
+            rating_scale=trainset.rating_scale,
+        )
+
+    def _item_rows_for(self, hotel_ids):
+        if not len(self.item_ids):
+            return np.full(len(hotel_ids), -1)
+        positions = np.searchsorted(self.item_ids, hotel_ids)
+        positions[positions >= len(self.item_ids)] = 0
+        found = self.item_ids[positions] == hotel_ids
+        return np.where(found, self.item_rows[positions], -1)
+
+    def score(self, user_id, hotel_ids):
+        hotel_ids = np.asarray(hotel_ids, dtype=np.int64)
+        rows = self._item_rows_for(hotel_ids)
+        known_item = rows >= 0
+        user_row = self.user_index.get(user_id)
+
+        estimates = np.full(len(hotel_ids), self.global_mean, dtype=np.float64)
+        if self.biased:
+            estimates[known_item] += self.item_biases[rows[known_item]]
+            if user_row is not None:
+                estimates += self.user_biases[user_row]
+        elif user_row is not None:
+            # Without biases surprise can only estimate known (user, item) pairs
+            estimates[known_item] = 0.0
+
+        if user_row is not None:
+            estimates[known_item] += (
+                self.item_factors[rows[known_item]] @ self.user_factors[user_row]
+            )
+
+        return np.clip(estimates, *self.rating_scale)
+
+    def top_items(self, user_id, k):
+        """
+        Ranking over every known hotel; the global mean and user bias are the
+        same for all hotels, so they are left out
+        """
+        if not len(self.item_ids):
+            return np.empty(0, dtype=np.int64)
+
+        user_row = self.user_index.get(user_id)
+        if self.biased:
+            estimates = self.item_biases.copy()
+        else:
+            estimates = np.zeros(len(self.item_biases))
+        if user_row is not None:
+            estimates += self.item_factors @ self.user_factors[user_row]
+
+        if k < len(estimates):
+            rows = np.argpartition(-estimates, k - 1)[:k]
+        else:
+            rows = np.arange(len(estimates))
+        rows = rows[np.argsort(-estimates[rows], kind="stable")]
+
+        # Inner ids -> raw hotel ids
+        raw_ids = np.empty(len(self.item_ids), dtype=np.int64)
+        raw_ids[self.item_rows] = self.item_ids
+        return raw_ids[rows]
@@ -0,0 +1,150 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ..models import Hotel
+
+VECTORIZER_OPTIONS = {"stop_words": "english", "max_features": 1000}
+
+# Same tokenisation as the fitted vectorizer; needs no vocabulary
+analyze_features = TfidfVectorizer(**VECTORIZER_OPTIONS).build_analyzer()
+
+
+def amenities_from_mask(amenity_mask):
+    """
+    Amenity features of a hotel: only those with a bit in Hotel.amenity_mask,
+    so hotel indexes and user profiles share one vocabulary. Decoding is
+    memoised per distinct combination.
+    """
+    return Hotel._meta.get_field("amenity_mask").values_from_mask(amenity_mask)
+
+
+def normalize_amenities(amenities):
+    """A raw amenity list reduced to the vocabulary of amenities_from_mask"""
+    return amenities_from_mask(Hotel._meta.get_field("amenity_mask").mask(amenities))
+
+
+def hotel_feature_text(city, area, hotel_type, amenities, average_rating):
+    """Feature string used for content-based matching of a hotel"""
+    features = [city, area, hotel_type]
+    features.extend(amenities or [])
+    features.append(f"star_{average_rating:.2f}")
+    features.append(f"rating_{int(average_rating)}")
+    return " ".join(features)
+
+
+class HotelFeatureIndex:
+    """
+    Precomputed TF-IDF vectors for all active hotels.
+    Attributes:
+        vectorizer (TfidfVectorizer): Vectorizer fitted on the hotel feature strings.
+        hotel_ids (np.ndarray): Sorted hotel ids, one per matrix row.
+        matrix (scipy.sparse.csr_matrix): L2-normalised hotel vectors; its arrays may be memory-mapped.
+        postings (scipy.sparse.csr_matrix): Transpose of matrix (term x hotel row), an inverted index for retrieval.
+    Methods:
+        build(hotels=None):
+            Fits the vectorizer and vectorizes every active hotel.
+        rows_for(hotel_ids):
+            Maps hotel ids to matrix rows (-1 for hotels missing from the index).
+        vectorize_terms(term_counts):
+            TF-IDF vector for pre-analysed term counts, without re-tokenising text.
+        score(term_counts, hotel_ids):
+            Cosine similarity between a user profile and the given hotels.
+        nearest(term_counts, k):
+            Ids of the k hotels most similar to a user profile, touching only the postings of the profile's terms.
+    """
+
+    def __init__(self, vectorizer, hotel_ids, matrix, postings=None):
+        self.vectorizer = vectorizer
+        self.hotel_ids = hotel_ids
+        self.matrix = matrix
+        self.postings = postings if postings is not None else matrix.T.tocsr()
+
+    @classmethod
+    def build(cls, hotels=None, chunk_size=10000):
+        if hotels is None:
+            hotels = Hotel.objects.filter(is_active=True)
+
+        rows = hotels.order_by("id").values_list(
+            "id", "city", "area", "hotel_type", "amenity_mask", "average_rating"
+        )
+        hotel_ids = []
+        documents = []
+        for hotel_id, city, area, hotel_type, amenity_mask, average_rating in rows.iterator(
+            chunk_size=chunk_size
+        ):
+            hotel_ids.append(hotel_id)
+            documents.append(
+                hotel_feature_text(
+                    city,
+                    area,
+                    hotel_type,
+                    amenities_from_mask(amenity_mask),
+                    average_rating,
+                )
+            )
+
+        if not documents:
+            return None
+
+        vectorizer = TfidfVectorizer(**VECTORIZER_OPTIONS)
+        matrix = sparse.csr_matrix(vectorizer.fit_transform(documents), dtype=np.float32)
+        return cls(vectorizer, np.asarray(hotel_ids, dtype=np.int64), matrix)
+
+    def rows_for(self, hotel_ids):
+        hotel_ids = np.asarray(hotel_ids, dtype=np.int64)
+        rows = np.searchsorted(self.hotel_ids, hotel_ids)
+        rows[rows >= len(self.hotel_ids)] = 0
+        found = self.hotel_ids[rows] == hotel_ids
+        return np.where(found, rows, -1)
+
+    def vectorize_terms(self, term_counts):
+        """
+        Equivalent to vectorizer.transform() on the text the counts came from:
+        raw counts weighted by idf, then L2-normalised.
+        """
+        vocabulary = self.vectorizer.vocabulary_
+        columns = []
+        weights = []
+        for term, count in term_counts.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append(count * self.vectorizer.idf_[column])
+
+        weights = np.asarray(weights, dtype=np.float64)
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        return sparse.csr_matrix(
+            (weights, (np.zeros(len(columns), dtype=np.int64), columns)),
+            shape=(1, len(vocabulary)),
+        )
+
+    def score(self, term_counts, hotel_ids):
+        """
+        Only the profile is vectorized at request time; scoring is one sparse
+        product against the candidate rows. Hotels missing from the index score 0.
+        """
+        rows = self.rows_for(hotel_ids)
+        scores = np.zeros(len(rows), dtype=np.float64)
+        found = rows >= 0
+        if not found.any():
+            return scores
+
+        profile_vector = self.vectorize_terms(term_counts).T
+        scores[found] = (self.matrix[rows[found]] @ profile_vector).toarray().ravel()
+        return scores
+
+    def nearest(self, term_counts, k):
+        profile_vector = self.vectorize_terms(term_counts)
+        if not profile_vector.nnz:
+            return np.empty(0, dtype=np.int64)
+
+        # Sparse row x inverted index: cost scales with the profile terms' postings
+        similarities = (profile_vector @ self.postings).tocoo()
+        rows, scores = similarities.col, similarities.data
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+        return self.hotel_ids[rows[np.argsort(-scores, kind="stable")]]
@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+import numpy as np
+from sklearn.metrics.pairwise import haversine_distances
+from sklearn.neighbors import BallTree
+
+from ..models import Hotel
+
+EARTH_RADIUS_KM = 6371.0
+# Hotels further than this from every user location get no location score
+SEARCH_RADIUS_KM = 50.0
+# Distance at which a hotel's score decays to 1/e of a hotel at the location
+DISTANCE_DECAY_KM = 10.0
+
+
+def _place_key(*names):
+    return "|".join((name or "").strip().lower() for name in names)
+
+
+class HotelGeoIndex:
+    """
+    Haversine BallTree over the coordinates of all active hotels.
+    Attributes:
+        hotel_ids (np.ndarray): Sorted hotel ids, one per tree point.
+        tree (BallTree): Tree over (latitude, longitude) in radians.
+        places (dict): Centroid (lat, lon) in degrees per "city" and "city|area" key, used to place searches and preferences on the map.
+    Methods:
+        build(hotels=None):
+            Builds the tree and place centroids from active hotels with coordinates.
+        locate(city, area=None):
+            Centroid of an area within a city, falling back to the city centroid.
+        score(locations, hotel_ids):
+            Distance-decayed proximity of the given hotels to weighted user locations.
+        nearest(locations, k):
+            Ids of the k hotels nearest to any of the user locations.
+    """
+
+    def __init__(self, hotel_ids, tree, places):
+        self.hotel_ids = hotel_ids
+        self.tree = tree
+        self.places = places
+
+    @classmethod
+    def build(cls, hotels=None, chunk_size=10000):
+        if hotels is None:
+            hotels = Hotel.objects.filter(is_active=True)
+
+        rows = (
+            hotels.filter(latitude__isnull=False, longitude__isnull=False)
+            .order_by("id")
+            .values_list("id", "city", "area", "latitude", "longitude")
+        )
+        hotel_ids = []
+        coordinates = []
+        place_points = defaultdict(list)
+        for hotel_id, city, area, latitude, longitude in rows.iterator(
+            chunk_size=chunk_size
+        ):
+            point = (float(latitude), float(longitude))
+            hotel_ids.append(hotel_id)
+            coordinates.append(point)
+            place_points[_place_key(city)].append(point)
+            place_points[_place_key(city, area)].append(point)
+
+        if not hotel_ids:
+            return None
+
+        places = {
+            key: tuple(np.mean(points, axis=0)) for key, points in place_points.items()
+        }
+        tree = BallTree(np.radians(coordinates), metric="haversine")
+        return cls(np.asarray(hotel_ids, dtype=np.int64), tree, places)
+
+    def locate(self, city, area=None):
+        if area:
+            point = self.places.get(_place_key(city, area))
+            if point is not None:
+                return point
+        return self.places.get(_place_key(city))
+
+    @staticmethod
+    def _merge_locations(locations):
+        """Merge (lat, lon, weight) points within ~1 km into weighted centroids in radians"""
+        centroids = defaultdict(float)
+        for latitude, longitude, weight in locations:
+            centroids[(round(latitude, 2), round(longitude, 2))] += weight
+        points = np.radians(list(centroids.keys()))
+        weights = np.fromiter(centroids.values(), dtype=np.float64)
+        return points, weights
+
+    def score(self, locations, hotel_ids):
+        """
+        Score hotels in [0, 1] by weighted, exponentially decayed distance to
+        the user's locations. `locations` is a list of (lat, lon, weight) in
+        degrees. Points within ~1 km are merged into one weighted centroid.
+        Distances are computed only for the given hotels, so the cost follows
+        the candidate set rather than how many hotels surround a location.
+        """
+        hotel_ids = np.asarray(hotel_ids, dtype=np.int64)
+        scores = np.zeros(len(hotel_ids), dtype=np.float64)
+        if not locations or not len(hotel_ids):
+            return scores
+
+        points, weights = self._merge_locations(locations)
+
+        positions = np.searchsorted(self.hotel_ids, hotel_ids)
+        positions[positions >= len(self.hotel_ids)] = 0
+        indexed = self.hotel_ids[positions] == hotel_ids
+        if not indexed.any():
+            return scores
+
+        coordinates = np.asarray(self.tree.data)[positions[indexed]]
+        distances_km = haversine_distances(coordinates, points) * EARTH_RADIUS_KM
+        proximity = np.where(
+            distances_km <= SEARCH_RADIUS_KM,
+            np.exp(-distances_km / DISTANCE_DECAY_KM),
+            0.0,
+        )
+        scores[indexed] = proximity @ weights / weights.sum()
+        return scores
+
+    def nearest(self, locations, k):
+        if not locations:
+            return np.empty(0, dtype=np.int64)
+
+        points, _ = self._merge_locations(locations)
+        distances, rows = self.tree.query(points, k=min(k, len(self.hotel_ids)))
+        # Closest across all locations first, each hotel once
+        rows = rows.ravel()[np.argsort(distances.ravel(), kind="stable")]
+        _, first = np.unique(rows, return_index=True)
+        return self.hotel_ids[rows[np.sort(first)][:k]]
@@ -0,0 +1,128 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from ..models import UserInteraction
+from . import recommendation_cache
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionLogger:
+    """
+    Write-behind buffer for UserInteraction events.
+    Requests only put an unsaved event on an in-process queue; a background
+    thread writes queued events with bulk_create once INTERACTION_LOG_BATCH_SIZE
+    are waiting or every INTERACTION_LOG_FLUSH_INTERVAL seconds, so page views
+    no longer take the database write lock themselves. Events left in the
+    queue are flushed at interpreter exit.
+    The queue holds at most INTERACTION_LOG_MAX_QUEUE events: under overload
+    new events are dropped and counted rather than slowing requests down.
+    Interactions are analytics and training data, so losing a few is preferred
+    to back-pressure on page views. created_at is the time of the flush, at
+    most one interval after the event.
+    Methods:
+        log(user_id, hotel_id, interaction_type, weight):
+            Queue an event without touching the database.
+        flush():
+            Write every queued event now, e.g. from tests or before shutdown.
+        close():
+            Stop the background thread and flush what is left.
+    """
+
+    def __init__(self):
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # A forked worker inherits the queue but not the thread: start afresh
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=settings.INTERACTION_LOG_MAX_QUEUE)
+            self._wakeup = threading.Event()
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="interaction-log", daemon=True
+            )
+            self._thread.start()
+            if self._pid is None:
+                atexit.register(self.close)
+            self._pid = os.getpid()
+
+    def log(self, user_id, hotel_id, interaction_type, weight):
+        self._ensure_started()
+        event = UserInteraction(
+            user_id=user_id,
+            hotel_id=hotel_id,
+            interaction_type=interaction_type,
+            weight=weight,
+        )
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._queue.qsize() >= settings.INTERACTION_LOG_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(settings.INTERACTION_LOG_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+    def _drain(self):
+        events = []
+        while len(events) < settings.INTERACTION_LOG_BATCH_SIZE:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def flush(self):
+        """Write queued events in batches; returns how many were written"""
+        if self._pid != os.getpid():
+            return 0
+        written = 0
+        with self._flush_lock:
+            # The flushing thread keeps its own connection: drop it if broken or expired
+            close_old_connections()
+            while events := self._drain():
+                try:
+                    with transaction.atomic():
+                        UserInteraction.objects.bulk_create(events)
+                except Exception as e:
+                    logger.error(f"Error in InteractionLogger.flush: {str(e)}")
+                    self.dropped += len(events)
+                    continue
+                written += len(events)
+                # bulk_create sends no post_save, which normally does this
+                for user_id in {event.user_id for event in events}:
+                    recommendation_cache.invalidate_user(user_id)
+
+            if self.dropped:
+                logger.warning(f"Dropped {self.dropped} user interactions")
+                self.dropped = 0
+        return written
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=settings.INTERACTION_LOG_FLUSH_INTERVAL + 5)
+        self.flush()
+
+
+interaction_logger = InteractionLogger()
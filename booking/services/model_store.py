@@ -0,0 +1,181 @@
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.utils import timezone
+
+from .content_index import HotelFeatureIndex
+
+LATEST_POINTER = "LATEST"
+SVD_MODEL_FILE = "svd.pkl"
+METADATA_FILE = "metadata.json"
+GEO_INDEX_FILE = "geo_index.pkl"
+CONTENT_VECTORIZER_FILE = "content_vectorizer.pkl"
+CONTENT_HOTEL_IDS_FILE = "content_hotel_ids.npy"
+# CSR components are stored as raw .npy arrays so they can be memory-mapped
+CONTENT_MATRIX_FILES = {
+    "data": "content_matrix_data.npy",
+    "indices": "content_matrix_indices.npy",
+    "indptr": "content_matrix_indptr.npy",
+}
+CONTENT_POSTINGS_FILES = {
+    "data": "content_postings_data.npy",
+    "indices": "content_postings_indices.npy",
+    "indptr": "content_postings_indptr.npy",
+}
+
+
+def get_model_dir():
+    """Root directory holding one sub-directory per trained model version"""
+    return settings.RECOMMENDER_MODEL_DIR
+
+
+def get_version_dir(version):
+    return os.path.join(get_model_dir(), version)
+
+
+def create_version():
+    """
+    Create an empty directory for a new model version and return its name.
+    Versions are UTC timestamps so that they sort in training order.
+    """
+    version = timezone.now().strftime("%Y%m%d%H%M%S%f")
+    os.makedirs(get_version_dir(version))
+    return version
+
+
+def publish_version(version):
+    """
+    Point LATEST at the given version. The pointer is written to a temporary
+    file and renamed into place so readers never observe a partial write.
+    """
+    pointer_path = os.path.join(get_model_dir(), LATEST_POINTER)
+    tmp_path = f"{pointer_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, pointer_path)
+
+
+def get_latest_version():
+    """Return the currently published version name, or None if nothing is trained yet"""
+    try:
+        with open(os.path.join(get_model_dir(), LATEST_POINTER)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def list_versions():
+    if not os.path.isdir(get_model_dir()):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(get_model_dir())
+        if os.path.isdir(get_version_dir(name))
+    )
+
+
+def prune_versions(keep):
+    """Delete all but the newest `keep` versions, never removing the published one"""
+    latest = get_latest_version()
+    versions = list_versions()
+    removed = []
+    for version in versions[: max(len(versions) - keep, 0)]:
+        if version == latest:
+            continue
+        shutil.rmtree(get_version_dir(version))
+        removed.append(version)
+    return removed
+
+
+def save_metadata(version, metadata):
+    with open(os.path.join(get_version_dir(version), METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+
+def load_metadata(version):
+    try:
+        with open(os.path.join(get_version_dir(version), METADATA_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_svd_model(version, model):
+    with open(os.path.join(get_version_dir(version), SVD_MODEL_FILE), "wb") as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_svd_model(version):
+    """Load the SVD model saved for a version, or None if that version has no model"""
+    try:
+        with open(os.path.join(get_version_dir(version), SVD_MODEL_FILE), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_geo_index(version, index):
+    with open(os.path.join(get_version_dir(version), GEO_INDEX_FILE), "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_geo_index(version):
+    """Load the hotel BallTree saved for a version, or None if that version has none"""
+    try:
+        with open(os.path.join(get_version_dir(version), GEO_INDEX_FILE), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_content_index(version, index):
+    version_dir = get_version_dir(version)
+    with open(os.path.join(version_dir, CONTENT_VECTORIZER_FILE), "wb") as f:
+        pickle.dump(index.vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    np.save(os.path.join(version_dir, CONTENT_HOTEL_IDS_FILE), index.hotel_ids)
+    for component, filename in CONTENT_MATRIX_FILES.items():
+        np.save(os.path.join(version_dir, filename), getattr(index.matrix, component))
+    for component, filename in CONTENT_POSTINGS_FILES.items():
+        np.save(os.path.join(version_dir, filename), getattr(index.postings, component))
+
+
+def _load_csr(version_dir, files, shape, mmap_mode):
+    components = {
+        component: np.load(os.path.join(version_dir, filename), mmap_mode=mmap_mode)
+        for component, filename in files.items()
+    }
+    return sparse.csr_matrix(
+        (components["data"], components["indices"], components["indptr"]),
+        shape=shape,
+        copy=False,
+    )
+
+
+def load_content_index(version, mmap_mode="r"):
+    """
+    Load the hotel feature index saved for a version, or None if that version
+    has no index. Arrays are memory-mapped read-only by default.
+    """
+    version_dir = get_version_dir(version)
+    try:
+        with open(os.path.join(version_dir, CONTENT_VECTORIZER_FILE), "rb") as f:
+            vectorizer = pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+    hotel_ids = np.load(os.path.join(version_dir, CONTENT_HOTEL_IDS_FILE))
+    shape = (len(hotel_ids), len(vectorizer.vocabulary_))
+    matrix = _load_csr(version_dir, CONTENT_MATRIX_FILES, shape, mmap_mode)
+    if os.path.exists(os.path.join(version_dir, CONTENT_POSTINGS_FILES["data"])):
+        postings = _load_csr(
+            version_dir, CONTENT_POSTINGS_FILES, shape[::-1], mmap_mode
+        )
+    else:
+        postings = None  # Versions trained before the inverted index existed
+    return HotelFeatureIndex(vectorizer, hotel_ids, matrix, postings)
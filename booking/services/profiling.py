@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_local = threading.local()
+
+
+class StageRecorder:
+    """
+    Collects wall time and database queries per named pipeline stage for the
+    current thread. Queries issued outside any stage are counted under "other".
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.queries = defaultdict(int)
+        self._stack = []
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries[self._stack[-1] if self._stack else "other"] += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def record_stages():
+    """
+    Record stage timings for everything run inside the block on this thread.
+    Queries are counted on every database alias, so reads routed to the
+    read-only replica are included.
+    """
+    recorder = StageRecorder()
+    _local.recorder = recorder
+    try:
+        with ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(recorder._count_query))
+            yield recorder
+    finally:
+        _local.recorder = None
+
+
+@contextmanager
+def stage(name):
+    """Mark a pipeline stage; free when no recorder is active"""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        yield
+        return
+
+    recorder._stack.append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.timings[name] += time.perf_counter() - started
+        recorder._stack.pop()
@@ -1,18 +1,37 @@
-import pandas as pd
+from collections import defaultdict
+
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
-from surprise import Dataset, Reader, SVD
-from surprise.model_selection import train_test_split
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db.models import Q, Avg, Count
 from django.contrib.auth.models import User
-from ..models import Hotel, UserInteraction, Booking, Review, SearchHistory
+from ..models import Hotel, UserInteraction, Booking, Review, UserSearchRollup
+from . import (
+    model_store,
+    profiling,
+    recommendation_cache,
+    retrieval,
+    user_profiles,
+)
+from .scoring_pool import ScoringPoolBusy, scoring_pool
+from .snapshot import RecommenderSnapshot
 from accounts.models import UserPreference
+from hotel_booking_recommendation.db_routers import use_read_replica
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Hybrid weights for the content, collaborative and location scores
+HYBRID_WEIGHTS = np.array([0.4, 0.35, 0.25])
+# Names of the scores combined by HYBRID_WEIGHTS, in order
+SCORE_COMPONENTS = ("content", "collaborative", "location")
+# Recently searched places used as user locations
+MAX_SEARCH_LOCATIONS = 10
+# Recent bookings used as user locations
+MAX_BOOKING_LOCATIONS = 10
+
 
 class HotelRecommendationService:
     """
@@ -20,27 +39,83 @@ class HotelRecommendationService:
     Methods
     -------
     __init__():
-        Initializes the service with TF-IDF vectorizer, KNN model, and SVD model.
+        Initializes the service with an empty model snapshot. The hotel feature index and SVD model are built offline by the train_recommender command and loaded lazily.
+    get_snapshot():
+        Returns the current immutable model snapshot, picking up newly published versions at most every RECOMMENDER_RELOAD_INTERVAL seconds.
+    reload():
+        Loads the latest published model version and swaps it in atomically.
     get_recommendations(user=None, city=None, area=None, check_in_date=None, check_out_date=None, guests=1, limit=10):
-        Returns a list of recommended hotels based on user authentication, preferences, and search parameters.
-    _get_personalized_recommendations(user, hotels, city, area, check_in_date, check_out_date, guests, limit):
-        Generates personalized hotel recommendations for authenticated users by combining content-based, collaborative, and location-based scores.
-    _content_based_filtering(user, hotels, user_preference, city, area, guests):
-        Computes similarity scores between user profile and hotels using TF-IDF and cosine similarity.
-    _collaborative_filtering(user, hotels):
-        Predicts user-hotel ratings using collaborative filtering (SVD) based on user interactions and reviews.
-    _location_based_filtering(user, hotels, city, area):
-        Scores hotels based on similarity between user location preferences and hotel locations using TF-IDF and KNN.
-    _create_user_profile(user, user_preference):
-        Constructs a textual user profile from preferences, booking history, and reviews for content-based filtering.
+        Returns a list of recommended hotels based on user authentication, preferences, and search parameters, cached per user and normalized parameters.
+    aget_recommendations(user=None, city=None, area=None, check_in_date=None, check_out_date=None, guests=1, limit=10):
+        Async version of get_recommendations for async views: loads data with the async ORM and scores in the bounded scoring process pool, serving popular hotels uncached when the pool is saturated.
+    get_scored_recommendations(user, city=None, area=None, limit=10, snapshot=None):
+        Returns the user's recommendations as hotel ids with their hybrid and per-component scores, for the JSON API, cached like get_recommendations.
+    score_batch(queries, snapshot=None, pools=None):
+        Scores many (user, city, area, limit) queries together, loading the users' profiles and places in bulk and the hotels matching each distinct search once.
+    rank_candidates(snapshot, user_id, profile_terms, user_locations, hotel_ids, limit):
+        Fuses content-based, collaborative, and location-based score arrays for the candidate hotels in one weighted vector operation and returns the ids of the best ones. Touches no database, so scoring workers run it too.
+    explain_candidates(snapshot, user_id, profile_terms, user_locations, hotel_ids, limit):
+        Like rank_candidates, returning each winner's hybrid and per-component scores.
+    component_scores(snapshot, user_id, profile_terms, user_locations, hotel_ids):
+        Content-based, collaborative, and location-based score arrays for the candidate hotels, one row each.
+    _compute_recommendations(snapshot, user, city, area, check_in_date, check_out_date, guests, limit):
+        Runs the uncached recommendation pipeline for one request.
+    _get_personalized_recommendations(snapshot, user, hotels, city, area, check_in_date, check_out_date, guests, limit):
+        Generates personalized hotel recommendations for authenticated users by ranking a bounded set of candidate hotels.
+    _get_candidate_ids(snapshot, user, hotels, profile_terms, user_locations, city, area):
+        Returns the hotels to score: all matching hotels for small catalogs, otherwise a bounded candidate set from popularity, geographic, content and collaborative indexes.
+    _top_k(scores, k):
+        Selects the indices of the k best scores with partial selection (argpartition).
+    _content_based_filtering(snapshot, profile_terms, hotel_ids):
+        Computes cosine similarity between the stored user profile vector and the precomputed hotel feature index.
+    _collaborative_filtering(snapshot, user_id, hotel_ids):
+        Predicts user-hotel ratings for all candidates in one NumPy operation using the offline-trained SVD model's factors and biases.
+    _location_based_filtering(snapshot, user_locations, hotel_ids):
+        Scores hotels by distance-decayed haversine proximity to the user's locations.
+    _get_user_locations(geo_index, user, city, area):
+        Places the user's preferred locations, recent searches and recent bookings on the map.
+    _load_user_places(user):
+        Reads the places the user has shown interest in, placed on the map by _place_user_locations.
+    _load_user_places_bulk(users):
+        _load_user_places for many users with one query per source.
     _get_general_recommendations(hotels, city, area, check_in_date, check_out_date, guests, limit):
         Returns general hotel recommendations for non-authenticated users, sorted by rating and popularity.
     """
 
     def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words="english", max_features=1000)
-        self.knn_model = NearestNeighbors(n_neighbors=10, metric="cosine")
-        self.svd_model = SVD()
+        # Readers only ever dereference self._snapshot; the lock serialises loading
+        self._snapshot = RecommenderSnapshot()
+        self._reload_lock = threading.Lock()
+        self._next_reload_check = 0.0
+
+    def get_snapshot(self):
+        """
+        Return the current model snapshot without blocking on a reload in progress
+        """
+        if time.monotonic() >= self._next_reload_check:
+            self.reload(blocking=False)
+        return self._snapshot
+
+    def reload(self, blocking=True):
+        """
+        Swap in the latest published model version if it differs from the current one
+        """
+        if not self._reload_lock.acquire(blocking=blocking):
+            return self._snapshot
+        try:
+            self._next_reload_check = (
+                time.monotonic() + settings.RECOMMENDER_RELOAD_INTERVAL
+            )
+            version = model_store.get_latest_version()
+            if version != self._snapshot.version:
+                snapshot = RecommenderSnapshot.load(version)
+                self._snapshot = snapshot
+                logger.info(f"Loaded recommender model version {version}")
+        except Exception as e:
+            logger.error(f"Error loading recommender models: {str(e)}")
+        finally:
+            self._reload_lock.release()
+        return self._snapshot
 
     def get_recommendations(
         self,
@@ -53,16 +128,214 @@ class HotelRecommendationService:
         limit=10,
     ):
         """
-        Get hotel recommendations using hybrid approach
+        Get hotel recommendations using hybrid approach, served from the
+        per-user result cache when nothing about the user or hotels has changed
+        """
+        snapshot = self.get_snapshot()
+        user_id = user.id if user and user.is_authenticated else "anonymous"
+        cache_key = recommendation_cache.make_key(
+            user_id,
+            snapshot.version,
+            recommendation_cache.normalize_params(
+                city, area, guests, check_in_date, check_out_date, limit
+            ),
+        )
+
+        recommended_hotels = recommendation_cache.get_result(cache_key)
+        if recommended_hotels is None:
+            # Scoring only reads, so it never waits behind a writer
+            with use_read_replica():
+                recommended_hotels = self._compute_recommendations(
+                    snapshot,
+                    user,
+                    city,
+                    area,
+                    check_in_date,
+                    check_out_date,
+                    guests,
+                    limit,
+                )
+                if recommended_hotels is not None:
+                    with profiling.stage("hydration"):
+                        recommended_hotels = list(recommended_hotels)
+                    recommendation_cache.set_result(cache_key, recommended_hotels)
+                else:
+                    recommended_hotels = list(
+                        Hotel.objects.filter(is_active=True)[:limit]
+                    )
+
+        return recommended_hotels
+
+    async def aget_recommendations(
+        self,
+        user=None,
+        city=None,
+        area=None,
+        check_in_date=None,
+        check_out_date=None,
+        guests=1,
+        limit=10,
+    ):
+        """
+        get_recommendations for async views: the event loop never waits on a
+        query or on scoring
+        """
+        if time.monotonic() >= self._next_reload_check:
+            # Loading a new version reads model files
+            await sync_to_async(self.reload)(blocking=False)
+        snapshot = self._snapshot
+        user_id = user.id if user and user.is_authenticated else "anonymous"
+        cache_key = await recommendation_cache.amake_key(
+            user_id,
+            snapshot.version,
+            recommendation_cache.normalize_params(
+                city, area, guests, check_in_date, check_out_date, limit
+            ),
+        )
+
+        recommended_hotels = recommendation_cache.get_result(cache_key)
+        if recommended_hotels is None:
+            with use_read_replica():
+                try:
+                    recommended_hotels = await self._acompute_recommendations(
+                        snapshot,
+                        user,
+                        city,
+                        area,
+                        check_in_date,
+                        check_out_date,
+                        guests,
+                        limit,
+                    )
+                except ScoringPoolBusy:
+                    # Shed load: popular hotels now, personalised ones later
+                    logger.warning("Recommendation scoring pool saturated")
+                    hotels = self._filter_hotels(city, area)
+                    return [
+                        hotel
+                        async for hotel in self._get_general_recommendations(
+                            hotels,
+                            city,
+                            area,
+                            check_in_date,
+                            check_out_date,
+                            guests,
+                            limit,
+                        )
+                    ]
+                if recommended_hotels is not None:
+                    recommendation_cache.set_result(cache_key, recommended_hotels)
+                else:
+                    recommended_hotels = [
+                        hotel
+                        async for hotel in Hotel.objects.filter(is_active=True)[:limit]
+                    ]
+
+        return recommended_hotels
+
+    def get_scored_recommendations(
+        self, user, city=None, area=None, limit=10, snapshot=None
+    ):
+        """
+        Recommendations with their scores for the JSON API, cached per user
+        and parameters like get_recommendations. None on failure.
+        """
+        snapshot = snapshot or self.get_snapshot()
+        cache_key = recommendation_cache.make_key(
+            user.id,
+            snapshot.version,
+            ("scored",)
+            + recommendation_cache.normalize_params(city, area, 1, None, None, limit),
+        )
+
+        scored = recommendation_cache.get_result(cache_key)
+        if scored is None:
+            scored = self.score_batch([(user, city, area, limit)], snapshot)[0]
+            if scored is not None:
+                recommendation_cache.set_result(cache_key, scored)
+        return scored
+
+    def score_batch(self, queries, snapshot=None, pools=None):
+        """
+        Score (user, city, area, limit) queries together: the users' profiles
+        and places are read with one query per source, and the hotels matching
+        each distinct (city, area) are loaded once into a CandidatePool.
+        Returns, aligned with queries, scored recommendations as from
+        explain_candidates, or None where scoring failed. Callers scoring in
+        chunks pass the same `pools` dict to every call to keep sharing it.
+        """
+        snapshot = snapshot or self.get_snapshot()
+        pools = {} if pools is None else pools
+        users = list({user.id: user for user, _, _, _ in queries}.values())
+
+        results = []
+        with use_read_replica():
+            profile_terms = user_profiles.get_profile_terms_bulk(users)
+            places = {}
+            if snapshot.geo_index is not None:
+                places = self._load_user_places_bulk(users)
+
+            for user, city, area, limit in queries:
+                try:
+                    pool_key = (snapshot.version, city or "", area or "")
+                    if pool_key not in pools:
+                        pools[pool_key] = retrieval.CandidatePool(
+                            snapshot, self._filter_hotels(city, area)
+                        )
+
+                    user_locations = []
+                    if snapshot.geo_index is not None:
+                        user_locations = self._place_user_locations(
+                            snapshot.geo_index, places[user.id], city, area
+                        )
+                    hotel_ids = pools[pool_key].candidates(
+                        snapshot,
+                        user.id,
+                        profile_terms[user.id],
+                        self._search_locations(snapshot, user_locations, city, area),
+                    )
+                    results.append(
+                        self.explain_candidates(
+                            snapshot,
+                            user.id,
+                            profile_terms[user.id],
+                            user_locations,
+                            hotel_ids,
+                            limit,
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"Error in score_batch: {str(e)}")
+                    results.append(None)
+
+        return results
+
+    @staticmethod
+    def _filter_hotels(city, area):
+        hotels = Hotel.objects.filter(is_active=True)
+        if city:
+            hotels = hotels.filter(city__icontains=city)
+        if area:
+            hotels = hotels.filter(area__icontains=area)
+        return hotels
+
+    def _compute_recommendations(
+        self,
+        snapshot,
+        user,
+        city,
+        area,
+        check_in_date,
+        check_out_date,
+        guests,
+        limit,
+    ):
+        """
+        Run the recommendation pipeline; returns None on failure so errors are not cached
         """
         try:
             # Get base hotels
-            hotels = Hotel.objects.filter(is_active=True)
-
-            if city:
-                hotels = hotels.filter(city__icontains=city)
-            if area:
-                hotels = hotels.filter(area__icontains=area)
+            hotels = self._filter_hotels(city, area)
 
             if not hotels.exists():
                 return hotels.none()
@@ -70,6 +343,7 @@ class HotelRecommendationService:
             # If user is authenticated, use personalized recommendations
             if user and user.is_authenticated:
                 return self._get_personalized_recommendations(
+                    snapshot,
                     user,
                     hotels,
                     city,
@@ -86,58 +360,94 @@ class HotelRecommendationService:
 
         except Exception as e:
             logger.error(f"Error in get_recommendations: {str(e)}")
-            return Hotel.objects.filter(is_active=True)[:limit]
+            return None
 
-    def _get_personalized_recommendations(
-        self, user, hotels, city, area, check_in_date, check_out_date, guests, limit
+    async def _acompute_recommendations(
+        self,
+        snapshot,
+        user,
+        city,
+        area,
+        check_in_date,
+        check_out_date,
+        guests,
+        limit,
     ):
         """
-        Get personalized recommendations using hybrid filtering
+        _compute_recommendations with the async ORM; returns a list, or None on failure
         """
         try:
-            # Get user preferences
-            user_preference = getattr(user, "userpreference", None)
+            hotels = self._filter_hotels(city, area)
 
-            # 1. Content-based filtering
-            content_scores = self._content_based_filtering(
-                user, hotels, user_preference, city, area, guests
-            )
+            if not await hotels.aexists():
+                return []
 
-            # 2. Collaborative filtering
-            collaborative_scores = self._collaborative_filtering(user, hotels)
+            if user and user.is_authenticated:
+                return await self._aget_personalized_recommendations(
+                    snapshot,
+                    user,
+                    hotels,
+                    city,
+                    area,
+                    check_in_date,
+                    check_out_date,
+                    guests,
+                    limit,
+                )
+            return [
+                hotel
+                async for hotel in self._get_general_recommendations(
+                    hotels, city, area, check_in_date, check_out_date, guests, limit
+                )
+            ]
 
-            # 3. Location-based filtering
-            location_scores = self._location_based_filtering(user, hotels, city, area)
+        except ScoringPoolBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error in aget_recommendations: {str(e)}")
+            return None
 
-            # 4. Combine scores with weights
-            final_scores = {}
-            for hotel_id in hotels.values_list("id", flat=True):
-                content_score = content_scores.get(hotel_id, 0)
-                collaborative_score = collaborative_scores.get(hotel_id, 0)
-                location_score = location_scores.get(hotel_id, 0)
+    def _get_personalized_recommendations(
+        self,
+        snapshot,
+        user,
+        hotels,
+        city,
+        area,
+        check_in_date,
+        check_out_date,
+        guests,
+        limit,
+    ):
+        """
+        Get personalized recommendations using hybrid filtering: retrieve a
+        bounded candidate set, then rerank it with the full hybrid scorer
+        """
+        try:
+            with profiling.stage("content"):
+                profile_terms = user_profiles.get_profile_terms(user)
+            with profiling.stage("location"):
+                user_locations = self._get_user_locations(
+                    snapshot.geo_index, user, city, area
+                )
 
-                # Weighted combination
-                final_score = (
-                    0.4 * content_score
-                    + 0.35 * collaborative_score
-                    + 0.25 * location_score
+            with profiling.stage("retrieval"):
+                hotel_ids = self._get_candidate_ids(
+                    snapshot, user, hotels, profile_terms, user_locations, city, area
                 )
-                final_scores[hotel_id] = final_score
 
-            # Sort by final scores
-            sorted_hotel_ids = sorted(
-                final_scores.keys(), key=lambda x: final_scores[x], reverse=True
+            top_hotel_ids = self.rank_candidates(
+                snapshot, user.id, profile_terms, user_locations, hotel_ids, limit
             )
 
-            recommended_hotels = []
-            for hotel_id in sorted_hotel_ids[:limit]:
-                try:
-                    hotel = hotels.get(id=hotel_id)
-                    recommended_hotels.append(hotel)
-                except Hotel.DoesNotExist:
-                    continue
-
-            return recommended_hotels
+            # One query for all winners, returned in rank order
+            with profiling.stage("hydration"):
+                hotels_by_id = hotels.in_bulk(top_hotel_ids)
+            return [
+                hotels_by_id[hotel_id]
+                for hotel_id in top_hotel_ids
+                if hotel_id in hotels_by_id
+            ]
 
         except Exception as e:
             logger.error(f"Error in personalized recommendations: {str(e)}")
@@ -145,207 +455,331 @@ class HotelRecommendationService:
                 hotels, city, area, check_in_date, check_out_date, guests, limit
             )
 
-    def _content_based_filtering(
-        self, user, hotels, user_preference, city, area, guests
+    async def _aget_personalized_recommendations(
+        self,
+        snapshot,
+        user,
+        hotels,
+        city,
+        area,
+        check_in_date,
+        check_out_date,
+        guests,
+        limit,
     ):
         """
-        Content-based filtering using TF-IDF and cosine similarity
+        _get_personalized_recommendations with the async ORM, scoring in the
+        scoring process pool
         """
         try:
-            scores = {}
-
-            # Create user profile based on preferences and booking history
-            user_profile = self._create_user_profile(user, user_preference)
-
-            hotel_features = []
-            hotel_ids = []
-            for hotel in hotels:
-                features = []
-                features.append(hotel.city)
-                features.append(hotel.area)
-                features.append(hotel.hotel_type)
-                features.extend(hotel.amenities or [])
-                features.append(f"star_{hotel.average_rating}")
-                features.append(f"rating_{int(hotel.average_rating)}")
-
-                hotel_features.append(" ".join(features))
-                hotel_ids.append(hotel.id)
-
-            if not hotel_features:
-                return scores
-
-            all_features = hotel_features + [user_profile]
-            # Calculate TF-IDF
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(all_features)
-            # Calculate cosine similarity between user profile and hotels
-            user_vector = tfidf_matrix[-1]  # Last item is user profile
-            hotel_vectors = tfidf_matrix[:-1]  # All except last
+            profile_terms = await user_profiles.aget_profile_terms(user)
+            user_locations = []
+            if snapshot.geo_index is not None:
+                user_locations = self._place_user_locations(
+                    snapshot.geo_index, await self._aload_user_places(user), city, area
+                )
 
-            similarities = cosine_similarity(user_vector, hotel_vectors).flatten()
+            size = retrieval.catalog_size(snapshot)
+            if size is None or size <= retrieval.FULL_SCAN_LIMIT:
+                hotel_ids = np.array(
+                    [
+                        hotel_id
+                        async for hotel_id in hotels.values_list("id", flat=True)
+                    ],
+                    dtype=np.int64,
+                )
+            else:
+                hotel_ids = await retrieval.aretrieve_candidates(
+                    snapshot,
+                    user,
+                    hotels,
+                    profile_terms,
+                    self._search_locations(snapshot, user_locations, city, area),
+                )
 
-            # Create scores dictionary
-            for i, hotel_id in enumerate(hotel_ids):
-                scores[hotel_id] = similarities[i]
+            top_hotel_ids = await scoring_pool.rank(
+                snapshot, user.id, profile_terms, user_locations, hotel_ids, limit
+            )
 
-            return scores
+            hotels_by_id = await hotels.ain_bulk(top_hotel_ids)
+            return [
+                hotels_by_id[hotel_id]
+                for hotel_id in top_hotel_ids
+                if hotel_id in hotels_by_id
+            ]
 
+        except ScoringPoolBusy:
+            raise
         except Exception as e:
-            logger.error(f"Error in content-based filtering: {str(e)}")
-            return {}
+            logger.error(f"Error in personalized recommendations: {str(e)}")
+            return [
+                hotel
+                async for hotel in self._get_general_recommendations(
+                    hotels, city, area, check_in_date, check_out_date, guests, limit
+                )
+            ]
 
-    def _collaborative_filtering(self, user, hotels):
+    def component_scores(
+        self, snapshot, user_id, profile_terms, user_locations, hotel_ids
+    ):
         """
-        Collaborative filtering using SVD
+        Score rows in SCORE_COMPONENTS order, each aligned with hotel_ids
         """
-        try:
-            scores = {}
-
-            interactions = UserInteraction.objects.filter(hotel__in=hotels).values(
-                "user_id", "hotel_id", "weight"
-            )
-            reviews = Review.objects.filter(hotel__in=hotels).values(
-                "user_id", "hotel_id", "rating"
+        # 1. Content-based filtering
+        with profiling.stage("content"):
+            content_scores = self._content_based_filtering(
+                snapshot, profile_terms, hotel_ids
             )
 
-            data = []
-            for review in reviews:
-                data.append(
-                    {
-                        "user_id": review["user_id"],
-                        "hotel_id": review["hotel_id"],
-                        "rating": review["rating"],
-                    }
-                )
-
-            for interaction in interactions:
-                rating = min(5, max(1, interaction["weight"] * 3))
-                data.append(
-                    {
-                        "user_id": interaction["user_id"],
-                        "hotel_id": interaction["hotel_id"],
-                        "rating": rating,
-                    }
-                )
-
-            if len(data) < 10:  # Not enough data for collaborative filtering
-                return scores
+        # 2. Collaborative filtering
+        with profiling.stage("collaborative"):
+            collaborative_scores = self._collaborative_filtering(
+                snapshot, user_id, hotel_ids
+            )
 
-            df = pd.DataFrame(data)
-            reader = Reader(rating_scale=(1, 5))
-            dataset = Dataset.load_from_df(
-                df[["user_id", "hotel_id", "rating"]], reader
+        # 3. Location-based filtering
+        with profiling.stage("location"):
+            location_scores = self._location_based_filtering(
+                snapshot, user_locations, hotel_ids
             )
 
-            # Train SVD model
-            trainset = dataset.build_full_trainset()
-            self.svd_model.fit(trainset)
+        return np.vstack([content_scores, collaborative_scores, location_scores])
 
-            # Get predictions for current user
-            for hotel in hotels:
-                try:
-                    prediction = self.svd_model.predict(user.id, hotel.id)
-                    scores[hotel.id] = prediction.est / 5.0  # Normalize to 0-1
-                except:
-                    scores[hotel.id] = 0.5  # Default score
-
-            return scores
+    def rank_candidates(
+        self, snapshot, user_id, profile_terms, user_locations, hotel_ids, limit
+    ):
+        """
+        Rerank candidate hotels with the full hybrid scorer; returns the ids of
+        the top `limit`, best first
+        """
+        components = self.component_scores(
+            snapshot, user_id, profile_terms, user_locations, hotel_ids
+        )
 
-        except Exception as e:
-            logger.error(f"Error in collaborative filtering: {str(e)}")
-            return {}
+        # 4. Combine scores with weights
+        with profiling.stage("fusion"):
+            final_scores = HYBRID_WEIGHTS @ components
+            return hotel_ids[self._top_k(final_scores, limit)].tolist()
 
-    def _location_based_filtering(self, user, hotels, city, area):
+    def explain_candidates(
+        self, snapshot, user_id, profile_terms, user_locations, hotel_ids, limit
+    ):
+        """
+        rank_candidates with scores: [{"hotel_id", "score", "components"}], best first
+        """
+        components = self.component_scores(
+            snapshot, user_id, profile_terms, user_locations, hotel_ids
+        )
+        final_scores = HYBRID_WEIGHTS @ components
+        return [
+            {
+                "hotel_id": int(hotel_ids[index]),
+                "score": float(final_scores[index]),
+                "components": dict(
+                    zip(SCORE_COMPONENTS, components[:, index].tolist())
+                ),
+            }
+            for index in self._top_k(final_scores, limit)
+        ]
+
+    def _get_candidate_ids(
+        self, snapshot, user, hotels, profile_terms, user_locations, city, area
+    ):
+        """
+        Small catalogs are scored in full; larger ones go through the retrieval stage
         """
-        Location-based filtering using KNN with TF-IDF
+        size = retrieval.catalog_size(snapshot)
+        if size is None or size <= retrieval.FULL_SCAN_LIMIT:
+            return np.fromiter(hotels.values_list("id", flat=True), dtype=np.int64)
+
+        return retrieval.retrieve_candidates(
+            snapshot,
+            user,
+            hotels,
+            profile_terms,
+            self._search_locations(snapshot, user_locations, city, area),
+        )
+
+    @staticmethod
+    def _search_locations(snapshot, user_locations, city, area):
+        search_locations = list(user_locations)
+        if city and snapshot.geo_index is not None:
+            # Also look around the searched place so filtered searches get neighbours
+            point = snapshot.geo_index.locate(city, area)
+            if point is not None:
+                search_locations.append((*point, 1.0))
+        return search_locations
+
+    @staticmethod
+    def _top_k(scores, k):
+        """
+        Indices of the k highest scores, best first, with ties in index order
+        as a stable full sort would give. Uses partial selection so only the
+        k winners are sorted.
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(scores):
+            # argpartition picks arbitrarily among scores tied with the k-th
+            # best: keep everything better, then the first of the tied ones
+            kth = np.partition(-scores, k - 1)[k - 1]
+            better = np.flatnonzero(-scores < kth)
+            tied = np.flatnonzero(-scores == kth)[: k - len(better)]
+            candidates = np.sort(np.concatenate([better, tied]))
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def _content_based_filtering(self, snapshot, profile_terms, hotel_ids):
+        """
+        Content-based filtering against the precomputed hotel feature index
         """
         try:
-            scores = {}
-
-            # Get user's location preferences
-            user_locations = []
-            user_preference = getattr(user, "userpreference", None)
-            if user_preference and user_preference.locations:
-                user_locations.extend(user_preference.locations)
-
-            recent_searches = SearchHistory.objects.filter(user=user)[:10]
-            for search in recent_searches:
-                user_locations.append(search.city)
-                if search.area:
-                    user_locations.append(search.area)
-
-            recent_bookings = Booking.objects.filter(user=user)[:10]
-            for booking in recent_bookings:
-                user_locations.append(booking.hotel.city)
-                user_locations.append(booking.hotel.area)
-
-            if not user_locations:
-                if city:
-                    user_locations.append(city)
-                if area:
-                    user_locations.append(area)
-
-            if not user_locations:
-                return scores
+            content_index = snapshot.content_index
+            if content_index is None or not len(hotel_ids):  # Index not built yet
+                return np.zeros(len(hotel_ids))
 
-            hotel_locations = []
-            hotel_ids = []
+            return content_index.score(profile_terms, hotel_ids)
 
-            for hotel in hotels:
-                location_text = f"{hotel.city} {hotel.area}"
-                hotel_locations.append(location_text)
-                hotel_ids.append(hotel.id)
-
-            user_location_text = " ".join(user_locations)
+        except Exception as e:
+            logger.error(f"Error in content-based filtering: {str(e)}")
+            return np.zeros(len(hotel_ids))
 
-            all_locations = hotel_locations + [user_location_text]
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(all_locations)
+    def _collaborative_filtering(self, snapshot, user_id, hotel_ids):
+        """
+        Collaborative filtering using the offline-trained SVD model, scored in one batch
+        """
+        try:
+            collaborative_model = snapshot.collaborative_model
+            if collaborative_model is None:  # No model trained yet
+                return np.zeros(len(hotel_ids))
 
-            user_vector = tfidf_matrix[-1]
-            hotel_vectors = tfidf_matrix[:-1]
+            # Normalize to 0-1
+            return collaborative_model.score(user_id, hotel_ids) / 5.0
 
-            similarities = cosine_similarity(user_vector, hotel_vectors).flatten()
+        except Exception as e:
+            logger.error(f"Error in collaborative filtering: {str(e)}")
+            return np.zeros(len(hotel_ids))
 
-            for i, hotel_id in enumerate(hotel_ids):
-                scores[hotel_id] = similarities[i]
+    def _location_based_filtering(self, snapshot, user_locations, hotel_ids):
+        """
+        Location-based filtering by distance to the user's usual locations
+        """
+        try:
+            geo_index = snapshot.geo_index
+            if geo_index is None:  # Index not built yet
+                return np.zeros(len(hotel_ids))
 
-            return scores
+            return geo_index.score(user_locations, hotel_ids)
 
         except Exception as e:
             logger.error(f"Error in location-based filtering: {str(e)}")
-            return {}
-
-    def _create_user_profile(self, user, user_preference):
-        """
-        Create user profile text for content-based filtering
-        """
-        profile_features = []
-
-        if user_preference:
-            if user_preference.locations:
-                profile_features.extend(user_preference.locations)
-            if user_preference.amenities:
-                profile_features.extend(user_preference.amenities)
-
-        bookings = Booking.objects.filter(user=user).select_related("hotel")[:10]
-        for booking in bookings:
-            hotel = booking.hotel
-            profile_features.append(hotel.city)
-            profile_features.append(hotel.area)
-            profile_features.append(hotel.hotel_type)
-            if hotel.amenities:
-                profile_features.extend(hotel.amenities)
-            profile_features.append(f"star_{hotel.average_rating}")
-
-        reviews = Review.objects.filter(user=user).select_related("hotel")[:10]
-        for review in reviews:
-            hotel = review.hotel
-            if review.rating >= 4:
-                profile_features.append(hotel.city)
-                profile_features.append(hotel.hotel_type)
-                if hotel.amenities:
-                    profile_features.extend(hotel.amenities)
-
-        return " ".join(profile_features) if profile_features else "default"
+            return np.zeros(len(hotel_ids))
+
+    def _get_user_locations(self, geo_index, user, city, area):
+        """
+        Weighted (lat, lon, weight) points for where the user likes to stay,
+        from preferences, the search rollup and recent bookings
+        """
+        if geo_index is None:
+            return []
+        return self._place_user_locations(
+            geo_index, self._load_user_places(user), city, area
+        )
+
+    def _load_user_places(self, user):
+        """
+        (preferred locations, recent search rollup entries, recent booking
+        coordinates) of the user
+        """
+        user_preference = getattr(user, "userpreference", None)
+        rollup = UserSearchRollup.objects.filter(user=user).first()
+        return (
+            (user_preference.locations if user_preference else None) or [],
+            rollup.locations[:MAX_SEARCH_LOCATIONS] if rollup else [],
+            list(self._booked_points(user)),
+        )
+
+    async def _aload_user_places(self, user):
+        """_load_user_places with the async ORM"""
+        user_preference = await UserPreference.objects.filter(user=user).afirst()
+        rollup = await UserSearchRollup.objects.filter(user=user).afirst()
+        return (
+            (user_preference.locations if user_preference else None) or [],
+            rollup.locations[:MAX_SEARCH_LOCATIONS] if rollup else [],
+            [point async for point in self._booked_points(user)],
+        )
+
+    @staticmethod
+    def _booked_points(user):
+        return Booking.objects.filter(
+            user=user,
+            hotel__latitude__isnull=False,
+            hotel__longitude__isnull=False,
+        ).values_list("hotel__latitude", "hotel__longitude")[:MAX_BOOKING_LOCATIONS]
+
+    def _load_user_places_bulk(self, users):
+        """
+        _load_user_places for many users: {user id: places}
+        """
+        user_ids = [user.id for user in users]
+        preferred = dict(
+            UserPreference.objects.filter(user_id__in=user_ids).values_list(
+                "user_id", "locations"
+            )
+        )
+        searched = {
+            rollup.user_id: rollup.locations[:MAX_SEARCH_LOCATIONS]
+            for rollup in UserSearchRollup.objects.filter(user_id__in=user_ids)
+        }
+        booked = defaultdict(list)
+        # Newest first, as for a single user
+        for user_id, latitude, longitude in Booking.objects.filter(
+            user_id__in=user_ids,
+            hotel__latitude__isnull=False,
+            hotel__longitude__isnull=False,
+        ).values_list("user_id", "hotel__latitude", "hotel__longitude"):
+            if len(booked[user_id]) < MAX_BOOKING_LOCATIONS:
+                booked[user_id].append((latitude, longitude))
+
+        return {
+            user_id: (
+                preferred.get(user_id) or [],
+                searched.get(user_id, []),
+                booked[user_id],
+            )
+            for user_id in user_ids
+        }
+
+    @staticmethod
+    def _place_user_locations(geo_index, places, city, area):
+        preferred, searched, booked = places
+        locations = []
+
+        def add_place(place_city, place_area=None):
+            point = geo_index.locate(place_city, place_area)
+            if point is not None:
+                locations.append((*point, 1.0))
+
+        for location in preferred:
+            add_place(location)
+
+        # The most recently searched places, weighted by how often each was
+        # searched, sharing the weight of at most ten searches between them
+        searches = sum(entry["count"] for entry in searched)
+        scale = min(1.0, MAX_SEARCH_LOCATIONS / searches) if searches else 0.0
+        for entry in searched:
+            point = geo_index.locate(entry["city"], entry["area"])
+            if point is not None:
+                locations.append((*point, entry["count"] * scale))
+
+        for latitude, longitude in booked:
+            locations.append((float(latitude), float(longitude), 1.0))
+
+        if not locations and city:
+            add_place(city, area)
+
+        return locations
 
     def _get_general_recommendations(
         self, hotels, city, area, check_in_date, check_out_date, guests, limit
@@ -0,0 +1,110 @@
+import hashlib
+import uuid
+
+from django.core.cache import caches
+
+CACHE_ALIAS = "recommendations"
+# Tokens must be shared: an invalidation in one server process has to reach
+# the results every other process cached
+GENERATION_CACHE_ALIAS = "recommendation_generations"
+GLOBAL_GENERATION_KEY = "generation:all"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_generation_cache():
+    return caches[GENERATION_CACHE_ALIAS]
+
+
+def _user_generation_key(user_id):
+    return f"generation:user:{user_id}"
+
+
+def _get_generations(user_id):
+    """
+    Return the current (global, user) generation tokens. Invalidation swaps a
+    token, which orphans every entry built under the old one; orphans then age
+    out through the cache's TTL and LRU culling.
+    """
+    cache = get_generation_cache()
+    keys = [GLOBAL_GENERATION_KEY, _user_generation_key(user_id)]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            generations[key] = cache.get(key)
+    return generations[keys[0]], generations[keys[1]]
+
+
+async def _aget_generations(user_id):
+    """_get_generations for async callers"""
+    cache = get_generation_cache()
+    keys = [GLOBAL_GENERATION_KEY, _user_generation_key(user_id)]
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+            generations[key] = await cache.aget(key)
+    return generations[keys[0]], generations[keys[1]]
+
+
+def normalize_params(city, area, guests, check_in_date, check_out_date, limit):
+    """Normalise request parameters so equivalent searches share a cache entry"""
+
+    def normalize_text(value):
+        return (value or "").strip().lower()
+
+    def normalize_date(value):
+        return str(value) if value else ""
+
+    try:
+        guests = int(guests)
+    except (TypeError, ValueError):
+        guests = 1
+
+    return (
+        normalize_text(city),
+        normalize_text(area),
+        guests,
+        normalize_date(check_in_date),
+        normalize_date(check_out_date),
+        int(limit),
+    )
+
+
+def _result_key(user_id, model_version, params, generations):
+    raw_key = repr((user_id, model_version, *generations, params))
+    return f"result:{user_id}:{hashlib.md5(raw_key.encode()).hexdigest()}"
+
+
+def make_key(user_id, model_version, params):
+    return _result_key(user_id, model_version, params, _get_generations(user_id))
+
+
+async def amake_key(user_id, model_version, params):
+    """make_key for async views: reading the shared tokens is a query"""
+    return _result_key(
+        user_id, model_version, params, await _aget_generations(user_id)
+    )
+
+
+def get_result(key):
+    return get_cache().get(key)
+
+
+def set_result(key, recommendations):
+    get_cache().set(key, recommendations)
+
+
+def invalidate_user(user_id):
+    """Drop every cached result for one user"""
+    get_generation_cache().set(
+        _user_generation_key(user_id), uuid.uuid4().hex, timeout=None
+    )
+
+
+def invalidate_all():
+    """Drop every cached result, e.g. after hotel data changes"""
+    get_generation_cache().set(GLOBAL_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,58 @@
+from django.db import IntegrityError, transaction
+
+from ..models import Booking, RoomNight
+
+
+class RoomUnavailable(Exception):
+    """The room is already held for at least one night of the requested stay"""
+
+
+def _nights_taken(booking):
+    return RoomNight.objects.filter(
+        room_id=booking.room_id,
+        night__gte=booking.check_in_date,
+        night__lt=booking.check_out_date,
+    ).exists()
+
+
+def _replayed(booking):
+    """The booking already made by an earlier submission with the same key"""
+    if not booking.idempotency_key:
+        return None
+    return Booking.objects.filter(
+        user_id=booking.user_id, idempotency_key=booking.idempotency_key
+    ).first()
+
+
+def reserve_room(booking):
+    """
+    Save a new booking, claiming its room-nights in the same transaction.
+
+    Claiming is an insert into RoomNight, whose unique (room, night) constraint
+    settles races: of two overlapping bookings the second fails and rolls back,
+    with no table lock held and no lock on rooms other than the one booked.
+    A booking whose idempotency key the user already submitted is not created
+    again; the original is returned instead.
+
+    Returns (booking, created). Raises RoomUnavailable when any night is taken.
+    """
+    existing = _replayed(booking)
+    if existing:
+        return existing, False
+    # Cheap read first, so plain conflicts never compete for the write lock
+    if _nights_taken(booking):
+        raise RoomUnavailable
+
+    try:
+        with transaction.atomic():
+            booking.save()  # post_save claims the nights through RoomNight.sync
+    except IntegrityError:
+        booking.pk = None
+        booking._state.adding = True
+        existing = _replayed(booking)
+        if existing:
+            return existing, False
+        if _nights_taken(booking):
+            raise RoomUnavailable from None
+        raise
+    return booking, True
@@ -0,0 +1,124 @@
+import numpy as np
+
+# Hotels each retrieval source contributes to the candidate set
+CANDIDATES_PER_SOURCE = 100
+# Catalogs up to this size are scored in full without a retrieval stage
+FULL_SCAN_LIMIT = 500
+
+
+def _unique_in_order(hotel_ids):
+    hotel_ids = np.asarray(hotel_ids, dtype=np.int64)
+    _, first = np.unique(hotel_ids, return_index=True)
+    return hotel_ids[np.sort(first)]
+
+
+def catalog_size(snapshot):
+    """Number of hotels in the snapshot's indexes, None when nothing is built"""
+    sizes = [
+        len(index.hotel_ids)
+        for index in (snapshot.content_index, snapshot.geo_index)
+        if index is not None
+    ]
+    return max(sizes) if sizes else None
+
+
+def _index_candidates(snapshot, user_id, profile_terms, user_locations, per_source):
+    index_ids = []
+    if snapshot.geo_index is not None:
+        index_ids.append(snapshot.geo_index.nearest(user_locations, per_source))
+    if snapshot.content_index is not None:
+        index_ids.append(snapshot.content_index.nearest(profile_terms, per_source))
+    if snapshot.collaborative_model is not None:
+        index_ids.append(snapshot.collaborative_model.top_items(user_id, per_source))
+    return _unique_in_order(np.concatenate(index_ids)) if index_ids else []
+
+
+def _popular(hotels, per_source):
+    return hotels.order_by("-average_rating", "-total_reviews").values_list(
+        "id", flat=True
+    )[:per_source]
+
+
+def retrieve_candidates(
+    snapshot,
+    user,
+    hotels,
+    profile_terms,
+    user_locations,
+    per_source=CANDIDATES_PER_SOURCE,
+):
+    """
+    Stage one of the recommender: a bounded candidate set from cheap indexes,
+    for the hybrid scorer to rerank. Sources, in priority order:
+    - popularity: best rated hotels matching the filters (an ordered, limited query)
+    - geographic neighbours of the user's locations (BallTree k-nearest)
+    - content neighbours of the user's profile (inverted index over TF-IDF terms)
+    - collaborative neighbours (highest estimated ratings from the SVD factors)
+    Index-sourced ids are then restricted to `hotels`, so search filters hold.
+    Returns hotel ids in source order, without duplicates.
+    """
+    popular_ids = list(_popular(hotels, per_source))
+
+    index_ids = _index_candidates(
+        snapshot, user.id, profile_terms, user_locations, per_source
+    )
+    if len(index_ids):
+        matching = set(
+            hotels.filter(id__in=index_ids.tolist()).values_list("id", flat=True)
+        )
+        index_ids = [hotel_id for hotel_id in index_ids.tolist() if hotel_id in matching]
+
+    return _unique_in_order(popular_ids + list(index_ids))
+
+
+async def aretrieve_candidates(
+    snapshot,
+    user,
+    hotels,
+    profile_terms,
+    user_locations,
+    per_source=CANDIDATES_PER_SOURCE,
+):
+    """retrieve_candidates with the async ORM"""
+    popular_ids = [hotel_id async for hotel_id in _popular(hotels, per_source)]
+
+    index_ids = _index_candidates(
+        snapshot, user.id, profile_terms, user_locations, per_source
+    )
+    if len(index_ids):
+        matching = {
+            hotel_id
+            async for hotel_id in hotels.filter(id__in=index_ids.tolist()).values_list(
+                "id", flat=True
+            )
+        }
+        index_ids = [hotel_id for hotel_id in index_ids.tolist() if hotel_id in matching]
+
+    return _unique_in_order(popular_ids + list(index_ids))
+
+
+class CandidatePool:
+    """
+    The hotels matching one set of search filters, loaded once so a batch can
+    retrieve candidates for many users without querying per user. Yields the
+    same candidates as retrieve_candidates.
+    """
+
+    def __init__(self, snapshot, hotels, per_source=CANDIDATES_PER_SOURCE):
+        size = catalog_size(snapshot)
+        self.per_source = per_source
+        self.full_scan = size is None or size <= FULL_SCAN_LIMIT
+        self.hotel_ids = np.fromiter(
+            hotels.values_list("id", flat=True), dtype=np.int64
+        )
+        self.popular_ids = [] if self.full_scan else list(_popular(hotels, per_source))
+
+    def candidates(self, snapshot, user_id, profile_terms, user_locations):
+        if self.full_scan:
+            return self.hotel_ids
+        index_ids = _index_candidates(
+            snapshot, user_id, profile_terms, user_locations, self.per_source
+        )
+        if len(index_ids):
+            index_ids = index_ids[np.isin(index_ids, self.hotel_ids)]
+        return _unique_in_order(self.popular_ids + list(index_ids))
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Model snapshot of a worker process, loaded on its first task per version
+_worker_snapshot = None
+
+
+class ScoringPoolBusy(Exception):
+    """No scoring slot freed up within RECOMMENDER_SCORING_TIMEOUT"""
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def score_candidates(version, user_id, profile_terms, user_locations, hotel_ids, limit):
+    """
+    Worker task: rank candidate hotels with the hybrid scorer. Runs in a pool
+    process, which loads each published model version from disk once and
+    keeps it for later tasks.
+    """
+    global _worker_snapshot
+    from .recommendation import recommendation_service
+    from .snapshot import RecommenderSnapshot
+
+    if _worker_snapshot is None or _worker_snapshot.version != version:
+        _worker_snapshot = RecommenderSnapshot.load(version)
+    return recommendation_service.rank_candidates(
+        _worker_snapshot, user_id, profile_terms, user_locations, hotel_ids, limit
+    )
+
+
+class ScoringPool:
+    """
+    Bounded process pool running the hybrid scorer for async views, so NumPy
+    scoring never blocks the event loop and uses more than one core.
+    At most RECOMMENDER_SCORING_WORKERS x RECOMMENDER_SCORING_QUEUE_DEPTH tasks
+    are handed to the workers at a time across the whole server process. The
+    bound is a thread semaphore rather than an asyncio one: under WSGI every
+    async view call runs in its own event loop, so only a process-wide lock
+    sees all requests. Further requests wait for a slot on a helper thread,
+    leaving their event loop free, and raise ScoringPoolBusy after
+    RECOMMENDER_SCORING_TIMEOUT seconds, so a saturated pool sheds load
+    instead of growing an unbounded backlog. With
+    RECOMMENDER_SCORING_WORKERS = 0, or before any model is trained, scoring
+    runs inline in the calling process.
+    Methods:
+        rank(snapshot, user_id, profile_terms, user_locations, hotel_ids, limit):
+            Ids of the top `limit` candidates, best first.
+        shutdown():
+            Stop the worker processes; the pool restarts on next use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._slot_count = None
+
+    @property
+    def workers(self):
+        return settings.RECOMMENDER_SCORING_WORKERS
+
+    def _get_executor(self):
+        # A forked server worker inherits the handle but not the processes
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _get_slots(self):
+        count = self.workers * settings.RECOMMENDER_SCORING_QUEUE_DEPTH
+        with self._lock:
+            if self._slots is None or self._slot_count != count:
+                self._slots = threading.BoundedSemaphore(count)
+                self._slot_count = count
+            return self._slots
+
+    async def _acquire(self, slots):
+        # Block a helper thread on the semaphore so the event loop is free
+        # while the request waits, and wakes as soon as a slot is released
+        loop = asyncio.get_running_loop()
+        waiting = loop.run_in_executor(
+            None, slots.acquire, True, settings.RECOMMENDER_SCORING_TIMEOUT
+        )
+        try:
+            # Shielded: a cancelled request leaves the thread waiting
+            return await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # ...so hand back the slot the thread may still get
+            def release_if_acquired(future):
+                if future.cancelled() or future.exception() is not None:
+                    return
+                if future.result():
+                    slots.release()
+
+            waiting.add_done_callback(release_if_acquired)
+            raise
+
+    async def _run(self, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), score_candidates, *args)
+
+    async def rank(
+        self, snapshot, user_id, profile_terms, user_locations, hotel_ids, limit
+    ):
+        if self.workers <= 0 or snapshot.version is None:
+            from .recommendation import recommendation_service
+
+            return recommendation_service.rank_candidates(
+                snapshot, user_id, profile_terms, user_locations, hotel_ids, limit
+            )
+
+        slots = self._get_slots()
+        if not await self._acquire(slots):
+            raise ScoringPoolBusy()
+        try:
+            return await self._run(
+                snapshot.version,
+                user_id,
+                profile_terms,
+                user_locations,
+                hotel_ids,
+                limit,
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): start a fresh pool next time
+            logger.error("Recommendation scoring pool broke, restarting it")
+            self.shutdown()
+            raise
+        finally:
+            slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pid = None
+
+
+scoring_pool = ScoringPool()
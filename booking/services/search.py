@@ -0,0 +1,137 @@
+import logging
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "booking_hotel_fts"
+# Hotel columns indexed for free-text search, with their BM25 weights
+FTS_COLUMNS = {
+    "name": 10.0,
+    "description": 1.0,
+    "city": 5.0,
+    "area": 5.0,
+    "amenities": 2.0,
+}
+# Words of a free-text query; everything else is dropped so user input can
+# never be parsed as FTS5 query syntax
+QUERY_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_fts_support = {}
+
+
+def fts_available(using="default"):
+    """True when the database is SQLite compiled with FTS5"""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    if using not in _fts_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            _fts_support[using] = bool(cursor.fetchone()[0])
+    return _fts_support[using]
+
+
+def _trigger_sql():
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+    insert = (
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    )
+    delete = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON booking_hotel "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON booking_hotel "
+        f"BEGIN {delete} END",
+        # Rating and price updates leave the indexed columns alone and skip this
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+        f"AFTER UPDATE OF {columns} ON booking_hotel BEGIN {delete} {insert} END",
+    ]
+
+
+def create_search_index(using="default", **kwargs):
+    """
+    Create the FTS5 index over hotels and the triggers keeping it in sync, then
+    fill it if it is new. Connected to post_migrate. The index is an external
+    content table: it reads hotel text from booking_hotel rather than storing a
+    copy, and the triggers keep it current on every insert, update and delete,
+    including bulk_create and queryset updates that send no signals.
+    Returns whether the index exists afterwards.
+    """
+    if not fts_available(using):
+        return False
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if FTS_TABLE in tables:
+            return True
+        if "booking_hotel" not in tables:
+            return False
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"{', '.join(FTS_COLUMNS)}, content='booking_hotel', content_rowid='id', "
+            f"tokenize='porter unicode61')"
+        )
+        weights = ", ".join(str(weight) for weight in FTS_COLUMNS.values())
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', %s)",
+            [f"bm25({weights})"],
+        )
+        for sql in _trigger_sql():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    logger.info("Created hotel full-text search index")
+    return True
+
+
+def rebuild_search_index(using="default"):
+    """Re-read every hotel into the index, e.g. after restoring a database"""
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """
+    FTS5 query matching every word of free text, the last one as a prefix so
+    results follow the user's typing, e.g. 'sea view go' -> '"sea" "view" "go"*'
+    """
+    tokens = QUERY_TOKEN.findall(query or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_hotels(queryset, query):
+    """
+    Restrict a Hotel queryset to hotels matching free text, best BM25 match
+    first. On databases without FTS5, falls back to case-insensitive LIKE
+    over the same columns, keeping the queryset's ordering.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return queryset
+
+    if fts_available(queryset.db):
+        return queryset.filter(search_entry__document__match=expression).order_by(
+            "search_entry__rank"
+        )
+
+    for token in QUERY_TOKEN.findall(query):
+        matches = Q()
+        for column in FTS_COLUMNS:
+            matches |= Q(**{f"{column}__icontains": token})
+        queryset = queryset.filter(matches)
+    return queryset
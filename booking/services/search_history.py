@@ -0,0 +1,113 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from ..models import SearchHistory, UserSearchRollup
+from . import recommendation_cache
+
+
+def _dedup_key(user_id, params):
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f"search-history:{user_id}:{digest}"
+
+
+def record_search(
+    user,
+    city,
+    area="",
+    check_in_date=None,
+    check_out_date=None,
+    guests=2,
+    min_price=None,
+    max_price=None,
+):
+    """
+    Store a search once per SEARCH_HISTORY_DEDUP_WINDOW and count it in the
+    user's rollup. Paging through or re-sorting the same results repeats the
+    search and writes nothing. Returns whether the search was recorded.
+    """
+    today = timezone.localdate()
+    check_in_date = check_in_date or today
+    check_out_date = check_out_date or (today + timedelta(days=1))
+    params = (
+        city.strip().lower(),
+        (area or "").strip().lower(),
+        str(check_in_date),
+        str(check_out_date),
+        int(guests),
+        str(min_price or ""),
+        str(max_price or ""),
+    )
+    # cache.add succeeds only for the first identical search in the window;
+    # each process using a local-memory cache keeps its own window
+    dedup_key = _dedup_key(user.id, params)
+    if not cache.add(dedup_key, True, timeout=settings.SEARCH_HISTORY_DEDUP_WINDOW):
+        return False
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            SearchHistory.objects.create(
+                user=user,
+                city=city,
+                area=area or "",
+                check_in_date=check_in_date,
+                check_out_date=check_out_date,
+                guests=int(guests),
+                min_price=min_price,
+                max_price=max_price,
+            )
+            rollup, _ = UserSearchRollup.objects.get_or_create(user=user)
+            # Count in the database so concurrent searches by the user add up.
+            # The UPDATE also takes the row's write lock on every backend, so
+            # the places read next cannot be overwritten by a racing search.
+            UserSearchRollup.objects.filter(pk=rollup.pk).update(
+                total_searches=F("total_searches") + 1
+            )
+            rollup.refresh_from_db(fields=["locations"])
+            rollup.add(city, area, now)
+            # total_searches was counted above
+            rollup.save(update_fields=["locations", "updated_at"])
+    except Exception:
+        # Nothing was stored: let the next identical search record it
+        cache.delete(dedup_key)
+        raise
+    return True
+
+
+def rebuild_rollups(batch_size=2000):
+    """
+    Recompute every user's rollup from the raw search rows, e.g. after they
+    were bulk loaded. Returns the number of rollups written.
+    """
+    rollups = {}
+    places = (
+        SearchHistory.objects.order_by()
+        .values("user_id", "city", "area")
+        .annotate(count=Count("id"), last_seen=Max("created_at"))
+        .iterator(chunk_size=batch_size)
+    )
+    for place in places:
+        rollup = rollups.setdefault(
+            place["user_id"], UserSearchRollup(user_id=place["user_id"])
+        )
+        rollup.add(place["city"], place["area"], place["last_seen"], place["count"])
+
+    with transaction.atomic():
+        UserSearchRollup.objects.all().delete()
+        UserSearchRollup.objects.bulk_create(rollups.values(), batch_size=batch_size)
+    # bulk_create sends no post_save, which normally does this
+    recommendation_cache.invalidate_all()
+    return len(rollups)
+
+
+def expire_searches(retention_days):
+    """Delete raw searches older than retention_days; rollups keep their counts"""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = SearchHistory.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
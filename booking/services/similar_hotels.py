@@ -0,0 +1,384 @@
+import logging
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q
+from scipy import sparse
+from sklearn.metrics.pairwise import haversine_distances
+from sklearn.neighbors import BallTree
+
+from ..models import Hotel, SimilarHotel, UserInteraction
+from .content_index import amenities_from_mask, analyze_features, hotel_feature_text
+from .geo_index import DISTANCE_DECAY_KM, EARTH_RADIUS_KM, SEARCH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Neighbours stored per hotel: more than a page shows, so a hotel dropping
+# out between rebuilds still leaves enough
+SIMILAR_HOTELS_PER_HOTEL = 10
+# Candidates each source contributes before scoring
+CANDIDATES_PER_SOURCE = 50
+# Weights of the content, location and co-interaction similarities
+SIMILARITY_WEIGHTS = np.array([0.4, 0.35, 0.25])
+# Hotel fields the similarities are computed from
+SIMILARITY_FIELDS = {
+    "city",
+    "area",
+    "hotel_type",
+    "amenities",
+    "amenity_mask",
+    "average_rating",
+    "latitude",
+    "longitude",
+    "is_active",
+}
+
+
+def _place_key(city, area):
+    return ((city or "").strip().lower(), (area or "").strip().lower())
+
+
+def _top(scores, k):
+    """Positions of the k highest positive scores, best first"""
+    positive = np.flatnonzero(scores > 0)
+    if k < len(positive):
+        positive = positive[np.argpartition(-scores[positive], k - 1)[:k]]
+    return positive[np.argsort(-scores[positive], kind="stable")]
+
+
+class HotelSimilarity:
+    """
+    Symmetric hotel-to-hotel similarity over a set of hotels, the weighted sum
+    (SIMILARITY_WEIGHTS) of:
+    - content: Jaccard overlap of the hotels' feature terms (place, type, amenities, rating band)
+    - location: distance decay within SEARCH_RADIUS_KM, as for the recommender's location score
+    - co-interaction: cosine between the sets of users who interacted with each hotel
+    Attributes:
+        hotel_ids (np.ndarray): Sorted hotel ids, one per row.
+        terms (scipy.sparse.csr_matrix): Binary hotel x feature term matrix.
+        coordinates (np.ndarray): (latitude, longitude) in radians per row, NaN when unknown.
+        users (scipy.sparse.csr_matrix): Binary hotel x user matrix of interactions.
+    Methods:
+        build(hotels):
+            Loads features, coordinates and interactions for a Hotel queryset.
+        row_of(hotel_id):
+            Row of a hotel, None when it is not in the set.
+        candidates(row):
+            Rows worth scoring against a hotel: its nearest hotels, the best rated hotels in its area and the hotels most often co-interacted with.
+        scores(row, rows):
+            Content, location and co-interaction similarities of a hotel to other rows, one row each.
+        neighbours(row, rows, k):
+            The k most similar of rows as (hotel id, score), best first.
+    """
+
+    def __init__(self, hotel_ids, terms, coordinates, users, places, ratings):
+        self.hotel_ids = hotel_ids
+        self.terms = terms
+        self.coordinates = coordinates
+        self.users = users
+        self.term_counts = np.asarray(terms.sum(axis=1), dtype=np.float64).ravel()
+        self.user_counts = np.asarray(users.sum(axis=1), dtype=np.float64).ravel()
+        self.users_by_user = users.T.tocsr()
+
+        self.located = np.flatnonzero(~np.isnan(coordinates[:, 0]))
+        self.tree = (
+            BallTree(coordinates[self.located], metric="haversine")
+            if len(self.located)
+            else None
+        )
+        # Best rated hotels first within each place
+        self.places = places
+        self.place_rows = defaultdict(list)
+        for row in np.argsort(-ratings, kind="stable").tolist():
+            rows = self.place_rows[places[row]]
+            if len(rows) <= CANDIDATES_PER_SOURCE:
+                rows.append(row)
+
+    @classmethod
+    def build(cls, hotels, chunk_size=10000):
+        rows = hotels.order_by("id").values_list(
+            "id",
+            "city",
+            "area",
+            "hotel_type",
+            "amenity_mask",
+            "average_rating",
+            "latitude",
+            "longitude",
+        )
+        vocabulary = {}
+        hotel_ids, coordinates, places, ratings = [], [], [], []
+        term_rows, term_columns = [], []
+        for row, (
+            hotel_id,
+            city,
+            area,
+            hotel_type,
+            amenity_mask,
+            average_rating,
+            latitude,
+            longitude,
+        ) in enumerate(rows.iterator(chunk_size=chunk_size)):
+            hotel_ids.append(hotel_id)
+            features = hotel_feature_text(
+                city,
+                area,
+                hotel_type,
+                amenities_from_mask(amenity_mask),
+                average_rating,
+            )
+            for term in set(analyze_features(features)):
+                term_rows.append(row)
+                term_columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            if latitude is None or longitude is None:
+                coordinates.append((np.nan, np.nan))
+            else:
+                coordinates.append((float(latitude), float(longitude)))
+            places.append(_place_key(city, area))
+            ratings.append(float(average_rating))
+
+        hotel_ids = np.asarray(hotel_ids, dtype=np.int64)
+        terms = sparse.csr_matrix(
+            (np.ones(len(term_rows), dtype=np.float32), (term_rows, term_columns)),
+            shape=(len(hotel_ids), len(vocabulary)),
+        )
+
+        # Who interacted with each hotel, regardless of how often or how
+        interactions = (
+            UserInteraction.objects.filter(hotel__in=hotels)
+            .order_by()
+            .values_list("hotel_id", "user_id")
+            .distinct()
+        )
+        pairs = np.fromiter(
+            chain.from_iterable(interactions.iterator(chunk_size=chunk_size)),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        user_ids, user_columns = np.unique(pairs[:, 1], return_inverse=True)
+        users = sparse.csr_matrix(
+            (
+                np.ones(len(pairs), dtype=np.float32),
+                (np.searchsorted(hotel_ids, pairs[:, 0]), user_columns),
+            ),
+            shape=(len(hotel_ids), len(user_ids)),
+        )
+
+        return cls(
+            hotel_ids,
+            terms,
+            np.radians(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)),
+            users,
+            places,
+            np.asarray(ratings, dtype=np.float64),
+        )
+
+    def row_of(self, hotel_id):
+        row = int(np.searchsorted(self.hotel_ids, hotel_id))
+        if row < len(self.hotel_ids) and self.hotel_ids[row] == hotel_id:
+            return row
+        return None
+
+    def candidates(self, row):
+        sources = [np.asarray(self.place_rows[self.places[row]], dtype=np.int64)]
+        if self.tree is not None and not np.isnan(self.coordinates[row, 0]):
+            _, nearest = self.tree.query(
+                self.coordinates[row : row + 1],
+                k=min(CANDIDATES_PER_SOURCE + 1, len(self.located)),
+            )
+            sources.append(self.located[nearest[0]])
+        if self.user_counts[row]:
+            shared = (self.users[row] @ self.users_by_user).tocoo()
+            sources.append(shared.col[_top(shared.data, CANDIDATES_PER_SOURCE + 1)])
+
+        rows = np.unique(np.concatenate(sources))
+        return rows[rows != row]
+
+    def scores(self, row, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+
+        shared_terms = (self.terms[rows] @ self.terms[row].T).toarray().ravel()
+        union = self.term_counts[row] + self.term_counts[rows] - shared_terms
+        content = np.divide(
+            shared_terms, union, out=np.zeros(len(rows)), where=union > 0
+        )
+
+        location = np.zeros(len(rows))
+        if not np.isnan(self.coordinates[row, 0]):
+            located = ~np.isnan(self.coordinates[rows, 0])
+            distances_km = (
+                haversine_distances(
+                    self.coordinates[row : row + 1], self.coordinates[rows[located]]
+                )[0]
+                * EARTH_RADIUS_KM
+            )
+            location[located] = np.where(
+                distances_km <= SEARCH_RADIUS_KM,
+                np.exp(-distances_km / DISTANCE_DECAY_KM),
+                0.0,
+            )
+
+        shared_users = (self.users[rows] @ self.users[row].T).toarray().ravel()
+        norms = np.sqrt(self.user_counts[row] * self.user_counts[rows])
+        co_interaction = np.divide(
+            shared_users, norms, out=np.zeros(len(rows)), where=norms > 0
+        )
+
+        return np.vstack([content, location, co_interaction])
+
+    def neighbours(self, row, rows, k=SIMILAR_HOTELS_PER_HOTEL):
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = SIMILARITY_WEIGHTS @ self.scores(row, rows)
+        best = _top(scores, k)
+        return list(
+            zip(self.hotel_ids[rows[best]].tolist(), scores[best].tolist())
+        )
+
+
+def get_similar_hotels(hotel, limit=3):
+    """
+    The hotels most similar to a hotel: one indexed lookup in the neighbour
+    table, or the best rated hotels in the same area until it has been built
+    """
+    similar = [
+        entry.similar_hotel
+        for entry in SimilarHotel.objects.filter(
+            hotel=hotel, similar_hotel__is_active=True
+        )
+        .select_related("similar_hotel")
+        .order_by("-score")[:limit]
+    ]
+    if similar:
+        return similar
+    return list(
+        Hotel.objects.filter(is_active=True, city=hotel.city, area=hotel.area).exclude(
+            pk=hotel.pk
+        )[:limit]
+    )
+
+
+def rebuild_similar_hotels(batch_size=5000):
+    """
+    Recompute the neighbours of every active hotel. Scoring runs before the
+    write transaction, so the table is only locked while rows are replaced.
+    Returns the number of hotels with neighbours.
+    """
+    similarity = HotelSimilarity.build(Hotel.objects.filter(is_active=True))
+    hotel_ids, similar_ids, scores = [], [], []
+    for row, hotel_id in enumerate(similarity.hotel_ids.tolist()):
+        for similar_id, score in similarity.neighbours(row, similarity.candidates(row)):
+            hotel_ids.append(hotel_id)
+            similar_ids.append(similar_id)
+            scores.append(score)
+
+    with transaction.atomic():
+        SimilarHotel.objects.all().delete()
+        for start in range(0, len(hotel_ids), batch_size):
+            SimilarHotel.objects.bulk_create(
+                [
+                    SimilarHotel(hotel_id=hotel_id, similar_hotel_id=similar_id, score=score)
+                    for hotel_id, similar_id, score in zip(
+                        hotel_ids[start : start + batch_size],
+                        similar_ids[start : start + batch_size],
+                        scores[start : start + batch_size],
+                    )
+                ]
+            )
+    return len(set(hotel_ids))
+
+
+def _candidate_ids(hotel):
+    """Ids of hotels worth scoring against one hotel, from the same sources as a rebuild"""
+    from .recommendation import recommendation_service
+
+    candidate_ids = set(
+        Hotel.objects.filter(is_active=True, city=hotel.city, area=hotel.area)
+        .order_by("-average_rating")
+        .values_list("id", flat=True)[:CANDIDATES_PER_SOURCE]
+    )
+
+    geo_index = recommendation_service.get_snapshot().geo_index
+    if geo_index is not None and hotel.latitude is not None and hotel.longitude is not None:
+        candidate_ids.update(
+            geo_index.nearest(
+                [(float(hotel.latitude), float(hotel.longitude), 1.0)],
+                CANDIDATES_PER_SOURCE,
+            ).tolist()
+        )
+
+    hotel_users = UserInteraction.objects.filter(hotel_id=hotel.id).values("user_id")
+    candidate_ids.update(
+        UserInteraction.objects.filter(user_id__in=hotel_users)
+        .exclude(hotel_id=hotel.id)
+        .values("hotel_id")
+        .annotate(users=Count("user_id", distinct=True))
+        .order_by("-users")
+        .values_list("hotel_id", flat=True)[:CANDIDATES_PER_SOURCE]
+    )
+    return candidate_ids
+
+
+def update_similar_hotels(hotel_id):
+    """
+    Bring the neighbour table up to date after one hotel changed: recompute
+    its own neighbours, then, as similarity is symmetric, rescore it in the
+    lists of hotels that list it or that it now lists. Other hotels' lists are
+    refreshed by the next rebuild.
+    """
+    hotel = Hotel.objects.filter(pk=hotel_id, is_active=True).first()
+    if hotel is None:
+        SimilarHotel.objects.filter(
+            Q(hotel_id=hotel_id) | Q(similar_hotel_id=hotel_id)
+        ).delete()
+        return
+
+    listing = set(
+        SimilarHotel.objects.filter(similar_hotel_id=hotel_id).values_list(
+            "hotel_id", flat=True
+        )
+    )
+    current = set(
+        SimilarHotel.objects.filter(hotel_id=hotel_id).values_list(
+            "similar_hotel_id", flat=True
+        )
+    )
+    candidate_ids = _candidate_ids(hotel) | listing | current
+    similarity = HotelSimilarity.build(
+        Hotel.objects.filter(is_active=True, pk__in=candidate_ids | {hotel_id})
+    )
+    row = similarity.row_of(hotel_id)
+    others = np.flatnonzero(similarity.hotel_ids != hotel_id)
+    scores = dict(
+        zip(
+            similarity.hotel_ids[others].tolist(),
+            (SIMILARITY_WEIGHTS @ similarity.scores(row, others)).tolist(),
+        )
+    )
+    neighbours = similarity.neighbours(row, others)
+
+    affected = listing | {similar_id for similar_id, _ in neighbours}
+    lists = defaultdict(dict)
+    for other_id, similar_id, score in SimilarHotel.objects.filter(
+        hotel_id__in=affected
+    ).values_list("hotel_id", "similar_hotel_id", "score"):
+        lists[other_id][similar_id] = score
+
+    entries = [
+        SimilarHotel(hotel_id=hotel_id, similar_hotel_id=similar_id, score=score)
+        for similar_id, score in neighbours
+    ]
+    for other_id in affected:
+        other_list = lists[other_id]
+        other_list.pop(hotel_id, None)
+        if scores.get(other_id, 0.0) > 0:
+            other_list[hotel_id] = scores[other_id]
+        best = sorted(other_list.items(), key=lambda item: -item[1])
+        entries.extend(
+            SimilarHotel(hotel_id=other_id, similar_hotel_id=similar_id, score=score)
+            for similar_id, score in best[:SIMILAR_HOTELS_PER_HOTEL]
+        )
+
+    with transaction.atomic():
+        SimilarHotel.objects.filter(hotel_id__in=affected | {hotel_id}).delete()
+        SimilarHotel.objects.bulk_create(entries)
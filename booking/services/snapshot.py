@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from . import model_store
+from .collaborative import CollaborativeModel
+from .content_index import HotelFeatureIndex
+from .geo_index import HotelGeoIndex
+
+
+@dataclass(frozen=True)
+class RecommenderSnapshot:
+    """
+    Immutable set of models loaded from one published model version.
+    Request handlers take a reference to the current snapshot once and use it
+    for the whole request, so a concurrent swap never mixes two versions.
+    Attributes:
+        version (str): Published model version, None when nothing is trained yet.
+        collaborative_model (CollaborativeModel): Batch scorer extracted from the SVD model, if trained.
+        content_index (HotelFeatureIndex): Hotel TF-IDF index, if built.
+        geo_index (HotelGeoIndex): BallTree over hotel coordinates, if built.
+    """
+
+    version: Optional[str] = None
+    collaborative_model: Optional[CollaborativeModel] = None
+    content_index: Optional[HotelFeatureIndex] = None
+    geo_index: Optional[HotelGeoIndex] = None
+
+    @classmethod
+    def load(cls, version):
+        if not version:
+            return cls()
+        svd_model = model_store.load_svd_model(version)
+        return cls(
+            version=version,
+            collaborative_model=(
+                CollaborativeModel.from_svd(svd_model) if svd_model else None
+            ),
+            content_index=model_store.load_content_index(version),
+            geo_index=model_store.load_geo_index(version),
+        )
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader, SVD
+
+from ..models import Review, UserInteraction
+
+# Below this many ratings the factorisation is mostly noise
+MIN_TRAINING_RATINGS = 10
+RATING_SCALE = (1, 5)
+
+
+def build_rating_frame(chunk_size=10000):
+    """
+    Build the (user_id, hotel_id, rating) training frame from reviews and
+    interactions. Interaction weights are mapped onto the 1-5 rating scale.
+    """
+    reviews = pd.DataFrame.from_records(
+        Review.objects.values_list("user_id", "hotel_id", "rating").iterator(
+            chunk_size=chunk_size
+        ),
+        columns=["user_id", "hotel_id", "rating"],
+    )
+    interactions = pd.DataFrame.from_records(
+        UserInteraction.objects.values_list("user_id", "hotel_id", "weight").iterator(
+            chunk_size=chunk_size
+        ),
+        columns=["user_id", "hotel_id", "weight"],
+    )
+    interactions["rating"] = np.clip(
+        interactions.pop("weight").astype(float) * 3, *RATING_SCALE
+    )
+
+    return pd.concat([reviews, interactions], ignore_index=True).astype(
+        {"user_id": "int64", "hotel_id": "int64", "rating": "float64"}
+    )
+
+
+def train_svd_model(ratings, **svd_options):
+    """
+    Fit an SVD model on a rating frame. Returns None when there is not enough
+    data for collaborative filtering to be meaningful.
+    """
+    if len(ratings) < MIN_TRAINING_RATINGS:
+        return None
+
+    reader = Reader(rating_scale=RATING_SCALE)
+    dataset = Dataset.load_from_df(ratings[["user_id", "hotel_id", "rating"]], reader)
+
+    model = SVD(**svd_options)
+    model.fit(dataset.build_full_trainset())
+    return model
@@ -0,0 +1,166 @@
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Booking, Review, UserProfileVector
+from .content_index import amenities_from_mask, analyze_features, normalize_amenities
+from accounts.models import UserPreference
+
+# A review contributes to the profile only when the user liked the hotel
+MIN_PROFILE_REVIEW_RATING = 4
+
+
+def _count_terms(features):
+    return Counter(analyze_features(" ".join(str(f) for f in features if f)))
+
+
+def booking_terms(hotel):
+    # No average rating term: it changes with every review of the hotel, so
+    # terms stored at booking time would drift from a rebuild
+    features = [hotel.city, hotel.area, hotel.hotel_type]
+    features.extend(amenities_from_mask(hotel.amenity_mask))
+    return _count_terms(features)
+
+
+def review_terms(review):
+    if review.rating < MIN_PROFILE_REVIEW_RATING:
+        return Counter()
+    hotel = review.hotel
+    features = [hotel.city, hotel.hotel_type]
+    features.extend(amenities_from_mask(hotel.amenity_mask))
+    return _count_terms(features)
+
+
+def preference_terms(user_preference):
+    features = []
+    if user_preference:
+        features.extend(user_preference.locations or [])
+        features.extend(normalize_amenities(user_preference.amenities))
+    return _count_terms(features)
+
+
+def history_terms(user_id):
+    """Term counts from all of a user's bookings and reviews"""
+    return history_terms_bulk([user_id])[user_id]
+
+
+def history_terms_bulk(user_ids):
+    """history_terms for many users with one query per source: {user id: term counts}"""
+    terms = {user_id: Counter() for user_id in user_ids}
+    bookings = Booking.objects.filter(user_id__in=user_ids).select_related("hotel")
+    for booking in bookings:
+        terms[booking.user_id].update(booking_terms(booking.hotel))
+    for review in Review.objects.filter(user_id__in=user_ids).select_related("hotel"):
+        terms[review.user_id].update(review_terms(review))
+    return terms
+
+
+def _create_profile(user):
+    profile, _ = UserProfileVector.objects.get_or_create(
+        user=user,
+        defaults={
+            "preference_terms": dict(
+                preference_terms(getattr(user, "userpreference", None))
+            ),
+            "history_terms": dict(history_terms(user.id)),
+        },
+    )
+    return profile
+
+
+def _create_profiles(users):
+    """_create_profile for many users: one query per source and one insert"""
+    user_ids = [user.id for user in users]
+    preferences = {
+        preference.user_id: preference
+        for preference in UserPreference.objects.filter(user_id__in=user_ids)
+    }
+    history = history_terms_bulk(user_ids)
+    profiles = [
+        UserProfileVector(
+            user_id=user_id,
+            preference_terms=dict(preference_terms(preferences.get(user_id))),
+            history_terms=dict(history[user_id]),
+        )
+        for user_id in user_ids
+    ]
+    # A profile created concurrently is kept; both were built from the same rows
+    UserProfileVector.objects.bulk_create(profiles, ignore_conflicts=True)
+    return {profile.user_id: profile for profile in profiles}
+
+
+def add_history_terms(user_id, terms):
+    """
+    Add term counts from a new booking or review to a stored profile. Users
+    without a profile yet get one built from their full history on first read.
+    """
+    if not terms:
+        return
+    with transaction.atomic():
+        profile = (
+            UserProfileVector.objects.select_for_update()
+            .filter(user_id=user_id)
+            .first()
+        )
+        if profile is None:
+            return
+        history = Counter(profile.history_terms)
+        history.update(terms)
+        profile.history_terms = dict(history)
+        profile.save(update_fields=["history_terms", "updated_at"])
+
+
+def set_preference_terms(user_id, user_preference):
+    """Replace the preference part of a stored profile"""
+    UserProfileVector.objects.filter(user_id=user_id).update(
+        preference_terms=dict(preference_terms(user_preference)),
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_history_terms(user_id):
+    """
+    Recompute the history part of a stored profile, used when a booking or
+    review is edited or deleted and its contribution cannot be subtracted
+    """
+    if not UserProfileVector.objects.filter(user_id=user_id).exists():
+        return
+    UserProfileVector.objects.filter(user_id=user_id).update(
+        history_terms=dict(history_terms(user_id)), updated_at=timezone.now()
+    )
+
+
+def get_profile_terms(user):
+    """
+    Term counts for content-based scoring: a single lookup, building the
+    profile the first time a user is seen
+    """
+    profile = UserProfileVector.objects.filter(user=user).first()
+    if profile is None:
+        profile = _create_profile(user)
+    return profile.terms
+
+
+def get_profile_terms_bulk(users):
+    """
+    get_profile_terms for many users with one lookup: {user id: term counts}.
+    Users seen for the first time get their profiles built and inserted together.
+    """
+    profiles = {
+        profile.user_id: profile
+        for profile in UserProfileVector.objects.filter(user__in=users)
+    }
+    missing = list({user.id: user for user in users if user.id not in profiles}.values())
+    if missing:
+        profiles.update(_create_profiles(missing))
+    return {user.id: profiles[user.id].terms for user in users}
+
+
+async def aget_profile_terms(user):
+    """get_profile_terms with the async ORM"""
+    profile = await UserProfileVector.objects.filter(user=user).afirst()
+    if profile is None:
+        profile = await sync_to_async(_create_profile)(user)
+    return profile.terms
@@ -0,0 +1,129 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import UserPreference
+from .models import (
+    Booking,
+    Hotel,
+    Review,
+    Room,
+    RoomNight,
+    UserInteraction,
+    UserSearchRollup,
+)
+from .services import recommendation_cache, similar_hotels, user_profiles
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=UserInteraction)
+@receiver(post_delete, sender=UserInteraction)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=UserSearchRollup)
+@receiver(post_delete, sender=UserSearchRollup)
+@receiver(post_save, sender=UserPreference)
+@receiver(post_delete, sender=UserPreference)
+def invalidate_user_recommendations(sender, instance, **kwargs):
+    """Cached recommendations for a user depend on that user's activity and preferences"""
+    recommendation_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalidate_all_recommendations(sender, instance, **kwargs):
+    """Any hotel edit can change every user's recommendations"""
+    recommendation_cache.invalidate_all()
+
+
+@receiver(pre_save, sender=Room)
+def remember_room_hotel(sender, instance, **kwargs):
+    """Note the hotel a room belonged to so moving it also updates that hotel"""
+    instance._previous_hotel_id = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_hotel_id = (
+            Room.objects.filter(pk=instance.pk).values_list("hotel_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def update_hotel_price_bounds(sender, instance, **kwargs):
+    """Keep Hotel.min_room_price/max_room_price in step with the hotel's rooms"""
+    hotel_ids = {instance.hotel_id}
+    previous_hotel_id = getattr(instance, "_previous_hotel_id", None)
+    if previous_hotel_id is not None:
+        hotel_ids.add(previous_hotel_id)
+    # A queryset update: no Hotel post_save, and a hotel being deleted is simply skipped
+    Hotel.objects.filter(pk__in=hotel_ids).update(**Hotel.price_bound_updates())
+    recommendation_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Booking)
+def update_room_nights(sender, instance, **kwargs):
+    """Hold the room for an occupying booking's nights and release them otherwise"""
+    # Deleting a booking cascades to its nights
+    RoomNight.sync(instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    """Covers queryset and cascade deletes, which bypass Review methods"""
+    Hotel.adjust_rating(instance.hotel_id, -instance.rating, -1)
+
+
+@receiver(post_save, sender=Booking)
+def add_booking_to_profile(sender, instance, created, **kwargs):
+    if created:
+        user_profiles.add_history_terms(
+            instance.user_id, user_profiles.booking_terms(instance.hotel)
+        )
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_profile(sender, instance, created, **kwargs):
+    if created:
+        user_profiles.add_history_terms(
+            instance.user_id, user_profiles.review_terms(instance)
+        )
+    else:
+        user_profiles.rebuild_history_terms(instance.user_id)
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Review)
+def remove_from_profile(sender, instance, **kwargs):
+    user_profiles.rebuild_history_terms(instance.user_id)
+
+
+@receiver(post_save, sender=UserPreference)
+def update_profile_preferences(sender, instance, **kwargs):
+    user_profiles.set_preference_terms(instance.user_id, instance)
+
+
+@receiver(post_delete, sender=UserPreference)
+def clear_profile_preferences(sender, instance, **kwargs):
+    user_profiles.set_preference_terms(instance.user_id, None)
+
+
+@receiver(post_save, sender=Hotel)
+def update_similar_hotels(sender, instance, update_fields=None, **kwargs):
+    """Re-rank the hotel's neighbours once the save is committed"""
+    if update_fields is not None and not similar_hotels.SIMILARITY_FIELDS.intersection(
+        update_fields
+    ):
+        return
+    hotel_id = instance.pk
+
+    def update():
+        try:
+            similar_hotels.update_similar_hotels(hotel_id)
+        except Exception as e:
+            logger.error(f"Error in update_similar_hotels: {str(e)}")
+
+    transaction.on_commit(update)
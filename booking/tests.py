@@ -1,3 +1,1456 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import FrozenInstanceError
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from accounts.models import UserPreference
+from hotel_booking_recommendation.db_routers import ReadReplicaRouter, use_read_replica
+
+from .models import (
+    Booking,
+    Hotel,
+    Review,
+    Room,
+    RoomNight,
+    SearchHistory,
+    SimilarHotel,
+    UserInteraction,
+    UserProfileVector,
+    UserSearchRollup,
+)
+from .services import model_store, recommendation_cache, retrieval, user_profiles
+from .services.collaborative import CollaborativeModel
+from .services.content_index import HotelFeatureIndex, analyze_features
+from .services.geo_index import HotelGeoIndex
+from .services.interaction_log import InteractionLogger
+from .services.recommendation import (
+    HotelRecommendationService,
+    recommendation_service,
+)
+from .services.reservations import RoomUnavailable, reserve_room
+from .services.scoring_pool import ScoringPool, ScoringPoolBusy
+from .services.retrieval import CandidatePool, retrieve_candidates
+from .services.search import fts_available, search_hotels
+from .services.search_history import record_search
+from .services.similar_hotels import rebuild_similar_hotels
+from .services.snapshot import RecommenderSnapshot
+from .services.training import train_svd_model
+from .views import HotelListView
+
+
+class TemporaryModelDirMixin:
+    """Points RECOMMENDER_MODEL_DIR at a fresh temporary directory for each test"""
+
+    def setUp(self):
+        super().setUp()
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        settings_override = override_settings(RECOMMENDER_MODEL_DIR=model_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.model_dir = model_dir.name
+
+
+class ModelStoreTests(TemporaryModelDirMixin, SimpleTestCase):
+    """Trained versions are published by swapping LATEST and loaded by name"""
+
+    def test_publish_swaps_latest_and_prune_keeps_it(self):
+        self.assertIsNone(model_store.get_latest_version())
+        self.assertEqual(model_store.list_versions(), [])
+
+        first = model_store.create_version()
+        model_store.save_svd_model(first, {"factors": 1})
+        model_store.publish_version(first)
+        second = model_store.create_version()
+        model_store.save_svd_model(second, {"factors": 2})
+
+        # An unpublished version is never served
+        self.assertEqual(model_store.get_latest_version(), first)
+        model_store.publish_version(second)
+        self.assertEqual(model_store.get_latest_version(), second)
+        self.assertEqual(model_store.load_svd_model(second), {"factors": 2})
+        self.assertEqual(os.listdir(self.model_dir).count("LATEST.tmp"), 0)
+
+        third = model_store.create_version()
+        self.assertEqual(model_store.list_versions(), [first, second, third])
+        self.assertIsNone(model_store.load_svd_model(third))
+        # The published version survives pruning even when it is not the newest
+        self.assertEqual(model_store.prune_versions(keep=1), [first])
+        self.assertEqual(model_store.list_versions(), [second, third])
+
+
+class HotelFeatureIndexTests(TemporaryModelDirMixin, TestCase):
+    """The persisted TF-IDF index scores like the fitted vectorizer it came from"""
+
+    def setUp(self):
+        super().setUp()
+        Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city=city,
+                area=area,
+                hotel_type=hotel_type,
+                star_rating=3,
+                amenities=amenities,
+            )
+            for name, city, area, hotel_type, amenities in [
+                ("Baga Resort", "Goa", "Baga", "resort", ["pool", "spa"]),
+                ("Baga Inn", "Goa", "Baga", "hotel", ["wifi"]),
+                ("Colaba Hotel", "Mumbai", "Colaba", "hotel", ["wifi", "gym"]),
+            ]
+        )
+        self.hotel_ids = list(Hotel.objects.order_by("id").values_list("id", flat=True))
+
+    def test_saved_index_scores_like_the_vectorizer(self):
+        index = HotelFeatureIndex.build()
+        version = model_store.create_version()
+        model_store.save_content_index(version, index)
+        loaded = model_store.load_content_index(version)
+
+        terms = Counter(analyze_features("goa resort pool spa"))
+        query = index.vectorizer.transform(["goa resort pool spa"])
+        expected = (index.matrix @ query.T).toarray().ravel()
+        # A hotel id missing from the index scores 0
+        np.testing.assert_allclose(
+            loaded.score(terms, self.hotel_ids + [0]), [*expected, 0.0], rtol=1e-6
+        )
+        self.assertEqual(loaded.nearest(terms, 2).tolist(), self.hotel_ids[:2])
+        self.assertEqual(loaded.nearest(Counter(), 2).tolist(), [])
+
+
+@override_settings(RECOMMENDER_RELOAD_INTERVAL=3600)
+class RecommenderSnapshotTests(TemporaryModelDirMixin, SimpleTestCase):
+    """Requests keep the snapshot they started with while a new version is swapped in"""
+
+    def publish(self):
+        version = model_store.create_version()
+        model_store.publish_version(version)
+        return version
+
+    def test_reload_swaps_in_new_versions_only(self):
+        service = HotelRecommendationService()
+        self.assertIsNone(service.get_snapshot().version)
+
+        first = self.publish()
+        held = service.reload()
+        self.assertEqual(held.version, first)
+        with self.assertRaises(FrozenInstanceError):
+            held.version = None
+
+        second = self.publish()
+        # Checks for new versions wait for RECOMMENDER_RELOAD_INTERVAL
+        self.assertIs(service.get_snapshot(), held)
+        self.assertEqual(service.reload().version, second)
+        self.assertIs(service.reload(), service.get_snapshot())
+        self.assertEqual(held.version, first)
+
+
+class HybridRankingTests(TestCase):
+    """The fused NumPy ranking equals the per-hotel weighted sum, best first"""
+
+    def setUp(self):
+        Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city=city,
+                area="Centre",
+                hotel_type=hotel_type,
+                star_rating=3,
+                latitude=latitude,
+                longitude=longitude,
+            )
+            for name, city, hotel_type, latitude, longitude in [
+                ("Goa Resort", "Goa", "resort", 15.55, 73.75),
+                ("Goa Hotel", "Goa", "hotel", 15.56, 73.76),
+                ("Pune Resort", "Pune", "resort", 18.52, 73.85),
+                ("Mumbai Hotel", "Mumbai", "hotel", 18.91, 72.81),
+            ]
+        )
+        self.snapshot = RecommenderSnapshot(
+            content_index=HotelFeatureIndex.build(), geo_index=HotelGeoIndex.build()
+        )
+
+    def test_rank_matches_weighted_sum(self):
+        hotel_ids = np.fromiter(
+            Hotel.objects.order_by("id").values_list("id", flat=True), dtype=np.int64
+        )
+        profile_terms = Counter(analyze_features("resort"))
+        user_locations = [(15.55, 73.75, 1.0)]
+        content, collaborative, location = recommendation_service.component_scores(
+            self.snapshot, 1, profile_terms, user_locations, hotel_ids
+        )
+        # The weighted sum and sort the NumPy fusion replaced
+        weighted = {
+            hotel_id: 0.4 * content_score + 0.35 * cf_score + 0.25 * location_score
+            for hotel_id, content_score, cf_score, location_score in zip(
+                hotel_ids.tolist(), content, collaborative, location
+            )
+        }
+        expected = sorted(weighted, key=weighted.get, reverse=True)
+
+        ranked = recommendation_service.rank_candidates(
+            self.snapshot, 1, profile_terms, user_locations, hotel_ids, 3
+        )
+        self.assertEqual(ranked, expected[:3])
+        self.assertEqual(ranked[0], Hotel.objects.get(name="Goa Resort").id)
+
+
+class CollaborativeScoringTests(SimpleTestCase):
+    """The batch SVD scorer and top-k selection match their one-by-one versions"""
+
+    def ratings(self):
+        rng = np.random.default_rng(0)
+        return pd.DataFrame(
+            {
+                "user_id": rng.integers(1, 20, 300),
+                "hotel_id": rng.integers(1, 30, 300),
+                "rating": rng.integers(1, 6, 300).astype(float),
+            }
+        )
+
+    def test_scores_match_svd_predict(self):
+        hotel_ids = [1, 7, 29, 999]  # 999 is not in the training set
+        for biased in [True, False]:
+            algo = train_svd_model(self.ratings(), biased=biased, random_state=0)
+            model = CollaborativeModel.from_svd(algo)
+            for user_id in [1, 5, 999]:
+                with self.subTest(biased=biased, user_id=user_id):
+                    np.testing.assert_allclose(
+                        model.score(user_id, hotel_ids),
+                        [algo.predict(user_id, hotel_id).est for hotel_id in hotel_ids],
+                    )
+
+    def test_top_k_is_a_stable_sort(self):
+        scores = np.array([1.0, 2.0, 2.0, 0.0, 2.0, 1.0, 2.0, 0.5])
+        top_k = recommendation_service._top_k
+        for k in range(1, 10):
+            with self.subTest(k=k):
+                self.assertEqual(
+                    top_k(scores, k).tolist(),
+                    np.argsort(-scores, kind="stable")[:k].tolist(),
+                )
+        self.assertEqual(top_k(np.zeros(20), 5).tolist(), [0, 1, 2, 3, 4])
+
+
+class RecommendationCacheTests(TestCase):
+    """Saves invalidate the cached results they affect and no others"""
+
+    params = recommendation_cache.normalize_params("Goa", "", 2, None, None, 6)
+
+    def setUp(self):
+        recommendation_cache.get_cache().clear()
+        self.guest = User.objects.create_user("guest")
+        self.other_guest = User.objects.create_user("other guest")
+        self.hotel = Hotel.objects.create(
+            name="Baga Inn",
+            description="",
+            address="1 Main Road",
+            city="Goa",
+            area="Baga",
+            hotel_type="hotel",
+            star_rating=3,
+        )
+        self.room = Room.objects.create(
+            hotel=self.hotel,
+            room_type="double",
+            room_number="101",
+            capacity=2,
+            price_per_night=100,
+        )
+
+    def cache_results(self):
+        for user in [self.guest, self.other_guest]:
+            key = recommendation_cache.make_key(user.id, "v1", self.params)
+            recommendation_cache.set_result(key, [self.hotel.id])
+
+    def cached(self, user):
+        key = recommendation_cache.make_key(user.id, "v1", self.params)
+        return recommendation_cache.get_result(key) is not None
+
+    def test_user_activity_invalidates_only_that_user(self):
+        check_in = date.today() + timedelta(days=30)
+        saves = {
+            "booking": lambda: Booking.objects.create(
+                user=self.guest,
+                hotel=self.hotel,
+                room=self.room,
+                check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=2),
+                guests=2,
+                total_amount=200,
+            ),
+            "review": lambda: Review.objects.create(
+                user=self.guest, hotel=self.hotel, rating=4, title="Stay", comment=""
+            ),
+            "preference": lambda: UserPreference.objects.create(
+                user=self.guest, locations=["Goa"]
+            ),
+            "interaction": lambda: UserInteraction.objects.create(
+                user=self.guest, hotel=self.hotel, interaction_type="view", weight=1
+            ),
+        }
+        for name, save in saves.items():
+            with self.subTest(name):
+                self.cache_results()
+                save()
+                self.assertFalse(self.cached(self.guest))
+                self.assertTrue(self.cached(self.other_guest))
+
+    def test_generation_tokens_are_shared_through_the_database(self):
+        # Another server process sees the token this one bumped
+        key = recommendation_cache.make_key(self.guest.id, "v1", self.params)
+        recommendation_cache.invalidate_user(self.guest.id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM recommendation_generations WHERE cache_key LIKE %s",
+                ["%generation:user:" + str(self.guest.id)],
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertNotEqual(
+            recommendation_cache.make_key(self.guest.id, "v1", self.params), key
+        )
+
+    def test_hotel_and_room_changes_invalidate_everyone(self):
+        for obj in [self.hotel, self.room]:
+            with self.subTest(type(obj).__name__):
+                self.cache_results()
+                obj.save()
+                self.assertFalse(self.cached(self.guest))
+                self.assertFalse(self.cached(self.other_guest))
+
+
+class UserProfileTests(TestCase):
+    """Incrementally maintained profiles equal a rebuild from scratch"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("guest")
+        self.goa, self.mumbai = Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city=city,
+                area="Centre",
+                hotel_type=hotel_type,
+                star_rating=3,
+                amenities=amenities,
+            )
+            for name, city, hotel_type, amenities in [
+                ("Goa Resort", "Goa", "resort", ["pool", "spa"]),
+                ("Mumbai Hotel", "Mumbai", "hotel", ["wifi", "gym"]),
+            ]
+        )
+        self.rooms = [
+            Room.objects.create(
+                hotel=hotel,
+                room_type="double",
+                room_number="101",
+                capacity=2,
+                price_per_night=100,
+            )
+            for hotel in [self.goa, self.mumbai]
+        ]
+
+    def book(self, room):
+        check_in = date.today() + timedelta(days=30)
+        return Booking.objects.create(
+            user=self.user,
+            hotel=room.hotel,
+            room=room,
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=2),
+            guests=2,
+            total_amount=200,
+        )
+
+    def assertProfileIsCurrent(self):
+        profile = UserProfileVector.objects.get(user=self.user)
+        preference = UserPreference.objects.filter(user=self.user).first()
+        self.assertEqual(
+            profile.preference_terms, dict(user_profiles.preference_terms(preference))
+        )
+        self.assertEqual(
+            profile.history_terms, dict(user_profiles.history_terms(self.user.id))
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        preference = UserPreference.objects.create(user=self.user, locations=["Goa"])
+        self.assertIn("goa", user_profiles.get_profile_terms(self.user))
+
+        booking = self.book(self.rooms[0])
+        self.book(self.rooms[1])
+        self.assertProfileIsCurrent()
+
+        # Only liked hotels count; editing a review rebuilds the history
+        review = Review.objects.create(
+            user=self.user, hotel=self.mumbai, rating=2, title="Stay", comment=""
+        )
+        self.assertProfileIsCurrent()
+        review.rating = 5
+        review.save()
+        self.assertProfileIsCurrent()
+
+        preference.amenities = ["spa"]
+        preference.save()
+        booking.delete()
+        self.assertProfileIsCurrent()
+
+        incremental = user_profiles.get_profile_terms(self.user)
+        call_command("rebuild_user_profiles", stdout=StringIO())
+        self.assertEqual(user_profiles.get_profile_terms(self.user), incremental)
+
+    def test_profile_terms_use_the_indexed_amenity_vocabulary(self):
+        self.goa.amenities = ["Pool", "helipad"]
+        self.goa.save()
+        UserPreference.objects.create(user=self.user, amenities=["SPA", "yacht"])
+        self.book(self.rooms[0])
+
+        index = HotelFeatureIndex.build()
+        vocabulary = set(index.vectorizer.vocabulary_)
+        terms = user_profiles.get_profile_terms(self.user)
+        self.assertTrue({"pool", "spa"} <= set(terms))
+        self.assertFalse({"helipad", "yacht"} & set(terms))
+        self.assertNotIn("helipad", vocabulary)
+
+    def test_bulk_lookup_creates_missing_profiles_together(self):
+        self.book(self.rooms[0])
+        UserPreference.objects.create(user=self.user, locations=["Mumbai"])
+        users = [self.user] + [
+            User.objects.create_user(f"guest {i}") for i in range(5)
+        ]
+
+        # Profiles, preferences, bookings and reviews reads plus one insert
+        with self.assertNumQueries(5):
+            terms = user_profiles.get_profile_terms_bulk(users + users[:2])
+        self.assertEqual(UserProfileVector.objects.count(), len(users))
+        self.assertEqual(terms[self.user.id], user_profiles.get_profile_terms(self.user))
+        self.assertIn("goa", terms[self.user.id])
+        self.assertIn("mumbai", terms[self.user.id])
+        self.assertEqual(terms[users[1].id], {})
+
+        with self.assertNumQueries(1):
+            user_profiles.get_profile_terms_bulk(users)
+
+
+class HotelGeoIndexTests(TestCase):
+    """Location scores decay with haversine distance and stop at the search radius"""
+
+    def setUp(self):
+        # Due north of Baga: one degree of latitude is about 111.2 km
+        Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city="Goa",
+                area=area,
+                hotel_type="hotel",
+                star_rating=3,
+                latitude=latitude,
+                longitude=73.75 if latitude is not None else None,
+            )
+            for name, area, latitude in [
+                ("Near", "Baga", 15.595),
+                ("Mid", "Baga", 15.82),
+                ("Far", "Pernem", 16.27),
+                ("Unmapped", "Baga", None),
+            ]
+        )
+        self.ids = dict(Hotel.objects.values_list("name", "id"))
+        self.index = HotelGeoIndex.build()
+
+    def test_scores_and_neighbours_within_radius(self):
+        origin = [(15.55, 73.75, 1.0)]
+        near, mid, far, unmapped = self.index.score(
+            origin, [self.ids[name] for name in ["Near", "Mid", "Far", "Unmapped"]]
+        )
+        self.assertAlmostEqual(near, np.exp(-5.0 / 10.0), places=2)
+        self.assertAlmostEqual(mid, np.exp(-30.0 / 10.0), places=2)
+        # Beyond SEARCH_RADIUS_KM, and hotels without coordinates, score 0
+        self.assertEqual((far, unmapped), (0.0, 0.0))
+
+        self.assertEqual(
+            self.index.nearest(origin, 2).tolist(), [self.ids["Near"], self.ids["Mid"]]
+        )
+        self.assertEqual(len(self.index.hotel_ids), 3)
+        np.testing.assert_allclose(self.index.locate("goa", "baga"), (15.7075, 73.75))
+        np.testing.assert_allclose(self.index.locate("Goa", "Unknown"), (15.895, 73.75))
+
+
+class CandidateRetrievalTests(TestCase):
+    """Retrieval bounds the candidates per source and keeps the search filters"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("guest")
+        Hotel.objects.bulk_create(
+            Hotel(
+                name=f"{city} {i}",
+                description="",
+                address=f"{i} Main Road",
+                city=city,
+                area="Centre",
+                hotel_type="resort" if i % 2 else "hotel",
+                star_rating=3,
+                latitude=latitude + i * 0.01,
+                longitude=longitude,
+                average_rating=round(1 + i * 0.2, 2),
+            )
+            for city, latitude, longitude in [("Goa", 15.5, 73.8), ("Pune", 18.5, 73.9)]
+            for i in range(15)
+        )
+        self.snapshot = RecommenderSnapshot(
+            content_index=HotelFeatureIndex.build(), geo_index=HotelGeoIndex.build()
+        )
+
+    def test_candidates_are_bounded_and_filtered(self):
+        hotels = Hotel.objects.filter(is_active=True, city="Goa")
+        profile_terms = Counter(analyze_features("resort"))
+        # Next to the Pune hotels, which the city filter excludes
+        user_locations = [(18.5, 73.9, 1.0)]
+
+        candidates = retrieve_candidates(
+            self.snapshot,
+            self.user,
+            hotels,
+            profile_terms,
+            user_locations,
+            per_source=4,
+        ).tolist()
+
+        goa_ids = set(hotels.values_list("id", flat=True))
+        by_rating = list(
+            hotels.order_by("-average_rating").values_list("id", flat=True)[:4]
+        )
+        self.assertEqual(candidates[:4], by_rating)
+        self.assertLessEqual(len(candidates), 4 * 2)
+        self.assertEqual(len(set(candidates)), len(candidates))
+        self.assertLessEqual(set(candidates), goa_ids)
+
+        with mock.patch.object(retrieval, "FULL_SCAN_LIMIT", 10):
+            pool = CandidatePool(self.snapshot, hotels, per_source=4)
+        self.assertEqual(
+            pool.candidates(
+                self.snapshot, self.user.id, profile_terms, user_locations
+            ).tolist(),
+            candidates,
+        )
+        # Catalogs within FULL_SCAN_LIMIT skip retrieval and score every hotel
+        pool = CandidatePool(self.snapshot, hotels)
+        self.assertEqual(
+            set(
+                pool.candidates(
+                    self.snapshot, self.user.id, profile_terms, user_locations
+                ).tolist()
+            ),
+            goa_ids,
+        )
+
+
+class HotelPriceBoundTests(TestCase):
+    """Hotel.min_room_price/max_room_price follow every room change"""
+
+    def setUp(self):
+        self.hotel, self.other = Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city="Goa",
+                area="Baga",
+                hotel_type="hotel",
+                star_rating=3,
+            )
+            for name in ["Baga Inn", "Baga Stay"]
+        )
+
+    def create_room(self, number, price, hotel=None):
+        return Room.objects.create(
+            hotel=hotel or self.hotel,
+            room_type="double",
+            room_number=number,
+            capacity=2,
+            price_per_night=price,
+        )
+
+    def assertBounds(self, hotel, min_price, max_price):
+        hotel.refresh_from_db()
+        self.assertEqual(
+            (hotel.min_room_price, hotel.max_room_price),
+            (
+                None if min_price is None else Decimal(min_price),
+                None if max_price is None else Decimal(max_price),
+            ),
+        )
+
+    def test_bounds_follow_room_changes(self):
+        room = self.create_room("101", "300.00")
+        self.create_room("102", "500.00")
+        self.assertBounds(self.hotel, "300.00", "500.00")
+
+        room.price_per_night = Decimal("600.00")
+        room.save()
+        self.assertBounds(self.hotel, "500.00", "600.00")
+
+        room.is_available = False
+        room.save()
+        self.assertBounds(self.hotel, "500.00", "500.00")
+
+        Room.objects.get(room_number="102").delete()
+        self.assertBounds(self.hotel, None, None)
+
+    def test_moving_a_room_updates_both_hotels(self):
+        room = self.create_room("101", "300.00")
+        self.create_room("201", "450.00", hotel=self.other)
+
+        room.hotel = self.other
+        room.save()
+
+        self.assertBounds(self.hotel, None, None)
+        self.assertBounds(self.other, "300.00", "450.00")
+
+
+class HotelRatingTests(TestCase):
+    """Review changes keep each hotel's running rating totals exact"""
+
+    def setUp(self):
+        self.hotel, self.other = Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city="Goa",
+                area="Baga",
+                hotel_type="hotel",
+                star_rating=3,
+            )
+            for name in ["Baga Inn", "Baga Stay"]
+        )
+        self.guest = User.objects.create_user("guest")
+        self.other_guest = User.objects.create_user("other guest")
+
+    def create_review(self, user, rating):
+        return Review.objects.create(
+            user=user, hotel=self.hotel, rating=rating, title="Stay", comment=""
+        )
+
+    def assertRating(self, hotel, rating_sum, total_reviews, average):
+        hotel.refresh_from_db()
+        self.assertEqual(
+            (hotel.rating_sum, hotel.total_reviews, hotel.average_rating),
+            (rating_sum, total_reviews, Decimal(average)),
+        )
+
+    def test_totals_follow_review_changes(self):
+        review = self.create_review(self.guest, 5)
+        self.create_review(self.other_guest, 2)
+        self.assertRating(self.hotel, 7, 2, "3.50")
+
+        review.rating = 4
+        review.save()
+        self.assertRating(self.hotel, 6, 2, "3.00")
+
+        review.hotel = self.other
+        review.save()
+        self.assertRating(self.hotel, 2, 1, "2.00")
+        self.assertRating(self.other, 4, 1, "4.00")
+
+        review.delete()
+        self.assertRating(self.other, 0, 0, "0.00")
+
+        Review.objects.filter(hotel=self.hotel).delete()
+        self.assertRating(self.hotel, 0, 0, "0.00")
+
+    def test_rebuild_ratings_recomputes_totals(self):
+        self.create_review(self.guest, 5)
+        self.create_review(self.other_guest, 4)
+        Hotel.objects.update(rating_sum=99, total_reviews=1, average_rating=5)
+
+        call_command("rebuild_ratings", stdout=StringIO())
+
+        self.assertRating(self.hotel, 9, 2, "4.50")
+        self.assertRating(self.other, 0, 0, "0.00")
+
+
+# A plan line scanning a table without any index, e.g. "2 0 0 SCAN booking_hotel"
+FULL_SCAN = re.compile(r"\bSCAN \S+$", re.MULTILINE)
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are checked against SQLite")
+class HotQueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN checks for the hottest query shapes. Each one must be
+    served by its index rather than a full table scan, and ordered ones must
+    not sort in a temporary B-tree, so latency stays flat as tables grow.
+    """
+
+    def assertUsesIndex(self, queryset, index_name, ordered=False):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+        self.assertIsNone(FULL_SCAN.search(plan), f"Full table scan:\n{plan}")
+        if ordered:
+            self.assertNotIn("TEMP B-TREE", plan, plan)
+
+    def hotel_list_queryset(self, **params):
+        request = RequestFactory().get("/booking/hotels/", params)
+        request.user = AnonymousUser()
+        view = HotelListView()
+        view.setup(request)
+        return view.get_queryset()[: view.paginate_by]
+
+    def test_hotel_list_by_rating_uses_rating_index(self):
+        self.assertUsesIndex(
+            self.hotel_list_queryset(sort_by="rating"),
+            "hotel_active_rating_idx",
+            ordered=True,
+        )
+        self.assertUsesIndex(
+            self.hotel_list_queryset(city="Mumbai", sort_by="rating"),
+            "hotel_active_rating_idx",
+            ordered=True,
+        )
+
+    def test_hotel_list_by_price_uses_price_index(self):
+        self.assertUsesIndex(
+            self.hotel_list_queryset(sort_by="price_low"), "min_room_price", ordered=True
+        )
+
+    @skipUnless(fts_available(), "SQLite is built without FTS5")
+    def test_hotel_search_uses_full_text_index(self):
+        self.assertUsesIndex(
+            self.hotel_list_queryset(q="sea view"), "booking_hotel_fts VIRTUAL TABLE"
+        )
+
+    def test_hotel_list_by_dates_uses_room_night_index(self):
+        self.assertUsesIndex(
+            self.hotel_list_queryset(
+                check_in_date="2025-01-01", check_out_date="2025-01-04", guests=2
+            ),
+            # SQLite backs the unique (room, night) constraint with an automatic index
+            "sqlite_autoindex_booking_roomnight",
+        )
+
+    def test_popular_hotels_use_rating_index(self):
+        queryset = (
+            Hotel.objects.filter(is_active=True)
+            .order_by("-average_rating", "-total_reviews")
+            .values_list("id", flat=True)[:100]
+        )
+        self.assertUsesIndex(queryset, "hotel_active_rating_idx", ordered=True)
+
+    def test_hotels_by_city_and_area_use_location_index(self):
+        queryset = Hotel.objects.filter(is_active=True, city="Goa", area="Baga")
+        self.assertUsesIndex(queryset, "hotel_active_city_area_idx")
+
+    def test_room_availability_uses_booking_index(self):
+        queryset = Booking.objects.filter(
+            room_id=1,
+            booking_status__in=["confirmed", "checked_in"],
+            check_in_date__lt=date(2025, 1, 5),
+            check_out_date__gt=date(2025, 1, 1),
+        ).order_by()[:1]
+        self.assertUsesIndex(queryset, "booking_room_status_dates_idx")
+
+    def test_similar_hotels_use_neighbour_index(self):
+        queryset = (
+            SimilarHotel.objects.filter(hotel_id=1, similar_hotel__is_active=True)
+            .select_related("similar_hotel")
+            .order_by("-score")[:3]
+        )
+        self.assertUsesIndex(queryset, "similarhotel_hotel_score_idx", ordered=True)
+
+    def test_recent_interactions_use_user_index(self):
+        queryset = UserInteraction.objects.filter(user_id=1)[:20]
+        self.assertUsesIndex(queryset, "interaction_user_recent_idx", ordered=True)
+
+    def test_hotel_interactions_use_hotel_index(self):
+        queryset = UserInteraction.objects.filter(hotel_id=1).order_by()
+        self.assertUsesIndex(queryset, "hotel_id")
+
+    def test_recent_searches_use_user_index(self):
+        queryset = SearchHistory.objects.filter(user_id=1).values_list("city", "area")[
+            :10
+        ]
+        self.assertUsesIndex(queryset, "search_user_recent_idx", ordered=True)
+
+
+@skipUnless(fts_available(), "SQLite is built without FTS5")
+class AmenityMaskTests(TestCase):
+    """amenity_mask mirrors Hotel.amenities and has_all filters on it"""
+
+    def setUp(self):
+        self.spa, self.pool = Hotel.objects.bulk_create(
+            Hotel(
+                name=name,
+                description="",
+                address="1 Main Road",
+                city="Goa",
+                area="Baga",
+                hotel_type="hotel",
+                star_rating=3,
+                amenities=amenities,
+            )
+            for name, amenities in [
+                ("Spa Inn", ["wifi", "spa", "gym", "helipad"]),
+                ("Pool Inn", ["WiFi", "pool"]),
+            ]
+        )
+
+    def with_amenities(self, *amenities):
+        return set(
+            Hotel.objects.filter(amenity_mask__has_all=list(amenities)).values_list(
+                "name", flat=True
+            )
+        )
+
+    def test_has_all_requires_every_amenity(self):
+        self.assertEqual(self.with_amenities("wifi"), {"Spa Inn", "Pool Inn"})
+        self.assertEqual(self.with_amenities("wifi", "spa", "gym"), {"Spa Inn"})
+        self.assertEqual(self.with_amenities("spa", "pool"), set())
+        # Unknown names are kept in the list but can never match
+        self.assertEqual(self.with_amenities("wifi", "helipad"), set())
+        self.assertEqual(
+            Hotel._meta.get_field("amenity_mask").values_from_mask(self.spa.amenity_mask),
+            ["wifi", "spa", "gym"],
+        )
+
+    def test_mask_follows_amenity_changes(self):
+        self.pool.amenities = ["pool", "spa"]
+        self.pool.save()
+        self.assertEqual(self.with_amenities("spa"), {"Spa Inn", "Pool Inn"})
+        self.assertEqual(self.with_amenities("wifi"), {"Spa Inn"})
+
+        # Queryset updates skip pre_save; rebuild_amenity_masks repairs them
+        Hotel.objects.update(amenity_mask=0)
+        self.assertEqual(self.with_amenities("spa"), set())
+        call_command("rebuild_amenity_masks", stdout=StringIO())
+        self.assertEqual(self.with_amenities("spa"), {"Spa Inn", "Pool Inn"})
+
+
+class HotelSearchTests(TestCase):
+    """Full-text search stays in sync with hotel writes and ranks by relevance"""
+
+    def create_hotel(self, name, description="", **fields):
+        return Hotel.objects.create(
+            name=name,
+            description=description,
+            address="1 Main Road",
+            city=fields.pop("city", "Goa"),
+            area=fields.pop("area", "Baga"),
+            hotel_type="hotel",
+            star_rating=3,
+            **fields,
+        )
+
+    def search(self, query):
+        return list(
+            search_hotels(Hotel.objects.all(), query).values_list("name", flat=True)
+        )
+
+    def test_ranks_name_matches_first(self):
+        self.create_hotel("Quiet Palms", "A short walk to the beach")
+        self.create_hotel("Beach House")
+        self.create_hotel("Hill Top", "Mountain views")
+
+        self.assertEqual(self.search("beach"), ["Beach House", "Quiet Palms"])
+        self.assertEqual(self.search("beac"), ["Beach House", "Quiet Palms"])
+
+    def test_index_follows_saves_updates_and_deletes(self):
+        hotel = self.create_hotel("Hill Top", amenities=["wifi"])
+        self.assertEqual(self.search("wifi"), ["Hill Top"])
+
+        hotel.name = "Lake View"
+        hotel.save()
+        self.assertEqual(self.search("hill"), [])
+        self.assertEqual(self.search("lake"), ["Lake View"])
+
+        Hotel.objects.filter(pk=hotel.pk).update(area="Lakeside")
+        self.assertEqual(self.search("lakeside"), ["Lake View"])
+
+        hotel.delete()
+        self.assertEqual(self.search("lake"), [])
+
+    def test_query_syntax_is_treated_as_text(self):
+        self.create_hotel("Sea Breeze")
+
+        self.assertEqual(self.search('sea" OR NEAR(*'), [])
+        self.assertEqual(self.search("sea -breeze"), ["Sea Breeze"])
+
+    def test_search_form_needs_a_query_or_a_city(self):
+        check_in = date.today() + timedelta(days=7)
+        dates = {
+            "check_in_date": check_in,
+            "check_out_date": check_in + timedelta(days=1),
+            "guests": 2,
+        }
+
+        response = self.client.post(reverse("booking:search"), {"q": "beach", **dates})
+        self.assertRedirects(
+            response,
+            f"/booking/hotels/?q=beach&check_in_date={dates['check_in_date']}"
+            f"&check_out_date={dates['check_out_date']}&guests=2",
+            fetch_redirect_response=False,
+        )
+
+        response = self.client.post(reverse("booking:search"), dates)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["form"].non_field_errors(), ["Enter a search term or a city."]
+        )
+
+
+class RoomNightAvailabilityTests(TestCase):
+    """Booked nights follow booking status and hide fully booked hotels by date"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("guest")
+        self.hotel = Hotel.objects.create(
+            name="Harbour Inn",
+            description="",
+            address="1 Main Road",
+            city="Goa",
+            area="Baga",
+            hotel_type="hotel",
+            star_rating=3,
+        )
+        self.room = Room.objects.create(
+            hotel=self.hotel,
+            room_type="double",
+            room_number="101",
+            capacity=2,
+            price_per_night=100,
+        )
+        self.check_in = date.today() + timedelta(days=30)
+
+    def book(self, nights, **fields):
+        return Booking.objects.create(
+            user=self.user,
+            hotel=self.hotel,
+            room=self.room,
+            check_in_date=self.check_in,
+            check_out_date=self.check_in + timedelta(days=nights),
+            guests=2,
+            total_amount=100 * nights,
+            **fields,
+        )
+
+    def available_hotels(self, first_night, nights):
+        request = RequestFactory().get(
+            "/booking/hotels/",
+            {
+                "check_in_date": first_night.isoformat(),
+                "check_out_date": (first_night + timedelta(days=nights)).isoformat(),
+                "guests": 2,
+            },
+        )
+        request.user = AnonymousUser()
+        view = HotelListView()
+        view.setup(request)
+        return list(view.get_queryset())
+
+    def test_booking_holds_its_nights_until_cancelled(self):
+        booking = self.book(3)
+        self.assertEqual(RoomNight.objects.filter(booking=booking).count(), 3)
+
+        booking.booking_status = "cancelled"
+        booking.save()
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_list_hides_hotels_without_a_free_room_for_the_stay(self):
+        self.book(3, booking_status="confirmed")
+
+        self.assertEqual(self.available_hotels(self.check_in + timedelta(days=2), 2), [])
+        self.assertEqual(
+            self.available_hotels(self.check_in + timedelta(days=3), 2), [self.hotel]
+        )
+        self.assertEqual(
+            self.available_hotels(self.check_in - timedelta(days=1), 1), [self.hotel]
+        )
+
+    def test_list_ignores_stays_that_end_before_they_start(self):
+        self.room.capacity = 1
+        self.room.save()
+        other = Hotel.objects.create(
+            name="Beach Hut",
+            description="",
+            address="2 Main Road",
+            city="Goa",
+            area="Calangute",
+            hotel_type="hotel",
+            star_rating=2,
+        )
+
+        # A reversed range books no nights, so the filter must not run at
+        # all rather than report every room as free
+        self.assertCountEqual(self.available_hotels(self.check_in, -2), [self.hotel, other])
+        self.assertCountEqual(self.available_hotels(self.check_in, 0), [self.hotel, other])
+        self.assertEqual(self.available_hotels(self.check_in, 2), [])
+
+    def test_reserve_room_rejects_overlaps_and_replays_retries(self):
+        def stay(first_night, key):
+            return Booking(
+                user=self.user,
+                hotel=self.hotel,
+                room=self.room,
+                check_in_date=first_night,
+                check_out_date=first_night + timedelta(days=2),
+                guests=2,
+                total_amount=200,
+                idempotency_key=key,
+            )
+
+        booking, created = reserve_room(stay(self.check_in, "first"))
+        self.assertTrue(created)
+
+        replayed, created = reserve_room(stay(self.check_in, "first"))
+        self.assertEqual((replayed, created), (booking, False))
+
+        with self.assertRaises(RoomUnavailable):
+            reserve_room(stay(self.check_in + timedelta(days=1), "second"))
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+@override_settings(
+    INTERACTION_LOG_BATCH_SIZE=100,
+    INTERACTION_LOG_FLUSH_INTERVAL=3600,
+    INTERACTION_LOG_MAX_QUEUE=3,
+)
+class InteractionLoggerTests(TestCase):
+    """Interactions are queued without database writes and written in bulk on flush"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("guest")
+        self.hotel = Hotel.objects.create(
+            name="Harbour Inn",
+            description="",
+            address="1 Main Road",
+            city="Goa",
+            area="Baga",
+            hotel_type="hotel",
+            star_rating=3,
+        )
+        self.interaction_logger = InteractionLogger()
+        self.addCleanup(self.interaction_logger.close)
+
+    def test_flush_writes_queued_events_and_drops_overflow(self):
+        with self.assertNumQueries(0):
+            for _ in range(4):
+                self.interaction_logger.log(self.user.id, self.hotel.id, "view", 1.0)
+        self.assertEqual(self.interaction_logger.dropped, 1)
+
+        with self.assertLogs("booking.services.interaction_log", "WARNING"):
+            self.assertEqual(self.interaction_logger.flush(), 3)
+        self.assertEqual(
+            UserInteraction.objects.filter(user=self.user, interaction_type="view").count(),
+            3,
+        )
+
+
+class SearchHistoryTests(TestCase):
+    """Repeated searches are stored once per window and summed per user"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("guest")
+
+    def test_repeated_search_is_recorded_once(self):
+        self.assertTrue(record_search(self.user, "Goa", "Baga"))
+        # Paging or re-sorting the same results, with different casing
+        self.assertFalse(record_search(self.user, " goa", "baga"))
+        self.assertTrue(record_search(self.user, "Goa", "Baga", guests=4))
+        self.assertTrue(record_search(self.user, "Mumbai"))
+
+        self.assertEqual(SearchHistory.objects.filter(user=self.user).count(), 3)
+        rollup = UserSearchRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.total_searches, 3)
+        self.assertEqual(
+            [(entry["city"], entry["area"], entry["count"]) for entry in rollup.locations],
+            [("Mumbai", "", 1), ("Goa", "Baga", 2)],
+        )
+
+    def test_failed_write_does_not_suppress_the_search(self):
+        with mock.patch.object(
+            UserSearchRollup, "save", side_effect=DatabaseError("disk I/O error")
+        ):
+            with self.assertRaises(DatabaseError):
+                record_search(self.user, "Goa")
+        self.assertFalse(SearchHistory.objects.exists())
+
+        self.assertTrue(record_search(self.user, "Goa"))
+        self.assertEqual(UserSearchRollup.objects.get(user=self.user).total_searches, 1)
+
+
+    def test_concurrent_searches_are_not_lost(self):
+        rollup = UserSearchRollup.objects.create(user=self.user)
+
+        def read_before_another_search(**kwargs):
+            # Another process counts its search after this one read the rollup
+            UserSearchRollup.objects.filter(pk=rollup.pk).update(
+                total_searches=1,
+                locations=[
+                    {"city": "Mumbai", "area": "", "count": 1, "last_seen": "2025-01-01"}
+                ],
+            )
+            return rollup, False
+
+        with mock.patch.object(
+            UserSearchRollup.objects, "get_or_create", side_effect=read_before_another_search
+        ):
+            self.assertTrue(record_search(self.user, "Goa"))
+
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.total_searches, 2)
+        self.assertEqual(
+            [entry["city"] for entry in rollup.locations], ["Goa", "Mumbai"]
+        )
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    """Reads go to the read-only alias only when asked for and configured"""
+
+    def test_routes_flagged_reads_to_replica(self):
+        router = ReadReplicaRouter()
+        with mock.patch.dict(settings.DATABASES, {"replica": {}}):
+            self.assertEqual(router.db_for_read(Hotel), "default")
+            with use_read_replica():
+                self.assertEqual(router.db_for_read(Hotel), "replica")
+                self.assertEqual(router.db_for_write(Hotel), "default")
+            self.assertFalse(router.allow_migrate("replica", "booking"))
+
+        default_only = {"default": settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, default_only, clear=True):
+            with use_read_replica():
+                self.assertEqual(router.db_for_read(Hotel), "default")
+
+
+class AsyncViewTests(TestCase):
+    """The async views serve the same page as their sync counterparts"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("guest")
+        Hotel.objects.bulk_create(
+            Hotel(
+                name=f"Hotel {i}",
+                description="",
+                address=f"{i} Beach Road",
+                city="Goa",
+                area="Baga",
+                hotel_type="hotel",
+                star_rating=3,
+            )
+            for i in range(14)
+        )
+
+    def test_hotel_list_pages_and_defers_recommendations(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("booking:hotel_list"), {"page": 2, "city": "Goa", "sort_by": "name"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["hotels"]), 2)
+        self.assertEqual(response.context["paginator"].count, 14)
+        self.assertTrue(response.context["is_paginated"])
+        self.assertNotIn("recommended_hotels", response.context)
+        self.assertEqual(
+            response.context["recommendation_panel_url"],
+            reverse("booking:recommended_panel") + "?city=Goa",
+        )
+        self.assertEqual(
+            self.client.get(reverse("booking:hotel_list"), {"page": 3}).status_code,
+            404,
+        )
+
+    def test_recommendation_panel(self):
+        url = reverse("booking:recommended_panel")
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url, {"city": "Goa"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["recommended_hotels"]), 6)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("max-age=", response["Cache-Control"])
+
+    @override_settings(RECOMMENDATION_PANEL_TIMEOUT=0.05)
+    def test_slow_recommendation_panel_is_empty(self):
+        async def slow_recommendations(**kwargs):
+            await asyncio.sleep(1)
+
+        self.client.force_login(self.user)
+        with mock.patch.object(
+            recommendation_service, "aget_recommendations", slow_recommendations
+        ):
+            response = self.client.get(reverse("booking:recommended_panel"))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertIn("no-store", response["Cache-Control"])
+
+    @override_settings(
+        RECOMMENDER_SCORING_WORKERS=1,
+        RECOMMENDER_SCORING_QUEUE_DEPTH=1,
+        RECOMMENDER_SCORING_TIMEOUT=0.05,
+    )
+    def test_saturated_scoring_pool_sheds_load_across_event_loops(self):
+        started = threading.Event()
+
+        async def slow_run(*args):
+            started.set()
+            await asyncio.sleep(0.3)
+            return [1]
+
+        def rank():
+            # Under WSGI each async view call runs in a fresh event loop
+            try:
+                return asyncio.run(pool.rank(snapshot, 1, {}, [], [1], 1))
+            except ScoringPoolBusy as e:
+                return e
+
+        pool = ScoringPool()
+        snapshot = RecommenderSnapshot(version="test")
+        with mock.patch.object(pool, "_run", slow_run):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                first = executor.submit(rank)
+                started.wait(timeout=5)
+                second = executor.submit(rank)
+                results = [first.result(), second.result()]
+            self.assertEqual(results[0], [1])
+            self.assertIsInstance(results[1], ScoringPoolBusy)
+
+            # The slot is free again once the first request is done
+            with override_settings(RECOMMENDER_SCORING_TIMEOUT=1.0):
+                self.assertEqual(rank(), [1])
+
+    @override_settings(
+        RECOMMENDER_SCORING_WORKERS=1,
+        RECOMMENDER_SCORING_QUEUE_DEPTH=1,
+        RECOMMENDER_SCORING_TIMEOUT=5.0,
+    )
+    def test_cancelled_wait_for_a_scoring_slot_gives_it_back(self):
+        pool = ScoringPool()
+        slots = pool._get_slots()
+
+        async def cancel_while_waiting():
+            waiter = asyncio.ensure_future(pool._acquire(slots))
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+            # The waiting thread takes this slot after its request is gone
+            slots.release()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            for _ in range(100):
+                if slots.acquire(blocking=False):
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+
+        slots.acquire()
+        self.assertTrue(asyncio.run(cancel_while_waiting()))
+
+
+class RecommendationAPITests(TestCase):
+    """The JSON API returns ranked hotel ids with their component scores"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("guest")
+        self.staff = User.objects.create_user("campaigns", is_staff=True)
+        for city in ["Goa", "Mumbai"]:
+            Hotel.objects.create(
+                name=f"{city} Inn",
+                description="",
+                address="1 Main Road",
+                city=city,
+                area="Centre",
+                hotel_type="hotel",
+                star_rating=3,
+            )
+
+    def test_single_user_scores(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("booking:api_recommendations"), {"city": "Goa", "limit": 5}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        [recommendation] = response.json()["recommendations"]
+        self.assertEqual(recommendation["hotel_id"], Hotel.objects.get(city="Goa").id)
+        self.assertEqual(
+            set(recommendation["components"]), {"content", "collaborative", "location"}
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("booking:api_recommendations"), {"limit": 0}
+            ).status_code,
+            400,
+        )
+
+    def test_batch_requires_staff_and_keeps_query_order(self):
+        url = reverse("booking:api_recommendations_batch")
+        body = {
+            "queries": [
+                {"user_id": self.user.id, "city": "Mumbai"},
+                {"user_id": 0},
+                {"user_id": self.staff.id, "limit": 1},
+            ]
+        }
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.post(url, body, content_type="application/json").status_code,
+            403,
+        )
+
+        self.client.force_login(self.staff)
+        response = self.client.post(url, body, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["user_id"] for result in results], [self.user.id, 0, self.staff.id]
+        )
+        self.assertEqual(
+            [entry["hotel_id"] for entry in results[0]["recommendations"]],
+            [Hotel.objects.get(city="Mumbai").id],
+        )
+        self.assertEqual(results[1]["error"], "Unknown user")
+        self.assertEqual(len(results[2]["recommendations"]), 1)
+
+    @override_settings(RECOMMENDATION_API_KEYS=["campaign-key"])
+    def test_batch_accepts_api_key_without_csrf_token(self):
+        url = reverse("booking:api_recommendations_batch")
+        body = json.dumps({"queries": [{"user_id": self.user.id, "city": "Goa"}]})
+        client = Client(enforce_csrf_checks=True)
+
+        response = client.post(
+            url,
+            body,
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer campaign-key",
+        )
+        self.assertEqual(response.status_code, 200)
+        [result] = response.json()["results"]
+        self.assertEqual(
+            result["recommendations"][0]["hotel_id"], Hotel.objects.get(city="Goa").id
+        )
+
+        self.assertEqual(
+            client.post(
+                url, body, content_type="application/json", HTTP_AUTHORIZATION="Bearer x"
+            ).status_code,
+            403,
+        )
+        # A staff session without the CSRF token is still refused
+        client.force_login(self.staff)
+        self.assertEqual(
+            client.post(url, body, content_type="application/json").status_code, 403
+        )
+
+
+class SimilarHotelTests(TestCase):
+    """Neighbours are precomputed, nearest and most alike first, and kept current on save"""
+
+    def create_hotel(self, name, city, area, latitude, longitude):
+        return Hotel.objects.create(
+            name=name,
+            description="",
+            address="1 Main Road",
+            city=city,
+            area=area,
+            latitude=latitude,
+            longitude=longitude,
+            hotel_type="hotel",
+            star_rating=3,
+            amenities=["wifi", "pool"],
+        )
+
+    def setUp(self):
+        self.hotel = self.create_hotel("Baga Inn", "Goa", "Baga", 15.55, 73.75)
+        self.neighbour = self.create_hotel("Baga Stay", "Goa", "Baga", 15.56, 73.76)
+        self.same_city = self.create_hotel("Panjim Inn", "Goa", "Panjim", 15.49, 73.83)
+        self.far_away = self.create_hotel("Colaba Inn", "Mumbai", "Colaba", 18.91, 72.81)
+
+    def similar_ids(self, hotel):
+        return list(
+            SimilarHotel.objects.filter(hotel=hotel)
+            .order_by("-score")
+            .values_list("similar_hotel_id", flat=True)
+        )
+
+    def test_rebuild_ranks_by_similarity(self):
+        self.assertEqual(rebuild_similar_hotels(), 4)
+        self.assertEqual(
+            self.similar_ids(self.hotel)[:2], [self.neighbour.id, self.same_city.id]
+        )
+
+        response = self.client.get(reverse("booking:hotel_detail", args=[self.hotel.pk]))
+        self.assertEqual(response.context["similar_hotels"][0], self.neighbour)
+
+    def test_saving_a_hotel_updates_neighbour_lists(self):
+        rebuild_similar_hotels()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.neighbour.is_active = False
+            self.neighbour.save()
+        self.assertNotIn(self.neighbour.id, self.similar_ids(self.hotel))
+        self.assertEqual(self.similar_ids(self.neighbour), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.neighbour.is_active = True
+            self.neighbour.save()
+        self.assertEqual(self.similar_ids(self.hotel)[0], self.neighbour.id)
+        self.assertEqual(self.similar_ids(self.neighbour)[0], self.hotel.id)
+
+
+class GenerateSampleDataTests(TestCase):
+    """Re-running the generator continues numbering after deleted rows"""
+
+    def generate(self, hotels=0, **counts):
+        call_command(
+            "generate_sample_data",
+            hotels=hotels,
+            seed=7,
+            workers=1,
+            stdout=StringIO(),
+            **counts,
+        )
+
+    def test_rerun_after_deletions_numbers_new_rows(self):
+        self.generate(hotels=2, users=3, bookings=4)
+        User.objects.filter(bookings__isnull=True).delete()
+        Booking.objects.order_by("id").first().delete()
+        users, bookings = User.objects.count(), Booking.objects.count()
+
+        self.generate(users=3, bookings=4)
+        self.assertEqual(User.objects.count(), users + 3)
+        self.assertEqual(Booking.objects.count(), bookings + 4)
+        self.assertTrue(Booking.objects.filter(booking_reference="SB0000000004").exists())
@@ -6,9 +6,10 @@ app_name = 'booking'
 urlpatterns = [
     # Hotel search and listing
     path('', views.HotelSearchView.as_view(), name='search'),
-    path('hotels/', views.HotelListView.as_view(), name='hotel_list'),
+    path('hotels/', views.AsyncHotelListView.as_view(), name='hotel_list'),
     path('hotels/<int:pk>/', views.HotelDetailView.as_view(), name='hotel_detail'),
-    path('recommended/', views.RecommendedHotelsView.as_view(), name='recommended_hotels'),
+    path('recommended/', views.AsyncRecommendedHotelsView.as_view(), name='recommended_hotels'),
+    path('recommended/panel/', views.RecommendedHotelsPanelView.as_view(), name='recommended_panel'),
     
     # Booking
     path('book/<int:hotel_id>/<int:room_id>/', views.BookingCreateView.as_view(), name='booking_create'),
@@ -21,4 +22,8 @@ urlpatterns = [
     
     # AJAX endpoints
     path('ajax/room-availability/', views.ajax_room_availability, name='ajax_room_availability'),
+
+    # JSON API
+    path('api/recommendations/', views.RecommendationAPIView.as_view(), name='api_recommendations'),
+    path('api/recommendations/batch/', views.RecommendationBatchAPIView.as_view(), name='api_recommendations_batch'),
 ]
@@ -1,21 +1,50 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
 from django.views.generic import ListView, DetailView, CreateView, View
 from django.contrib import messages
-from django.db.models import Q, Avg, Count, Min
-from django.http import JsonResponse
-from django.core.paginator import Paginator
+from django.db.models import Q, Avg, Count, Exists, OuterRef
+from django.http import Http404, HttpResponse, JsonResponse
+from django.core.paginator import InvalidPage
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.middleware.csrf import CsrfViewMiddleware
 from datetime import date, timedelta
 from decimal import Decimal
-
-from .models import Hotel, Room, Booking, Review, UserInteraction, SearchHistory
+from urllib.parse import urlencode
+import asyncio
+import hmac
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+
+from .models import (
+    Hotel,
+    Room,
+    RoomNight,
+    Booking,
+    Review,
+)
 from .forms import HotelSearchForm, BookingForm, ReviewForm, HotelFilterForm
+from .services.interaction_log import interaction_logger
 from .services.recommendation import recommendation_service
+from .services.reservations import RoomUnavailable, reserve_room
+from .services.search import search_hotels
+from .services.search_history import record_search
+from .services.similar_hotels import get_similar_hotels
 from accounts.models import UserPreference
+from hotel_booking_recommendation.db_routers import read_replica
 
 
+@method_decorator(read_replica, name="dispatch")
 class HotelListView(ListView):
     """
     HotelListView displays a paginated list of active hotels with advanced filtering, sorting, and recommendation features.
@@ -23,13 +52,14 @@ class HotelListView(ListView):
     - Filters hotels by city, area, check-in/check-out dates, number of guests, price range, hotel type, star rating, and amenities.
     - Supports sorting by rating, price (low to high, high to low), and hotel name.
     - Persists user search history if authenticated.
-    - Provides hotel recommendations for authenticated users based on search criteria.
+    - Leaves a placeholder for hotel recommendations, which the page loads from RecommendedHotelsPanelView once rendered, so results never wait on the recommender.
     - Integrates search and filter forms into the context for template rendering.
     Context:
     - 'hotels': Paginated queryset of filtered hotels.
     - 'search_form': Instance of HotelSearchForm pre-filled with GET data.
     - 'filter_form': Instance of HotelFilterForm pre-filled with GET data.
-    - 'recommended_hotels': List of recommended hotels (for authenticated users).
+    - 'recommendation_panel_url': URL of the recommendations panel for the search (for authenticated users).
+    - 'recommendation_panel_timeout_ms': How long the page waits for the panel.
     Pagination:
     - 12 hotels per page.
     Usage:
@@ -51,7 +81,11 @@ class HotelListView(ListView):
         guests = self.request.GET.get("guests", 2)
         min_price = self.request.GET.get("min_price")
         max_price = self.request.GET.get("max_price")
+        query = self.request.GET.get("q")
 
+        if query:
+            # Best matches first unless a sort order is chosen below
+            queryset = search_hotels(queryset, query)
         if city:
             queryset = queryset.filter(city__icontains=city)
         if area:
@@ -59,26 +93,30 @@ class HotelListView(ListView):
 
         if check_in and check_out and guests:
             try:
-                guests = int(guests)
-                queryset = queryset.filter(
-                    rooms__capacity__gte=guests, rooms__is_available=True
-                ).distinct()
+                stay_start = date.fromisoformat(check_in)
+                stay_end = date.fromisoformat(check_out)
+                if stay_end <= stay_start:
+                    # No nights to check; HotelSearchForm rejects these dates
+                    raise ValueError("Check-out date must be after check-in date")
+                # Hotels with a room that fits and has none of the stay's nights booked
+                free_rooms = Room.objects.filter(
+                    hotel=OuterRef("pk"),
+                    is_available=True,
+                    capacity__gte=int(guests),
+                ).filter(~Exists(RoomNight.booked(stay_start, stay_end)))
+                queryset = queryset.filter(Exists(free_rooms))
             except ValueError:
                 pass
 
         if min_price:
             try:
-                queryset = queryset.filter(
-                    rooms__price_per_night__gte=Decimal(min_price)
-                )
+                queryset = queryset.filter(max_room_price__gte=Decimal(min_price))
             except (ValueError, TypeError):
                 pass
 
         if max_price:
             try:
-                queryset = queryset.filter(
-                    rooms__price_per_night__lte=Decimal(max_price)
-                )
+                queryset = queryset.filter(min_room_price__lte=Decimal(max_price))
             except (ValueError, TypeError):
                 pass
 
@@ -96,30 +134,25 @@ class HotelListView(ListView):
                 queryset = queryset.filter(average_rating__gte=int(star_rating))
 
             if amenities:
-                for amenity in amenities:
-                    queryset = queryset.filter(amenities__icontains=amenity)
+                queryset = queryset.filter(amenity_mask__has_all=amenities)
 
             if sort_by == "rating":
                 queryset = queryset.order_by("-average_rating", "-total_reviews")
             elif sort_by == "price_low":
-                queryset = queryset.annotate(
-                    room_min_price=Min("rooms__price_per_night")
-                ).order_by("room_min_price")
+                queryset = queryset.order_by("min_room_price")
             elif sort_by == "price_high":
-                queryset = queryset.annotate(
-                    room_min_price=Min("rooms__price_per_night")
-                ).order_by("-room_min_price")
+                queryset = queryset.order_by("-min_room_price")
             elif sort_by == "name":
                 queryset = queryset.order_by("name")
 
         if self.request.user.is_authenticated and city:
             try:
-                SearchHistory.objects.create(
-                    user=self.request.user,
-                    city=city,
+                record_search(
+                    self.request.user,
+                    city,
                     area=area or "",
-                    check_in_date=check_in or date.today(),
-                    check_out_date=check_out or (date.today() + timedelta(days=1)),
+                    check_in_date=check_in,
+                    check_out_date=check_out,
                     guests=int(guests) if guests else 2,
                     min_price=Decimal(min_price) if min_price else None,
                     max_price=Decimal(max_price) if max_price else None,
@@ -127,34 +160,89 @@ class HotelListView(ListView):
             except:
                 pass
 
-        return queryset.distinct()
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["search_form"] = HotelSearchForm(self.request.GET)
-        context["filter_form"] = HotelFilterForm(self.request.GET)
+        return queryset
 
+    def get_extra_context(self):
+        """Forms and the deferred recommendations panel, alongside the page of hotels"""
+        context = {
+            "search_form": HotelSearchForm(self.request.GET),
+            "filter_form": HotelFilterForm(self.request.GET),
+            # The panel's own timeout plus a margin for the round trip
+            "recommendation_panel_timeout_ms": int(
+                (settings.RECOMMENDATION_PANEL_TIMEOUT + 1) * 1000
+            ),
+        }
         if self.request.user.is_authenticated:
-            city = self.request.GET.get("city")
-            area = self.request.GET.get("area")
-            check_in = self.request.GET.get("check_in_date")
-            check_out = self.request.GET.get("check_out_date")
-            guests = int(self.request.GET.get("guests", 2))
-
-            recommended_hotels = recommendation_service.get_recommendations(
-                user=self.request.user,
-                city=city,
-                area=area,
-                check_in_date=check_in,
-                check_out_date=check_out,
-                guests=guests,
-                limit=6,
+            # Only the parameters recommendations depend on, so paging and
+            # re-sorting reuse the browser's cached panel
+            params = {
+                name: self.request.GET[name]
+                for name in RecommendedHotelsPanelView.SEARCH_PARAMS
+                if self.request.GET.get(name)
+            }
+            context["recommendation_panel_url"] = (
+                f"{reverse('booking:recommended_panel')}?{urlencode(params)}"
             )
-            context["recommended_hotels"] = recommended_hotels
+        return context
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(self.get_extra_context())
         return context
 
 
+class AsyncHotelListView(HotelListView):
+    """
+    HotelListView for ASGI: the page and its count are loaded with the async
+    ORM, so one worker keeps serving other requests while this one waits.
+    Filtering is shared with HotelListView and runs on a thread, as it may
+    record the search. Renders the same template with the same context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        # get_queryset and the templates read request.user synchronously
+        request.user = await request.auser()
+        queryset = await sync_to_async(self.get_queryset)()
+        paginator, page, hotels, is_paginated = await self.apaginate_queryset(
+            queryset, self.paginate_by
+        )
+        self.object_list = hotels
+
+        context = {
+            "view": self,
+            "paginator": paginator,
+            "page_obj": page,
+            "is_paginated": is_paginated,
+            "object_list": hotels,
+            "hotels": hotels,
+            **self.get_extra_context(),
+        }
+        return self.render_to_response(context)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """paginate_queryset with the async ORM: one count and one page query"""
+        paginator = self.get_paginator(
+            queryset,
+            page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        # Paginator caches count: set it so the page lookup never queries
+        paginator.count = await queryset.acount()
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(
+            self.page_kwarg
+        ) or 1
+        if page_number == "last":
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as e:
+            raise Http404(f"Invalid page ({page_number}): {str(e)}")
+        page.object_list = [hotel async for hotel in page.object_list]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+@method_decorator(read_replica, name="dispatch")
 class HotelDetailView(DetailView):
     """
     Displays detailed information about a specific hotel, including available rooms, recent reviews, and similar hotel recommendations.
@@ -169,7 +257,7 @@ class HotelDetailView(DetailView):
                 - The latest 10 reviews and a review form.
                 - Search parameters (check-in date, check-out date, guests) from GET request.
                 - Tracks user interaction if the user is authenticated.
-                - Provides a list of similar hotels, excluding the current hotel.
+                - Provides up to three similar hotels from the precomputed neighbour table.
     """
 
     model = Hotel
@@ -178,7 +266,7 @@ class HotelDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        hotel = self.get_object()
+        hotel = self.object
 
         context["rooms"] = hotel.rooms.filter(is_available=True)
         context["reviews"] = hotel.reviews.all()[:10]
@@ -188,17 +276,9 @@ class HotelDetailView(DetailView):
         context["guests"] = self.request.GET.get("guests", 2)
 
         if self.request.user.is_authenticated:
-            UserInteraction.objects.create(
-                user=self.request.user, hotel=hotel, interaction_type="view", weight=1.0
-            )
+            interaction_logger.log(self.request.user.id, hotel.id, "view", 1.0)
 
-        similar_hotels = recommendation_service.get_recommendations(
-            user=self.request.user if self.request.user.is_authenticated else None,
-            city=hotel.city,
-            area=hotel.area,
-            limit=4,
-        )
-        context["similar_hotels"] = [h for h in similar_hotels if h.id != hotel.id][:3]
+        context["similar_hotels"] = get_similar_hotels(hotel, limit=3)
         return context
 
 
@@ -228,6 +308,8 @@ class BookingCreateView(LoginRequiredMixin, View):
             "check_in_date": request.GET.get("check_in_date"),
             "check_out_date": request.GET.get("check_out_date"),
             "guests": request.GET.get("guests", 2),
+            # Identifies this form: resubmitting it returns the same booking
+            "idempotency_key": uuid.uuid4().hex,
         }
 
         form = BookingForm(initial=initial_data, room=room)
@@ -255,16 +337,21 @@ class BookingCreateView(LoginRequiredMixin, View):
             nights = (booking.check_out_date - booking.check_in_date).days
             booking.total_amount = room.price_per_night * nights
 
-            booking.save()
-
-            UserInteraction.objects.create(
-                user=request.user, hotel=hotel, interaction_type="book", weight=5.0
-            )
+            try:
+                booking, created = reserve_room(booking)
+            except RoomUnavailable:
+                form.add_error(
+                    None, "This room is no longer available for the selected dates."
+                )
+            else:
+                if created:
+                    interaction_logger.log(request.user.id, hotel.id, "book", 5.0)
 
-            messages.success(
-                request, f"Booking confirmed! Reference: {booking.booking_reference}"
-            )
-            return redirect("booking:booking_detail", booking_id=booking.id)
+                messages.success(
+                    request,
+                    f"Booking confirmed! Reference: {booking.booking_reference}",
+                )
+                return redirect("booking:booking_detail", booking_id=booking.id)
 
         context = {
             "hotel": hotel,
@@ -274,6 +361,7 @@ class BookingCreateView(LoginRequiredMixin, View):
         return render(request, self.template_name, context)
 
 
+@method_decorator(read_replica, name="dispatch")
 class BookingDetailView(LoginRequiredMixin, DetailView):
     """
     BookingDetailView displays the details of a single Booking instance for the currently authenticated user.
@@ -291,6 +379,7 @@ class BookingDetailView(LoginRequiredMixin, DetailView):
         return Booking.objects.filter(user=self.request.user)
 
 
+@method_decorator(read_replica, name="dispatch")
 class BookingHistoryView(LoginRequiredMixin, ListView):
     """
     View to display the booking history for the currently logged-in user.
@@ -348,9 +437,7 @@ class ReviewCreateView(LoginRequiredMixin, View):
 
             review.save()
 
-            UserInteraction.objects.create(
-                user=request.user, hotel=hotel, interaction_type="review", weight=3.0
-            )
+            interaction_logger.log(request.user.id, hotel.id, "review", 3.0)
 
             messages.success(request, "Thank you for your review!")
         else:
@@ -388,7 +475,8 @@ class HotelSearchView(View):
         if form.is_valid():
             # Redirect to hotel list with search parameters
             params = {
-                "city": form.cleaned_data["city"],
+                "q": form.cleaned_data.get("q", ""),
+                "city": form.cleaned_data.get("city", ""),
                 "area": form.cleaned_data.get("area", ""),
                 "check_in_date": form.cleaned_data["check_in_date"],
                 "check_out_date": form.cleaned_data["check_out_date"],
@@ -401,7 +489,7 @@ class HotelSearchView(View):
                 params["max_price"] = form.cleaned_data["max_price"]
 
             # Build query string
-            query_string = "&".join([f"{k}={v}" for k, v in params.items() if v])
+            query_string = urlencode({k: v for k, v in params.items() if v})
             return redirect(f"/booking/hotels/?{query_string}")
 
         return render(request, self.template_name, {"form": form})
@@ -445,6 +533,7 @@ def cancel_booking(request, booking_id):
     return render(request, "booking/cancel_booking.html", {"booking": booking})
 
 
+@read_replica
 def ajax_room_availability(request):
     """AJAX endpoint to check room availability"""
     if request.method == "GET":
@@ -458,12 +547,9 @@ def ajax_room_availability(request):
         try:
             room = Room.objects.get(id=room_id, is_available=True)
 
-            # Check for conflicting bookings
-            conflicting_bookings = Booking.objects.filter(
-                room=room,
-                booking_status__in=["confirmed", "checked_in"],
-                check_in_date__lt=check_out,
-                check_out_date__gt=check_in,
+            # Check for nights already held by other bookings
+            conflicting_bookings = RoomNight.objects.filter(
+                room=room, night__gte=check_in, night__lt=check_out
             ).exists()
 
             if conflicting_bookings:
@@ -499,6 +585,7 @@ def ajax_room_availability(request):
     return JsonResponse({"available": False, "error": "Invalid request method"})
 
 
+@method_decorator(read_replica, name="dispatch")
 class RecommendedHotelsView(LoginRequiredMixin, View):
     """View to get personalized hotel recommendations"""
 
@@ -513,3 +600,202 @@ class RecommendedHotelsView(LoginRequiredMixin, View):
 
         context = {"hotels": recommended_hotels, "title": "Recommended for You"}
         return render(request, "booking/recommended_hotels.html", context)
+
+
+@method_decorator(read_replica, name="dispatch")
+class RecommendedHotelsPanelView(View):
+    """
+    HTML fragment with the recommendations panel of the hotel list, fetched by
+    the page after it has rendered. Recommendations are tailored to the
+    search in SEARCH_PARAMS. The panel is empty (204) for anonymous users or
+    when scoring takes longer than RECOMMENDATION_PANEL_TIMEOUT seconds, so a
+    slow recommender only ever costs the panel. Successful panels may be
+    cached by the browser for RECOMMENDATION_PANEL_MAX_AGE seconds.
+    """
+
+    SEARCH_PARAMS = ["city", "area", "check_in_date", "check_out_date", "guests"]
+    template_name = "booking/partials/recommended_hotels.html"
+
+    async def get(self, request):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return HttpResponse(status=204)
+
+        try:
+            recommended_hotels = await asyncio.wait_for(
+                recommendation_service.aget_recommendations(
+                    user=request.user,
+                    city=request.GET.get("city"),
+                    area=request.GET.get("area"),
+                    check_in_date=request.GET.get("check_in_date"),
+                    check_out_date=request.GET.get("check_out_date"),
+                    guests=int(request.GET.get("guests", 2)),
+                    limit=6,
+                ),
+                timeout=settings.RECOMMENDATION_PANEL_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            response = HttpResponse(status=204)
+            patch_cache_control(response, no_store=True)
+            return response
+        except ValueError:
+            return HttpResponse(status=204)
+
+        response = TemplateResponse(
+            request, self.template_name, {"recommended_hotels": recommended_hotels}
+        )
+        patch_cache_control(
+            response, private=True, max_age=settings.RECOMMENDATION_PANEL_MAX_AGE
+        )
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+
+@method_decorator(read_replica, name="dispatch")
+class AsyncRecommendedHotelsView(View):
+    """RecommendedHotelsView for ASGI, loading and scoring without blocking the event loop"""
+
+    async def get(self, request):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        city = request.GET.get("city")
+        area = request.GET.get("area")
+        limit = int(request.GET.get("limit", 10))
+
+        recommended_hotels = await recommendation_service.aget_recommendations(
+            user=request.user, city=city, area=area, limit=limit
+        )
+
+        context = {"hotels": recommended_hotels, "title": "Recommended for You"}
+        # Rendered on a thread by the handler, like any TemplateResponse
+        return TemplateResponse(request, "booking/recommended_hotels.html", context)
+
+
+def _api_limit(value):
+    limit = int(value)
+    if not 1 <= limit <= settings.RECOMMENDATION_API_MAX_LIMIT:
+        raise ValueError(
+            f"limit must be between 1 and {settings.RECOMMENDATION_API_MAX_LIMIT}"
+        )
+    return limit
+
+
+@method_decorator(read_replica, name="dispatch")
+class RecommendationAPIView(View):
+    """
+    JSON recommendations for the signed-in user, e.g. for the mobile app.
+    GET parameters: city, area, limit (default 10).
+    Response:
+        {"model_version": ..., "recommendations": [{"hotel_id": 12, "score": 0.61,
+        "components": {"content": 0.4, "collaborative": 0.8, "location": 0.7}}, ...]}
+    Recommendations are best first; score is the hybrid weighting of the components.
+    """
+
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        try:
+            limit = _api_limit(request.GET.get("limit", 10))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        snapshot = recommendation_service.get_snapshot()
+        recommendations = recommendation_service.get_scored_recommendations(
+            request.user,
+            city=request.GET.get("city"),
+            area=request.GET.get("area"),
+            limit=limit,
+            snapshot=snapshot,
+        )
+        if recommendations is None:
+            return JsonResponse({"error": "Recommendations unavailable"}, status=503)
+        return JsonResponse(
+            {"model_version": snapshot.version, "recommendations": recommendations}
+        )
+
+
+def _has_api_key(request):
+    """Whether the request carries one of RECOMMENDATION_API_KEYS as a bearer token"""
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not key:
+        return False
+    return any(
+        hmac.compare_digest(key.encode(), api_key.encode())
+        for api_key in settings.RECOMMENDATION_API_KEYS
+    )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class RecommendationBatchAPIView(View):
+    """
+    Recommendations for many users in one request, for staff jobs such as
+    email campaigns. All queries are scored together by score_batch, sharing
+    user and hotel loading, and are not cached.
+    Jobs authenticate with "Authorization: Bearer <key>" using one of
+    RECOMMENDATION_API_KEYS and need no CSRF token. Browser calls from a staff
+    session still need one, as for any other POST.
+    POST body:
+        {"queries": [{"user_id": 7, "city": "Goa", "area": "", "limit": 10}, ...]}
+    with at most RECOMMENDATION_API_MAX_BATCH queries; city, area and limit are optional.
+    Response:
+        {"model_version": ..., "results": [{"user_id": 7, "recommendations": [...]}, ...]}
+    in query order, with {"user_id": ..., "error": ...} for a query that failed.
+    """
+
+    def post(self, request):
+        if not _has_api_key(request):
+            if not (request.user.is_authenticated and request.user.is_staff):
+                return JsonResponse({"error": "Staff access required"}, status=403)
+            # csrf_exempt only lifts the check for key-authenticated jobs
+            csrf_failure = CsrfViewMiddleware(lambda request: None).process_view(
+                request, None, (), {}
+            )
+            if csrf_failure is not None:
+                return csrf_failure
+        try:
+            queries = [
+                (
+                    int(query["user_id"]),
+                    query.get("city") or None,
+                    query.get("area") or None,
+                    _api_limit(query.get("limit", 10)),
+                )
+                for query in json.loads(request.body)["queries"]
+            ]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return JsonResponse({"error": f"Invalid batch: {str(e)}"}, status=400)
+        if len(queries) > settings.RECOMMENDATION_API_MAX_BATCH:
+            return JsonResponse(
+                {
+                    "error": f"At most {settings.RECOMMENDATION_API_MAX_BATCH} "
+                    f"queries per batch"
+                },
+                status=400,
+            )
+
+        users = User.objects.in_bulk({user_id for user_id, _, _, _ in queries})
+        known = [query for query in queries if query[0] in users]
+        snapshot = recommendation_service.get_snapshot()
+        scored = iter(
+            recommendation_service.score_batch(
+                [
+                    (users[user_id], city, area, limit)
+                    for user_id, city, area, limit in known
+                ],
+                snapshot,
+            )
+        )
+
+        results = []
+        for user_id, _, _, _ in queries:
+            if user_id not in users:
+                results.append({"user_id": user_id, "error": "Unknown user"})
+                continue
+            recommendations = next(scored)
+            if recommendations is None:
+                results.append({"user_id": user_id, "error": "Scoring failed"})
+            else:
+                results.append({"user_id": user_id, "recommendations": recommendations})
+        return JsonResponse({"model_version": snapshot.version, "results": results})
@@ -0,0 +1,78 @@
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+_read_replica = ContextVar("read_replica", default=False)
+
+
+@contextmanager
+def use_read_replica():
+    """Send ORM reads made inside the block to the read-only connection"""
+    token = _read_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_replica.reset(token)
+
+
+def read_replica(view):
+    """View decorator: the view's reads go to the read-only connection"""
+
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        with use_read_replica():
+            response = view(*args, **kwargs)
+            if inspect.isawaitable(response):
+                # An async handler runs after dispatch returns: route it as it runs
+                return _routed(response)
+            # Templates evaluate lazy querysets: render while reads are routed
+            if not getattr(response, "is_rendered", True):
+                response.render()
+            return response
+
+    return wrapped
+
+
+async def _routed(awaitable):
+    with use_read_replica():
+        response = await awaitable
+        if not getattr(response, "is_rendered", True):
+            await sync_to_async(response.render)()
+        return response
+
+
+class ReadReplicaRouter:
+    """
+    Routes reads made under use_read_replica() to the read-only "replica"
+    database when one is configured; everything else uses "default".
+    With SQLite in WAL mode the replica is a second, read-only connection to
+    the same file, so it sees every committed write immediately and readers
+    never wait for the writer. Reads inside a transaction on "default" stay
+    there so a block always sees its own uncommitted writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _read_replica.get()
+            and REPLICA_DB_ALIAS in settings.DATABASES
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -86,13 +86,87 @@ WSGI_APPLICATION = "hotel_booking_recommendation.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+SQLITE_PATH = env("SQLITE_PATH", default=str(BASE_DIR / "db.sqlite3"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": SQLITE_PATH,
     }
 }
 
+# "production" tunes SQLite for concurrent workers: WAL journaling so readers
+# never block the writer, persistent connections, and a second, read-only
+# connection that read-only views use through db_routers.ReadReplicaRouter
+DATABASE_PROFILE = env("DATABASE_PROFILE", default="development")
+
+if DATABASE_PROFILE == "production":
+    SQLITE_PRAGMAS = [
+        # Durable at checkpoints rather than every commit, which WAL makes safe
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA mmap_size=268435456",  # 256 MB
+        "PRAGMA cache_size=-65536",  # 64 MB
+        "PRAGMA temp_store=MEMORY",
+    ]
+    DATABASES["default"].update(
+        {
+            "CONN_MAX_AGE": env.int("DATABASE_CONN_MAX_AGE", default=600),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": "; ".join(["PRAGMA journal_mode=WAL", *SQLITE_PRAGMAS]),
+                # Take the write lock at BEGIN: concurrent transactions then wait
+                # for it instead of failing when a read lock cannot be upgraded
+                "transaction_mode": "IMMEDIATE",
+                "timeout": env.int("DATABASE_BUSY_TIMEOUT", default=20),
+            },
+        }
+    )
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{SQLITE_PATH}?mode=ro",
+        "CONN_MAX_AGE": DATABASES["default"]["CONN_MAX_AGE"],
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "init_command": "; ".join([*SQLITE_PRAGMAS, "PRAGMA query_only=1"]),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["hotel_booking_recommendation.db_routers.ReadReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Per-user recommendation results; LocMemCache evicts least recently used
+    # entries beyond MAX_ENTRIES and expires entries after TIMEOUT seconds.
+    # Each process keeps its own entries, keyed by the shared generation tokens
+    "recommendations": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "recommendations",
+        "TIMEOUT": env.int("RECOMMENDATION_CACHE_TIMEOUT", default=600),
+        "OPTIONS": {
+            "MAX_ENTRIES": env.int("RECOMMENDATION_CACHE_MAX_ENTRIES", default=10000),
+        },
+    },
+    # Generation tokens that invalidate cached results; shared by every server
+    # process through the database (created by `manage.py createcachetable`)
+    "recommendation_generations": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "recommendation_generations",
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": env.int(
+                "RECOMMENDATION_GENERATION_MAX_ENTRIES", default=1000000
+            ),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,3 +228,40 @@ STATICFILES_DIRS = [
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Recommendation engine
+# Trained model versions are written here by the train_recommender command
+RECOMMENDER_MODEL_DIR = env(
+    "RECOMMENDER_MODEL_DIR", default=os.path.join(BASE_DIR, "data", "recommender")
+)
+# Seconds between checks for a newly published model version
+RECOMMENDER_RELOAD_INTERVAL = env.int("RECOMMENDER_RELOAD_INTERVAL", default=60)
+# Worker processes scoring recommendations for async views, started in every server
+# process; 0 scores in the serving process
+RECOMMENDER_SCORING_WORKERS = env.int("RECOMMENDER_SCORING_WORKERS", default=1)
+# Scoring tasks handed to each worker at once; further requests wait for a slot
+RECOMMENDER_SCORING_QUEUE_DEPTH = env.int("RECOMMENDER_SCORING_QUEUE_DEPTH", default=2)
+# Seconds a request waits for a scoring slot before falling back to popular hotels
+RECOMMENDER_SCORING_TIMEOUT = env.float("RECOMMENDER_SCORING_TIMEOUT", default=2.0)
+# Largest number of recommendations one API query may ask for
+RECOMMENDATION_API_MAX_LIMIT = env.int("RECOMMENDATION_API_MAX_LIMIT", default=100)
+# Queries accepted by one batch API request; larger campaigns use export_recommendations
+RECOMMENDATION_API_MAX_BATCH = env.int("RECOMMENDATION_API_MAX_BATCH", default=1000)
+# Bearer tokens accepted by the batch API from non-browser jobs (comma-separated)
+RECOMMENDATION_API_KEYS = env.list("RECOMMENDATION_API_KEYS", default=[])
+# Seconds the hotel list's recommendations panel may take before it is left empty
+RECOMMENDATION_PANEL_TIMEOUT = env.float("RECOMMENDATION_PANEL_TIMEOUT", default=3.0)
+# Seconds browsers may reuse a user's recommendations panel
+RECOMMENDATION_PANEL_MAX_AGE = env.int("RECOMMENDATION_PANEL_MAX_AGE", default=300)
+
+# User interaction logging
+# Interactions are buffered in process and written in batches by a background thread
+INTERACTION_LOG_BATCH_SIZE = env.int("INTERACTION_LOG_BATCH_SIZE", default=500)
+# Seconds a queued interaction waits at most before being written
+INTERACTION_LOG_FLUSH_INTERVAL = env.float("INTERACTION_LOG_FLUSH_INTERVAL", default=2.0)
+# Interactions queued beyond this are dropped instead of slowing requests down
+INTERACTION_LOG_MAX_QUEUE = env.int("INTERACTION_LOG_MAX_QUEUE", default=10000)
+
+# Search history
+# Repeating a search within this many seconds (paging, re-sorting) is not stored again
+SEARCH_HISTORY_DEDUP_WINDOW = env.int("SEARCH_HISTORY_DEDUP_WINDOW", default=1800)